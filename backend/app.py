@@ -1,17 +1,31 @@
 from fastapi import FastAPI, BackgroundTasks, HTTPException, Depends, Request, Form
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import json
+import tempfile
 import uvicorn
 from datetime import datetime
 
-from database import get_db, init_db
-from models import Customer, Lead, MessageJob, Interaction, Task, Conversation, Message
+from database import get_async_db, init_db, close_async_db
+from models import Customer, Lead, MessageJob, Interaction, Task, Conversation, ConversationStats, Message
 from adapters import get_adapter
-from processors import process_inbound_interaction, process_conversation_message, generate_conversation_summary, start_outbound_conversation, handle_inbound_message, generate_conversation_foresights
-from llm_grok import call_grok
-from prompts import get_agent_prompt, format_prompt_with_context
+from processors import GREETING_CACHE_TTL, generate_conversation_foresights, get_cached_summary, prepare_turn, detected_customer_language, ahandle_inbound_message, acomplete_conversation_turn
+from llm_grok import acall_grok, astream_grok, grok_api
+from bulk_summarize import run_bulk_summarization, get_job_status
+from bulk_import import IMPORT_FORMATS, run_bulk_import
+from prompts import build_agent_messages, GREETING_USER_PROMPT
+from turn_context import agent_context, aload_turn_context
+from language import get_language_stats
+from pagination import InvalidCursor, paginate, page
+from conversation_stats import stats_dict
+from group_commit import group_commit_add, close_group_commit, get_group_commit_stats
+from job_queue import enqueue_job, group_commit_add_with_job, submit_job, notify, start_embedded_worker, stop_embedded_worker, aget_job_stats
 
 # Initialize FastAPI app
 app = FastAPI(title="Follow-up Automation API", version="1.0.0")
@@ -29,6 +43,15 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    start_embedded_worker()
+
+# Release pooled Grok connections on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_embedded_worker()
+    await grok_api.aclose()
+    await close_group_commit()
+    await close_async_db()
 
 # Pydantic models for request/response
 class MessageRequest(BaseModel):
@@ -44,7 +67,7 @@ class WebhookRequest(BaseModel):
     customer_id: Optional[int] = None
     channel: str
     transcript: str
-    language: str = "en"
+    language: Optional[str] = None  # Detected from the transcript if not given
     provider_raw: Optional[Dict[str, Any]] = None
 
 class SimulateReplyRequest(BaseModel):
@@ -72,7 +95,19 @@ class ConversationRequest(BaseModel):
 class MessageRequest(BaseModel):
     conversation_id: int
     content: str
-    language: str = "en"
+    language: Optional[str] = None  # Detected from the content if not given
+
+class BulkSummaryRequest(BaseModel):
+    job_name: str = "nightly"
+    statuses: List[str] = ["completed"]
+    only_missing: bool = True
+    batch_size: int = 100
+    max_workers: int = 4
+    restart: bool = False
+
+class StreamMessageRequest(BaseModel):
+    content: str
+    language: Optional[str] = None  # Detected from the content if not given
 
 class StartConversationRequest(BaseModel):
     lead_id: str
@@ -99,12 +134,12 @@ except Exception as e:
     messaging_adapter = MockAdapter()
 
 @app.post("/api/messages")
-async def create_message_job(request: MessageRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def create_message_job(request: MessageRequest, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
     """Create a message job and send it via messaging adapter"""
     try:
         # Get customer phone number if not provided
         if not request.to_number and request.channel == "sms":
-            customer = db.query(Customer).filter(Customer.id == request.customer_id).first()
+            customer = await db.get(Customer, request.customer_id)
             if customer:
                 request.to_number = customer.phone
             else:
@@ -120,8 +155,7 @@ async def create_message_job(request: MessageRequest, background_tasks: Backgrou
             scheduled_at=datetime.utcnow()
         )
         db.add(message_job)
-        db.commit()
-        db.refresh(message_job)
+        await db.commit()
         
         # Prepare job data for adapter
         job_dict = {
@@ -147,7 +181,7 @@ async def create_message_job(request: MessageRequest, background_tasks: Backgrou
         raise HTTPException(status_code=500, detail=f"Failed to create message job: {str(e)}")
 
 @app.post("/api/messages/webhook")
-async def webhook_handler(request: Request, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def webhook_handler(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Handle incoming webhook from messaging provider (Twilio SMS)"""
     try:
         # Parse form data from Twilio webhook
@@ -169,32 +203,27 @@ async def webhook_handler(request: Request, background_tasks: BackgroundTasks, d
         }
         
         # Try to find customer by phone number
-        customer = db.query(Customer).filter(Customer.phone == from_number).first()
+        customer = (await db.execute(select(Customer).where(Customer.phone == from_number))).scalars().first()
         customer_id = customer.id if customer else None
         lead_id = None
         
         if customer:
             # Find the most recent lead for this customer
-            lead = db.query(Lead).filter(Lead.customer_id == customer_id).order_by(Lead.due_date.desc()).first()
-            lead_id = lead.id if lead else None
+            lead_id = (await db.execute(
+                select(Lead.id).where(Lead.customer_id == customer_id).order_by(Lead.due_date.desc()).limit(1)
+            )).scalar()
         
-        # Create Interaction record
-        interaction = Interaction(
+        # Create Interaction record together with its processing job
+        interaction = await group_commit_add_with_job(lambda: Interaction(
             lead_id=lead_id,
             customer_id=customer_id,
             channel="sms",
             transcript=message_body,
-            language="en",  # Default to English, could be detected
+            language=customer.preferred_language if customer and customer.preferred_language else "en",  # Refined by detection during processing
             provider_raw=provider_raw,
             status="processing",
             created_at=datetime.utcnow()
-        )
-        db.add(interaction)
-        db.commit()
-        db.refresh(interaction)
-        
-        # Process interaction in background
-        background_tasks.add_task(process_inbound_interaction, interaction.id)
+        ), "process_inbound_interaction", lambda interaction: {"interaction_id": interaction.id})
         
         return {
             "interaction_id": interaction.id,
@@ -206,26 +235,20 @@ async def webhook_handler(request: Request, background_tasks: BackgroundTasks, d
         raise HTTPException(status_code=500, detail=f"Failed to process webhook: {str(e)}")
 
 @app.post("/api/messages/webhook/json")
-async def webhook_handler_json(request: WebhookRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def webhook_handler_json(request: WebhookRequest, db: AsyncSession = Depends(get_async_db)):
     """Handle incoming webhook from messaging provider (JSON format)"""
     try:
-        # Create Interaction record
-        interaction = Interaction(
+        # Create Interaction record together with its processing job
+        interaction = await group_commit_add_with_job(lambda: Interaction(
             lead_id=request.lead_id,
             customer_id=request.customer_id,
             channel=request.channel,
             transcript=request.transcript,
-            language=request.language,
+            language=request.language or "en",
             provider_raw=request.provider_raw,
             status="processing",
             created_at=datetime.utcnow()
-        )
-        db.add(interaction)
-        db.commit()
-        db.refresh(interaction)
-        
-        # Process interaction in background
-        background_tasks.add_task(process_inbound_interaction, interaction.id)
+        ), "process_inbound_interaction", lambda interaction: {"interaction_id": interaction.id})
         
         return {
             "interaction_id": interaction.id,
@@ -236,11 +259,11 @@ async def webhook_handler_json(request: WebhookRequest, background_tasks: Backgr
         raise HTTPException(status_code=500, detail=f"Failed to process webhook: {str(e)}")
 
 @app.post("/admin/simulate_reply")
-async def simulate_reply(request: SimulateReplyRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def simulate_reply(request: SimulateReplyRequest, db: AsyncSession = Depends(get_async_db)):
     """Admin endpoint to simulate a customer reply for testing"""
     try:
-        # Create Interaction record
-        interaction = Interaction(
+        # Create Interaction record together with its processing job
+        interaction = await group_commit_add_with_job(lambda: Interaction(
             lead_id=request.lead_id,
             customer_id=request.customer_id,
             channel=request.channel,
@@ -249,13 +272,7 @@ async def simulate_reply(request: SimulateReplyRequest, background_tasks: Backgr
             provider_raw={"simulated": True, "admin_test": True},
             status="processing",
             created_at=datetime.utcnow()
-        )
-        db.add(interaction)
-        db.commit()
-        db.refresh(interaction)
-        
-        # Process interaction in background
-        background_tasks.add_task(process_inbound_interaction, interaction.id)
+        ), "process_inbound_interaction", lambda interaction: {"interaction_id": interaction.id})
         
         return {
             "interaction_id": interaction.id,
@@ -266,7 +283,7 @@ async def simulate_reply(request: SimulateReplyRequest, background_tasks: Backgr
         raise HTTPException(status_code=500, detail=f"Failed to simulate reply: {str(e)}")
 
 @app.post("/admin/seed_demo")
-async def seed_demo_data(request: SeedDemoRequest, db: Session = Depends(get_db)):
+async def seed_demo_data(request: SeedDemoRequest, db: AsyncSession = Depends(get_async_db)):
     """Seed demo customer and lead data"""
     try:
         # Create demo customer
@@ -278,8 +295,7 @@ async def seed_demo_data(request: SeedDemoRequest, db: Session = Depends(get_db)
             do_not_contact=False
         )
         db.add(customer)
-        db.commit()
-        db.refresh(customer)
+        await db.commit()
         
         # Create demo lead
         lead = Lead(
@@ -289,8 +305,7 @@ async def seed_demo_data(request: SeedDemoRequest, db: Session = Depends(get_db)
             due_date=datetime.utcnow()
         )
         db.add(lead)
-        db.commit()
-        db.refresh(lead)
+        await db.commit()
         
         return {
             "customer_id": customer.id,
@@ -300,11 +315,64 @@ async def seed_demo_data(request: SeedDemoRequest, db: Session = Depends(get_db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to seed demo data: {str(e)}")
 
+@app.post("/admin/import")
+async def import_customers_and_leads(request: Request, format: Optional[str] = None, chunk_size: Optional[int] = None):
+    """
+    Bulk import customers and leads from a CSV or NDJSON request body.
+    
+    The body is streamed to a temporary file (spilling to disk past 8 MB) and
+    imported in chunked transactions; the response reports per-row errors.
+    Format defaults from the Content-Type (text/csv, otherwise NDJSON).
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {list(IMPORT_FORMATS)}")
+    
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        try:
+            kwargs = {"chunk_size": chunk_size} if chunk_size else {}
+            return await run_in_threadpool(run_bulk_import, upload, fmt, **kwargs)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/interactions")
+async def list_interactions(customer_id: Optional[int] = None, lead_id: Optional[int] = None, status: Optional[str] = None,
+                            cursor: Optional[str] = None, limit: Optional[int] = None, db: AsyncSession = Depends(get_async_db)):
+    """List interactions, newest first, one cursor page at a time"""
+    query = select(Interaction)
+    if customer_id is not None:
+        query = query.where(Interaction.customer_id == customer_id)
+    if lead_id is not None:
+        query = query.where(Interaction.lead_id == lead_id)
+    if status:
+        query = query.where(Interaction.status == status)
+    try:
+        rows = (await db.execute(paginate(query, Interaction, cursor, limit))).scalars().all()
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return page(rows, limit, lambda interaction: {
+        "id": interaction.id,
+        "lead_id": interaction.lead_id,
+        "customer_id": interaction.customer_id,
+        "channel": interaction.channel,
+        "language": interaction.language,
+        "mood_label": interaction.mood_label,
+        "outcome_label": interaction.outcome_label,
+        "escalated": interaction.escalated,
+        "status": interaction.status,
+        "created_at": interaction.created_at,
+        "processed_at": interaction.processed_at
+    })
+
 @app.get("/api/interactions/{interaction_id}")
-async def get_interaction(interaction_id: int, db: Session = Depends(get_db)):
+async def get_interaction(interaction_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get interaction details including transcript, mood, summary, and outcome"""
     try:
-        interaction = db.query(Interaction).filter(Interaction.id == interaction_id).first()
+        interaction = await db.get(Interaction, interaction_id)
         if not interaction:
             raise HTTPException(status_code=404, detail="Interaction not found")
         
@@ -331,11 +399,11 @@ async def get_interaction(interaction_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to get interaction: {str(e)}")
 
 @app.post("/api/conversations")
-async def create_conversation(request: ConversationRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def create_conversation(request: ConversationRequest, db: AsyncSession = Depends(get_async_db)):
     """Create a new conversation with an agent"""
     try:
         # Check customer consent and DNC
-        customer = db.query(Customer).filter(Customer.id == request.customer_id).first()
+        customer = await db.get(Customer, request.customer_id)
         if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
         
@@ -357,43 +425,25 @@ async def create_conversation(request: ConversationRequest, background_tasks: Ba
             status="active"
         )
         db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
+        await db.commit()
         
         # Generate initial message if provided
         if request.initial_message:
-            # Add user message
-            user_msg = Message(
+            # Add user message together with the job that answers it
+            await group_commit_add_with_job(lambda: Message(
                 conversation_id=conversation.id,
                 sender="user",
                 content=request.initial_message,
                 created_at=datetime.utcnow()
-            )
-            db.add(user_msg)
-            db.commit()
-            
-            # Process the message
-            background_tasks.add_task(process_conversation_message, conversation.id, request.initial_message, request.language)
+            ), "handle_inbound_message", lambda msg: {
+                "conversation_id": msg.conversation_id, "message_id": msg.id, "language": request.language
+            })
         else:
             # Generate initial assistant message
-            context = {
-                "customer_name": customer.name,
-                "policy_id": conversation.lead.policy_id if conversation.lead else "N/A",
-                "due_date": conversation.lead.due_date.isoformat() if conversation.lead and conversation.lead.due_date else "N/A",
-                "outstanding_amount": conversation.lead.expected_value if conversation.lead else 0,
-                "policy_type": "Insurance Policy",
-                "policy_value": conversation.lead.expected_value if conversation.lead else 0
-            }
-            
-            system_prompt = get_agent_prompt(request.agent_type)
-            formatted_prompt = format_prompt_with_context(system_prompt, context)
-            
-            grok_messages = [
-                {"role": "system", "content": formatted_prompt},
-                {"role": "user", "content": "Start the conversation with a greeting and introduction."}
-            ]
+            lead = await db.get(Lead, conversation.lead_id) if conversation.lead_id else None
+            grok_messages = build_agent_messages(request.agent_type, agent_context(customer, lead), request.language, user_prompt=GREETING_USER_PROMPT)
             
-            grok_response = call_grok(grok_messages, request.agent_type, request.language)
+            grok_response = await acall_grok(grok_messages, request.agent_type, request.language, cache_ttl=GREETING_CACHE_TTL)
             
             # Save assistant message
             assistant_msg = Message(
@@ -415,12 +465,12 @@ async def create_conversation(request: ConversationRequest, background_tasks: Ba
                 "conversation_id": conversation.id
             }
             
-            send_result = messaging_adapter.send(job_dict)
+            send_result = await run_in_threadpool(messaging_adapter.send, job_dict)
             if send_result.get("success"):
                 assistant_msg.provider_message_id = send_result.get("message_id")
                 assistant_msg.provider_raw = send_result
             
-            db.commit()
+            await db.commit()
         
         return {
             "conversation_id": conversation.id,
@@ -435,19 +485,27 @@ async def create_conversation(request: ConversationRequest, background_tasks: Ba
         raise HTTPException(status_code=500, detail=f"Failed to create conversation: {str(e)}")
 
 @app.post("/api/conversations/{conversation_id}/messages")
-async def send_message(conversation_id: int, request: MessageRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def send_message(conversation_id: int, request: MessageRequest, db: AsyncSession = Depends(get_async_db)):
     """Send a message in a conversation"""
     try:
         # Verify conversation exists
-        conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+        conversation = await db.get(Conversation, conversation_id)
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        # Process the message
-        background_tasks.add_task(process_conversation_message, conversation_id, request.content, request.language)
+        # Store the message together with the job that answers it
+        user_msg = await group_commit_add_with_job(lambda: Message(
+            conversation_id=conversation_id,
+            sender="user",
+            content=request.content,
+            created_at=datetime.utcnow()
+        ), "handle_inbound_message", lambda msg: {
+            "conversation_id": conversation_id, "message_id": msg.id, "language": request.language
+        })
         
         return {
             "conversation_id": conversation_id,
+            "message_id": user_msg.id,
             "status": "processing",
             "message": "Message queued for processing"
         }
@@ -457,17 +515,144 @@ async def send_message(conversation_id: int, request: MessageRequest, background
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send message: {str(e)}")
 
+@app.post("/api/conversations/{conversation_id}/messages/stream")
+async def stream_message(conversation_id: int, request: StreamMessageRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Send a message and stream the Grok reply as server-sent events.
+    Emits `delta` events with assistant text as it is generated, `field` events as each
+    JSON field completes, and a final `done` event with the validated response once the
+    reply has been saved and sent (or escalated).
+    """
+    turn = await aload_turn_context(db, conversation_id)
+    if not turn:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    if not turn.can_contact:
+        raise HTTPException(status_code=403, detail="Customer has not consented or is DNC")
+    
+    # Store user message
+    user_msg = await group_commit_add(lambda: Message(
+        conversation_id=conversation_id,
+        sender="user",
+        content=request.content,
+        created_at=datetime.utcnow()
+    ))
+    turn.add_message(user_msg)
+    
+    # Reply language, context window and Grok messages for the turn (language,
+    # rolling summary and the customer's detected language are saved with the reply)
+    language, grok_messages = prepare_turn(turn, request.content, request.language)
+    agent_type = turn.conversation.agent_type
+    context_summary = turn.conversation.context_summary
+    context_summary_through_id = turn.conversation.context_summary_through_id
+    customer_language = detected_customer_language(turn)
+    
+    async def event_stream():
+        async for event in astream_grok(grok_messages, agent_type, language):
+            if event["type"] == "done":
+                result = await acomplete_conversation_turn(conversation_id, event["response"], language,
+                                                           context_summary, context_summary_through_id,
+                                                           customer_language)
+                event = {**event, "escalated": result.get("escalated", False)}
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.get("/api/conversations")
+async def list_conversations(status: Optional[str] = None, agent_type: Optional[str] = None, customer_id: Optional[int] = None,
+                             cursor: Optional[str] = None, limit: Optional[int] = None, db: AsyncSession = Depends(get_async_db)):
+    """List conversations with their stats rollup, newest first, one cursor page at a time"""
+    query = select(Conversation).options(joinedload(Conversation.stats))
+    if status:
+        query = query.where(Conversation.status == status)
+    if agent_type:
+        query = query.where(Conversation.agent_type == agent_type)
+    if customer_id is not None:
+        query = query.where(Conversation.customer_id == customer_id)
+    try:
+        rows = (await db.execute(paginate(query, Conversation, cursor, limit))).scalars().all()
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return page(rows, limit, lambda conversation: {
+        "id": conversation.id,
+        "lead_id": conversation.lead_id,
+        "customer_id": conversation.customer_id,
+        "agent_type": conversation.agent_type,
+        "channel": conversation.channel,
+        "language": conversation.language,
+        "status": conversation.status,
+        "created_at": conversation.created_at,
+        "updated_at": conversation.updated_at,
+        "stats": stats_dict(conversation.stats)
+    })
+
+@app.get("/api/conversations/{conversation_id}/messages")
+async def list_conversation_messages(conversation_id: int, cursor: Optional[str] = None, limit: Optional[int] = None,
+                                     order: str = "asc", include_raw: bool = False, db: AsyncSession = Depends(get_async_db)):
+    """
+    List the messages of a conversation one cursor page at a time.
+    
+    order=asc pages forward from the first message; order=desc pages back from the
+    latest (chat history scroll-back). include_raw adds the raw LLM and provider
+    payloads, loaded from message_payloads in one extra query.
+    """
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    if not await db.get(Conversation, conversation_id):
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    query = select(Message).where(Message.conversation_id == conversation_id)
+    if include_raw:
+        query = query.options(selectinload(Message.payload))
+    try:
+        rows = (await db.execute(paginate(query, Message, cursor, limit, descending=order == "desc"))).scalars().all()
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    def serialize(msg: Message) -> Dict[str, Any]:
+        item = {
+            "id": msg.id,
+            "sender": msg.sender,
+            "content": msg.content,
+            "message_type": msg.message_type,
+            "mood": msg.mood,
+            "action": msg.action,
+            "outcome_hint": msg.outcome_hint,
+            "created_at": msg.created_at
+        }
+        if include_raw:
+            item["llm_raw"] = msg.llm_raw
+            item["provider_raw"] = msg.provider_raw
+        return item
+    
+    return page(rows, limit, serialize)
+
+async def recent_messages(db: AsyncSession, conversation_id: int, limit: Optional[int]):
+    """
+    Latest page of a conversation's messages, in chronological order, plus the cursor
+    for scrolling back through GET /api/conversations/{id}/messages?order=desc
+    """
+    query = select(Message).where(Message.conversation_id == conversation_id)
+    rows = (await db.execute(paginate(query, Message, None, limit))).scalars().all()
+    latest = page(rows, limit, lambda msg: msg)
+    return list(reversed(latest["items"])), latest["next_cursor"]
+
 @app.get("/api/conversations/{conversation_id}")
-async def get_conversation(conversation_id: int, db: Session = Depends(get_db)):
-    """Get conversation details and messages"""
+async def get_conversation(conversation_id: int, message_limit: Optional[int] = None, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get conversation details, its stats rollup and its latest messages.
+    
+    Counters, last activity and the latest mood/outcome come from the conversation_stats
+    row. Messages cover the latest message_limit messages; older ones are paged with
+    messages_next_cursor.
+    """
     try:
-        conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+        conversation = await db.get(Conversation, conversation_id)
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        messages = db.query(Message).filter(
-            Message.conversation_id == conversation_id
-        ).order_by(Message.created_at).all()
+        messages, next_cursor = await recent_messages(db, conversation_id, message_limit)
         
         return {
             "id": conversation.id,
@@ -480,6 +665,7 @@ async def get_conversation(conversation_id: int, db: Session = Depends(get_db)):
             "summary": conversation.summary,
             "created_at": conversation.created_at,
             "updated_at": conversation.updated_at,
+            "stats": stats_dict(await db.get(ConversationStats, conversation_id)),
             "messages": [
                 {
                     "id": msg.id,
@@ -492,7 +678,8 @@ async def get_conversation(conversation_id: int, db: Session = Depends(get_db)):
                     "created_at": msg.created_at
                 }
                 for msg in messages
-            ]
+            ],
+            "messages_next_cursor": next_cursor
         }
         
     except HTTPException:
@@ -501,18 +688,28 @@ async def get_conversation(conversation_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to get conversation: {str(e)}")
 
 @app.post("/api/conversations/{conversation_id}/summary")
-async def generate_summary(conversation_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def generate_summary(conversation_id: int, db: AsyncSession = Depends(get_async_db)):
     """Generate a summary for a conversation"""
     try:
-        conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+        conversation = await db.get(Conversation, conversation_id)
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        # Generate summary in background
-        background_tasks.add_task(generate_conversation_summary, conversation_id)
+        # Nothing new since the last summary
+        cached = await db.run_sync(get_cached_summary, conversation)
+        if cached is not None:
+            return {
+                "conversation_id": conversation_id,
+                "status": "cached",
+                "summary": cached
+            }
+        
+        # Generate summary in a job
+        job_id = await submit_job("generate_conversation_summary", {"conversation_id": conversation_id})
         
         return {
             "conversation_id": conversation_id,
+            "job_id": job_id,
             "status": "generating",
             "message": "Summary generation queued"
         }
@@ -523,7 +720,7 @@ async def generate_summary(conversation_id: int, background_tasks: BackgroundTas
         raise HTTPException(status_code=500, detail=f"Failed to generate summary: {str(e)}")
 
 @app.post("/api/start_conversation")
-async def start_conversation(request: StartConversationRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def start_conversation(request: StartConversationRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Frontend endpoint to start an outbound conversation.
     
@@ -555,7 +752,7 @@ async def start_conversation(request: StartConversationRequest, background_tasks
             raise HTTPException(status_code=400, detail=f"Invalid agent type. Must be one of: {valid_agents}")
         
         # Check customer consent and DNC
-        customer = db.query(Customer).filter(Customer.id == int(request.customer_id)).first()
+        customer = await db.get(Customer, int(request.customer_id))
         if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
         
@@ -565,10 +762,10 @@ async def start_conversation(request: StartConversationRequest, background_tasks
         # Update customer phone if different
         if customer.phone != request.customer_phone:
             customer.phone = request.customer_phone
-            db.commit()
+            await db.commit()
         
         # Find or create lead
-        lead = db.query(Lead).filter(Lead.id == int(request.lead_id)).first()
+        lead = await db.get(Lead, int(request.lead_id))
         if not lead:
             # Create lead if it doesn't exist
             lead = Lead(
@@ -579,7 +776,7 @@ async def start_conversation(request: StartConversationRequest, background_tasks
                 due_date=datetime.fromisoformat(request.initial_context.get("due_date", "2024-02-15")) if request.initial_context else datetime.utcnow()
             )
             db.add(lead)
-            db.commit()
+            await db.commit()
         
         # Create conversation
         conversation = Conversation(
@@ -591,8 +788,6 @@ async def start_conversation(request: StartConversationRequest, background_tasks
             status="active"
         )
         db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
         
         # Create message job
         message_job = MessageJob(
@@ -603,8 +798,7 @@ async def start_conversation(request: StartConversationRequest, background_tasks
             scheduled_at=datetime.utcnow()
         )
         db.add(message_job)
-        db.commit()
-        db.refresh(message_job)
+        await db.flush()
         
         # Prepare job data for background processing
         job_dict = {
@@ -617,8 +811,10 @@ async def start_conversation(request: StartConversationRequest, background_tasks
             "initial_context": request.initial_context or {}
         }
         
-        # Process conversation start in background
-        background_tasks.add_task(start_outbound_conversation, job_dict)
+        # Start the conversation in a job, committed together with the conversation
+        enqueue_job(db, "start_outbound_conversation", job_dict)
+        await db.commit()
+        notify()
         
         return {
             "conversation_id": str(conversation.id),
@@ -632,7 +828,7 @@ async def start_conversation(request: StartConversationRequest, background_tasks
         raise HTTPException(status_code=500, detail=f"Failed to start conversation: {str(e)}")
 
 @app.post("/api/messages/webhook")
-async def webhook_handler(request: Request, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def webhook_handler(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Handle incoming Twilio webhooks for SMS messages.
     
@@ -650,22 +846,24 @@ async def webhook_handler(request: Request, background_tasks: BackgroundTasks, d
         message_sid = form_data.get("MessageSid")
         
         # Find conversation by customer phone
-        customer = db.query(Customer).filter(Customer.phone == from_number).first()
+        customer = (await db.execute(select(Customer).where(Customer.phone == from_number))).scalars().first()
         if not customer:
             # Return 200 to Twilio but don't process
             return {"status": "ignored", "reason": "customer_not_found"}
         
         # Find active conversation for this customer
-        conversation = db.query(Conversation).filter(
-            Conversation.customer_id == customer.id,
-            Conversation.status == "active"
-        ).order_by(Conversation.created_at.desc()).first()
+        conversation = (await db.execute(
+            select(Conversation).where(
+                Conversation.customer_id == customer.id,
+                Conversation.status == "active"
+            ).order_by(Conversation.created_at.desc()).limit(1)
+        )).scalars().first()
         
         if not conversation:
             return {"status": "ignored", "reason": "no_active_conversation"}
         
-        # Create user message
-        user_msg = Message(
+        # Create user message together with the job that answers it
+        user_msg = await group_commit_add_with_job(lambda: Message(
             conversation_id=conversation.id,
             sender="user",
             content=message_body,
@@ -677,13 +875,7 @@ async def webhook_handler(request: Request, background_tasks: BackgroundTasks, d
                 "raw_form_data": dict(form_data)
             },
             created_at=datetime.utcnow()
-        )
-        db.add(user_msg)
-        db.commit()
-        db.refresh(user_msg)
-        
-        # Process inbound message in background
-        background_tasks.add_task(handle_inbound_message, conversation.id, user_msg.id)
+        ), "handle_inbound_message", lambda msg: {"conversation_id": msg.conversation_id, "message_id": msg.id})
         
         return {"status": "received", "message_id": user_msg.id}
         
@@ -692,7 +884,7 @@ async def webhook_handler(request: Request, background_tasks: BackgroundTasks, d
         return {"status": "error", "message": str(e)}
 
 @app.post("/admin/simulate_reply")
-async def simulate_reply(request: SimulateReplyRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def simulate_reply(request: SimulateReplyRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Admin endpoint to simulate a customer reply for demo purposes.
     
@@ -714,12 +906,12 @@ async def simulate_reply(request: SimulateReplyRequest, background_tasks: Backgr
     """
     try:
         # Verify conversation exists
-        conversation = db.query(Conversation).filter(Conversation.id == int(request.conversation_id)).first()
+        conversation = await db.get(Conversation, int(request.conversation_id))
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
         # Create user message
-        user_msg = Message(
+        user_msg = await group_commit_add(lambda: Message(
             conversation_id=conversation.id,
             sender="user",
             content=request.text,
@@ -729,13 +921,10 @@ async def simulate_reply(request: SimulateReplyRequest, background_tasks: Backgr
                 "language": request.language
             },
             created_at=datetime.utcnow()
-        )
-        db.add(user_msg)
-        db.commit()
-        db.refresh(user_msg)
+        ))
         
         # Process message immediately (not background for demo)
-        result = handle_inbound_message(conversation.id, user_msg.id)
+        result = await ahandle_inbound_message(conversation.id, user_msg.id)
         
         return {
             "message_id": str(user_msg.id),
@@ -749,89 +938,8 @@ async def simulate_reply(request: SimulateReplyRequest, background_tasks: Backgr
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to simulate reply: {str(e)}")
 
-@app.get("/api/conversations/{conversation_id}")
-async def get_conversation_details(conversation_id: int, db: Session = Depends(get_db)):
-    """
-    Get full conversation details including history, summary, mood timeline, and tasks.
-    
-    Example response:
-    {
-        "conversation_id": 1001,
-        "metadata": {...},
-        "messages": [...],
-        "summary": "...",
-        "mood_timeline": [...],
-        "tasks": [...]
-    }
-    """
-    try:
-        conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
-        if not conversation:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-        
-        # Get all messages
-        messages = db.query(Message).filter(
-            Message.conversation_id == conversation_id
-        ).order_by(Message.created_at).all()
-        
-        # Build mood timeline
-        mood_timeline = []
-        for msg in messages:
-            if msg.mood and msg.sender == "assistant":
-                mood_timeline.append({
-                    "timestamp": msg.created_at.isoformat(),
-                    "mood": msg.mood.get("label"),
-                    "confidence": msg.mood.get("confidence")
-                })
-        
-        # Get tasks
-        tasks = db.query(Task).filter(Task.lead_id == conversation.lead_id).all()
-        
-        return {
-            "conversation_id": conversation.id,
-            "metadata": {
-                "lead_id": conversation.lead_id,
-                "customer_id": conversation.customer_id,
-                "agent_type": conversation.agent_type,
-                "channel": conversation.channel,
-                "language": conversation.language,
-                "status": conversation.status,
-                "created_at": conversation.created_at.isoformat(),
-                "updated_at": conversation.updated_at.isoformat()
-            },
-            "messages": [
-                {
-                    "id": msg.id,
-                    "sender": msg.sender,
-                    "content": msg.content,
-                    "timestamp": msg.created_at.isoformat(),
-                    "mood": msg.mood,
-                    "action": msg.action,
-                    "outcome_hint": msg.outcome_hint
-                }
-                for msg in messages
-            ],
-            "summary": conversation.summary,
-            "mood_timeline": mood_timeline,
-            "tasks": [
-                {
-                    "id": task.id,
-                    "type": task.type,
-                    "status": task.status,
-                    "notes": task.notes,
-                    "created_at": task.created_at.isoformat()
-                }
-                for task in tasks
-            ]
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get conversation: {str(e)}")
-
 @app.post("/api/conversations/{conversation_id}/foresights")
-async def generate_foresights(conversation_id: int, force_refresh: bool = False, background_tasks: BackgroundTasks = None, db: Session = Depends(get_db)):
+async def generate_foresights(conversation_id: int, force_refresh: bool = False, background_tasks: BackgroundTasks = None, db: AsyncSession = Depends(get_async_db)):
     """
     Generate and store foresights for a conversation.
     
@@ -848,12 +956,12 @@ async def generate_foresights(conversation_id: int, force_refresh: bool = False,
     }
     """
     try:
-        conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+        conversation = await db.get(Conversation, conversation_id)
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        # Generate foresights
-        foresights = generate_conversation_foresights(conversation_id)
+        # Generate foresights (sync, reads through its own session)
+        foresights = await run_in_threadpool(generate_conversation_foresights, conversation_id)
         
         # Store foresights in conversation summary (could be separate table in production)
         if conversation.summary:
@@ -870,7 +978,7 @@ async def generate_foresights(conversation_id: int, force_refresh: bool = False,
                 for f in foresights
             ])
         
-        db.commit()
+        await db.commit()
         
         return {
             "foresights": foresights,
@@ -882,6 +990,38 @@ async def generate_foresights(conversation_id: int, force_refresh: bool = False,
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate foresights: {str(e)}")
 
+@app.get("/admin/grok_stats")
+async def get_grok_stats():
+    """Get Grok client counters (response cache hits, misses, evictions), language detection and group commit counters"""
+    return {**grok_api.get_stats(), "language": get_language_stats(), "group_commit": get_group_commit_stats()}
+
+@app.get("/admin/jobs")
+async def get_jobs_stats(db: AsyncSession = Depends(get_async_db)):
+    """Get job queue counts by status and kind, the oldest due job's age and the embedded worker's counters"""
+    return await aget_job_stats(db)
+
+@app.post("/admin/summaries/bulk")
+async def start_bulk_summaries(request: BulkSummaryRequest, background_tasks: BackgroundTasks):
+    """Start (or resume) a bulk summarization run in the background"""
+    background_tasks.add_task(
+        run_bulk_summarization,
+        job_name=request.job_name,
+        statuses=request.statuses,
+        only_missing=request.only_missing,
+        batch_size=request.batch_size,
+        max_workers=request.max_workers,
+        restart=request.restart
+    )
+    return {"job_name": request.job_name, "status": "processing", "message": "Bulk summarization queued"}
+
+@app.get("/admin/summaries/bulk/{job_name}")
+async def get_bulk_summaries_status(job_name: str):
+    """Get the checkpoint of a bulk summarization run"""
+    status = await run_in_threadpool(get_job_status, job_name)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Summary job not found")
+    return status
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -0,0 +1,300 @@
+"""
+Bulk import of customers and leads (nightly book-of-business load).
+Rows are parsed from CSV or NDJSON as a stream, validated one by one and written
+in chunked transactions: customers are upserted by phone and leads inserted (or
+updated by customer + policy ID) with executemany-style bulk statements. Invalid
+rows are reported with their line number and skipped; a chunk that fails to
+write is retried row by row so one bad row does not drop its neighbours.
+
+Each row describes a customer and optionally one of their leads:
+    name, phone, consent_given_at, preferred_language, do_not_contact,
+    policy_id, expected_value, due_date
+
+Usage:
+    python bulk_import.py book.csv
+    python bulk_import.py book.ndjson --chunk-size 5000
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models import Customer, Lead
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+IMPORT_FORMATS = ("csv", "ndjson")
+MAX_REPORTED_ERRORS = 1000
+
+REQUIRED_FIELDS = ("name", "phone", "consent_given_at")
+PHONE_PATTERN = re.compile(r"^\+?\d{7,15}$")
+TRUE_VALUES = {"true", "1", "yes", "y"}
+FALSE_VALUES = {"false", "0", "no", "n", ""}
+
+# (line number, customer values, lead values or None)
+ImportRow = Tuple[int, Dict[str, Any], Optional[Dict[str, Any]]]
+
+def _text(raw: Dict[str, Any], field: str) -> Optional[str]:
+    value = raw.get(field)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def _datetime(raw: Dict[str, Any], field: str) -> Optional[datetime]:
+    value = _text(raw, field)
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        raise ValueError(f"{field} is not an ISO date: {value!r}")
+
+def _bool(raw: Dict[str, Any], field: str) -> bool:
+    value = raw.get(field)
+    if isinstance(value, bool):
+        return value
+    text = (_text(raw, field) or "").lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"{field} is not a boolean: {value!r}")
+
+def parse_row(raw: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Validate one import row.
+
+    Args:
+        raw: Field values from a CSV record or NDJSON object
+
+    Returns:
+        Tuple of (customer values, lead values or None if the row has no policy_id)
+
+    Raises:
+        ValueError: If the row is invalid
+    """
+    missing = [field for field in REQUIRED_FIELDS if _text(raw, field) is None]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+    phone = re.sub(r"[\s\-().]", "", _text(raw, "phone"))
+    if not PHONE_PATTERN.match(phone):
+        raise ValueError(f"invalid phone: {raw.get('phone')!r}")
+
+    customer = {
+        "name": _text(raw, "name")[:255],
+        "phone": phone,
+        "consent_given_at": _datetime(raw, "consent_given_at")
+    }
+    # Optional fields are only set when present, so re-imports keep detected values
+    language = _text(raw, "preferred_language")
+    if language:
+        if len(language) > 10:
+            raise ValueError(f"invalid preferred_language: {language!r}")
+        customer["preferred_language"] = language.lower()
+    if _text(raw, "do_not_contact") is not None:
+        customer["do_not_contact"] = _bool(raw, "do_not_contact")
+
+    policy_id = _text(raw, "policy_id")
+    if policy_id is None:
+        return customer, None
+
+    expected_value = _text(raw, "expected_value")
+    due_date = _datetime(raw, "due_date")
+    if expected_value is None or due_date is None:
+        raise ValueError("leads need expected_value and due_date")
+    try:
+        expected_value = float(expected_value)
+    except ValueError:
+        raise ValueError(f"expected_value is not a number: {expected_value!r}")
+
+    return customer, {"policy_id": policy_id[:100], "expected_value": expected_value, "due_date": due_date}
+
+def iter_csv_records(text: io.TextIOBase) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, record dict or parse error) from a CSV stream with a header row"""
+    reader = csv.DictReader(text)
+    missing = [field for field in ("name", "phone") if field not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV header is missing columns: {', '.join(missing)}")
+    while True:
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield reader.line_num, e
+            continue
+        yield reader.line_num, record
+
+def iter_ndjson_records(text: io.TextIOBase) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, record dict or parse error) from an NDJSON stream"""
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, e
+            continue
+        yield line_number, record if isinstance(record, dict) else ValueError("line is not a JSON object")
+
+def _write_chunk(db: Session, rows: List[ImportRow]) -> Dict[str, int]:
+    """Upsert the customers and leads of a chunk; the caller commits"""
+    # Customers by phone (later rows for a phone override earlier ones field by field)
+    customers = {}
+    for _, customer, _ in rows:
+        customers.setdefault(customer["phone"], {}).update(customer)
+    customer_ids = dict(db.execute(
+        select(Customer.phone, Customer.id).where(Customer.phone.in_(list(customers)))
+    ).all())
+    new_customers = [{"preferred_language": "en", "do_not_contact": False, **values}
+                     for phone, values in customers.items() if phone not in customer_ids]
+    updated_customers = []
+    for phone, values in customers.items():
+        if phone in customer_ids:
+            # An import never lifts a do-not-contact flag (e.g. set by an opt-out reply)
+            if not values.get("do_not_contact", True):
+                values = {key: value for key, value in values.items() if key != "do_not_contact"}
+            updated_customers.append({"id": customer_ids[phone], **values})
+    if new_customers:
+        for phone, customer_id in db.execute(insert(Customer).returning(Customer.phone, Customer.id), new_customers):
+            customer_ids[phone] = customer_id
+    if updated_customers:
+        db.execute(update(Customer), updated_customers)
+
+    # Leads by (customer, policy ID)
+    leads = {}
+    for _, customer, lead in rows:
+        if lead:
+            customer_id = customer_ids[customer["phone"]]
+            leads[(customer_id, lead["policy_id"])] = {"customer_id": customer_id, **lead}
+    lead_ids = {}
+    if leads:
+        lead_ids = {
+            (customer_id, policy_id): lead_id
+            for customer_id, policy_id, lead_id in db.execute(
+                select(Lead.customer_id, Lead.policy_id, Lead.id).where(
+                    Lead.customer_id.in_({customer_id for customer_id, _ in leads}),
+                    Lead.policy_id.in_({policy_id for _, policy_id in leads})
+                )
+            )
+        }
+    new_leads = [values for key, values in leads.items() if key not in lead_ids]
+    updated_leads = [{"id": lead_ids[key], **values} for key, values in leads.items() if key in lead_ids]
+    if new_leads:
+        db.execute(insert(Lead), new_leads)
+    if updated_leads:
+        db.execute(update(Lead), updated_leads)
+
+    return {
+        "customers_created": len(new_customers),
+        "customers_updated": len(updated_customers),
+        "leads_created": len(new_leads),
+        "leads_updated": len(updated_leads)
+    }
+
+def run_bulk_import(stream: BinaryIO, fmt: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Import customers and leads from a CSV or NDJSON byte stream.
+
+    Args:
+        stream: Binary file-like object (UTF-8, optional BOM)
+        fmt: "csv" or "ndjson"
+        chunk_size: Valid rows written per transaction
+
+    Returns:
+        Dict with row counters and the first MAX_REPORTED_ERRORS row errors
+
+    Raises:
+        ValueError: If the format is unknown or the CSV header lacks required columns
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format: {fmt}")
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    records = iter_csv_records(text) if fmt == "csv" else iter_ndjson_records(text)
+
+    started = time.monotonic()
+    totals = {"rows": 0, "imported": 0, "failed": 0, "customers_created": 0, "customers_updated": 0,
+              "leads_created": 0, "leads_updated": 0}
+    errors = []
+
+    def fail(line_number: int, error: Any):
+        totals["failed"] += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"line": line_number, "error": str(error)})
+
+    def write(chunk: List[ImportRow]):
+        try:
+            counts = _write_chunk(db, chunk)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            if len(chunk) == 1:
+                fail(chunk[0][0], getattr(e, "orig", None) or e)
+                return
+            logger.warning(f"Import chunk ending at line {chunk[-1][0]} failed ({e}); retrying row by row")
+            for row in chunk:
+                write([row])
+            return
+        totals["imported"] += len(chunk)
+        for key, value in counts.items():
+            totals[key] += value
+
+    db = next(get_db())
+    try:
+        chunk: List[ImportRow] = []
+        for line_number, record in records:
+            totals["rows"] += 1
+            if isinstance(record, Exception):
+                fail(line_number, record)
+                continue
+            try:
+                customer, lead = parse_row(record)
+            except ValueError as e:
+                fail(line_number, e)
+                continue
+            chunk.append((line_number, customer, lead))
+            if len(chunk) >= chunk_size:
+                write(chunk)
+                chunk = []
+                logger.info(f"Imported {totals['imported']} of {totals['rows']} rows")
+        if chunk:
+            write(chunk)
+    finally:
+        db.close()
+        text.detach()
+
+    return {**totals, "errors": errors, "elapsed_seconds": round(time.monotonic() - started, 2)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import customers and leads")
+    parser.add_argument("path", help="CSV or NDJSON file")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="file format (default: from the file extension)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="rows per transaction")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from database import init_db
+    init_db()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    with open(args.path, "rb") as stream:
+        result = run_bulk_import(stream, fmt, chunk_size=args.chunk_size)
+    for error in result["errors"]:
+        print(f"line {error['line']}: {error['error']}")
+    print({key: value for key, value in result.items() if key != "errors"})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Bulk conversation summarization.
+Walks conversations in ID order, loads their messages batch by batch, summarizes
+them on a bounded worker pool and commits summaries together with a checkpoint,
+so an interrupted run resumes where it stopped.
+
+Usage:
+    python bulk_summarize.py --job nightly --status completed --workers 4
+"""
+import argparse
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models import Conversation, Message, SummaryJobCheckpoint
+from processors import summarize_messages
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATUSES = ("completed",)
+
+def _get_checkpoint(db: Session, job_name: str, restart: bool) -> SummaryJobCheckpoint:
+    """Load the checkpoint for a job, starting a new run if the last one finished or restart is set"""
+    checkpoint = db.query(SummaryJobCheckpoint).filter(SummaryJobCheckpoint.job_name == job_name).first()
+    if checkpoint is None:
+        checkpoint = SummaryJobCheckpoint(job_name=job_name)
+        db.add(checkpoint)
+    elif restart or checkpoint.status == "completed":
+        checkpoint.last_conversation_id = 0
+        checkpoint.processed = 0
+        checkpoint.failed = 0
+        checkpoint.started_at = datetime.utcnow()
+    else:
+        logger.info(f"Resuming summary job '{job_name}' after conversation {checkpoint.last_conversation_id}")
+    checkpoint.status = "running"
+    db.commit()
+    return checkpoint
+
+def _next_conversation_batch(db: Session, after_id: int, statuses: Sequence[str], only_missing: bool,
+                             batch_size: int) -> List[Conversation]:
+    """Fetch the next page of conversations with ID > after_id (keyset pagination)"""
+    query = db.query(Conversation).filter(Conversation.id > after_id)
+    if statuses:
+        query = query.filter(Conversation.status.in_(list(statuses)))
+    if only_missing:
+        query = query.filter(Conversation.summary.is_(None))
+    return query.order_by(Conversation.id).limit(batch_size).all()
+
+def _load_messages(db: Session, conversation_ids: List[int]) -> Dict[int, List[Message]]:
+    """Load the messages of several conversations in one query, grouped by conversation"""
+    grouped = defaultdict(list)
+    messages = db.query(Message).filter(
+        Message.conversation_id.in_(conversation_ids)
+    ).order_by(Message.conversation_id, Message.created_at, Message.id).all()
+    for msg in messages:
+        grouped[msg.conversation_id].append(msg)
+    return grouped
+
+def _summarize(conversation_id: int, messages: List[Message], language: str) -> Optional[str]:
+    """Summarize one conversation; returns None on failure (including Grok being down) so the batch keeps going"""
+    try:
+        return summarize_messages(messages, language)
+    except Exception as e:
+        logger.error(f"Error summarizing conversation {conversation_id}: {e}")
+        return None
+
+def run_bulk_summarization(job_name: str = "nightly", statuses: Sequence[str] = DEFAULT_STATUSES,
+                           only_missing: bool = True, batch_size: int = 100, max_workers: int = 4,
+                           restart: bool = False, limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Summarize conversations in bulk.
+
+    Each batch is committed in one transaction together with the checkpoint, so a
+    crashed run resumes after the last committed batch. Grok calls go through the
+    shared client, so its cache, rate limiter and circuit breaker still apply.
+
+    Args:
+        job_name: Checkpoint name; runs with the same name resume each other
+        statuses: Conversation statuses to include (empty for all)
+        only_missing: Skip conversations that already have a summary
+        batch_size: Conversations loaded and committed per batch
+        max_workers: Maximum concurrent Grok calls
+        restart: Ignore an unfinished checkpoint and start from the beginning
+        limit: Stop after this many conversations (for trial runs)
+
+    Returns:
+        Dict with run counters
+    """
+    db = next(get_db())
+    started = time.monotonic()
+    summarized = 0
+    failed = 0
+    empty = 0
+
+    try:
+        checkpoint = _get_checkpoint(db, job_name, restart)
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summarize") as executor:
+            while limit is None or summarized + failed + empty < limit:
+                size = batch_size if limit is None else min(batch_size, limit - summarized - failed - empty)
+                conversations = _next_conversation_batch(
+                    db, checkpoint.last_conversation_id, statuses, only_missing, size
+                )
+                if not conversations:
+                    break
+
+                messages_by_conversation = _load_messages(db, [c.id for c in conversations])
+
+                work = [c for c in conversations if messages_by_conversation.get(c.id)]
+                empty += len(conversations) - len(work)
+                summaries = list(executor.map(
+                    lambda c: _summarize(c.id, messages_by_conversation[c.id], c.language or "en"),
+                    work
+                ))
+
+                updates = []
+                for conversation, summary in zip(work, summaries):
+                    if summary is None:
+                        failed += 1
+                        continue
+                    updates.append({
+                        "id": conversation.id,
+                        "summary": summary,
+                        "summary_through_message_id": max(msg.id for msg in messages_by_conversation[conversation.id])
+                    })
+                summarized += len(updates)
+
+                # Summaries and checkpoint are committed together
+                if updates:
+                    db.bulk_update_mappings(Conversation, updates)
+                checkpoint.last_conversation_id = conversations[-1].id
+                checkpoint.processed = (checkpoint.processed or 0) + len(conversations)
+                checkpoint.failed = (checkpoint.failed or 0) + len(work) - len(updates)
+                db.commit()
+
+                logger.info(f"Summary job '{job_name}': {checkpoint.processed} conversations processed, "
+                            f"last id {checkpoint.last_conversation_id}")
+
+        if limit is None or summarized + failed + empty < limit:
+            checkpoint.status = "completed"
+        db.commit()
+
+        return {
+            "job_name": job_name,
+            "status": checkpoint.status,
+            "summarized": summarized,
+            "failed": failed,
+            "skipped_empty": empty,
+            "last_conversation_id": checkpoint.last_conversation_id,
+            "elapsed_seconds": round(time.monotonic() - started, 2)
+        }
+
+    except Exception as e:
+        logger.error(f"Summary job '{job_name}' failed: {e}")
+        db.rollback()
+        checkpoint = db.query(SummaryJobCheckpoint).filter(SummaryJobCheckpoint.job_name == job_name).first()
+        if checkpoint:
+            checkpoint.status = "failed"
+            db.commit()
+        raise
+    finally:
+        db.close()
+
+def get_job_status(job_name: str = "nightly") -> Optional[Dict[str, Any]]:
+    """
+    Get the checkpoint of a summary job.
+
+    Args:
+        job_name: Checkpoint name
+
+    Returns:
+        Checkpoint dict, or None if the job never ran
+    """
+    db = next(get_db())
+    try:
+        checkpoint = db.query(SummaryJobCheckpoint).filter(SummaryJobCheckpoint.job_name == job_name).first()
+        if not checkpoint:
+            return None
+        return {
+            "job_name": checkpoint.job_name,
+            "status": checkpoint.status,
+            "last_conversation_id": checkpoint.last_conversation_id,
+            "processed": checkpoint.processed,
+            "failed": checkpoint.failed,
+            "started_at": checkpoint.started_at.isoformat() if checkpoint.started_at else None,
+            "updated_at": checkpoint.updated_at.isoformat() if checkpoint.updated_at else None
+        }
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize conversations in bulk")
+    parser.add_argument("--job", default="nightly", help="checkpoint name used to resume runs")
+    parser.add_argument("--status", action="append", dest="statuses",
+                        help="conversation status to include (repeatable, default: completed)")
+    parser.add_argument("--all-statuses", action="store_true", help="include conversations in any status")
+    parser.add_argument("--resummarize", action="store_true", help="also redo conversations that have a summary")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4, help="maximum concurrent Grok calls")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--restart", action="store_true", help="ignore an unfinished checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from database import init_db
+    init_db()
+
+    result = run_bulk_summarization(
+        job_name=args.job,
+        statuses=() if args.all_statuses else (args.statuses or DEFAULT_STATUSES),
+        only_missing=not args.resummarize,
+        batch_size=args.batch_size,
+        max_workers=args.workers,
+        restart=args.restart,
+        limit=args.limit
+    )
+    print(result)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Circuit breaker for outbound LLM calls.
+Tracks a rolling window of call outcomes and latencies and fails fast while the
+upstream is degraded, probing periodically to detect recovery.
+"""
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+    pass
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker.
+
+    CLOSED: calls flow; the breaker opens once at least min_calls were made in the
+    window and either the error rate or the slow-call rate reaches its threshold.
+    OPEN: calls are rejected immediately for open_seconds.
+    HALF_OPEN: up to half_open_probes trial calls are let through; if they all
+    succeed the breaker closes, any failure re-opens it.
+
+    Every call allowed by allow_request() must be resolved with record_success(),
+    record_failure() or record_ignored() so half-open probe slots are released.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str = "grok", window_seconds: float = 60, min_calls: int = 10,
+                 error_rate_threshold: float = 0.5, slow_call_seconds: float = 10,
+                 slow_call_rate_threshold: float = 0.8, open_seconds: float = 30, half_open_probes: int = 1):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = self.CLOSED
+        self._calls = deque()  # (timestamp, ok, latency)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.transitions = deque(maxlen=50)
+
+    def _transition(self, new_state: str, reason: str):
+        """Change state and record the transition (caller holds the lock)"""
+        if new_state == self.state:
+            return
+        logger.warning(f"Circuit breaker '{self.name}' {self.state} -> {new_state}: {reason}")
+        self.transitions.append({
+            "from": self.state,
+            "to": new_state,
+            "reason": reason,
+            "at": datetime.utcnow().isoformat()
+        })
+        self.state = new_state
+        if new_state == self.OPEN:
+            self._opened_at = time.monotonic()
+        if new_state == self.HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        if new_state == self.CLOSED:
+            self._calls.clear()
+
+    def _prune(self, now: float):
+        while self._calls and self._calls[0][0] < now - self.window_seconds:
+            self._calls.popleft()
+
+    def _window_rates(self) -> Dict[str, float]:
+        total = len(self._calls)
+        if not total:
+            return {"calls": 0, "error_rate": 0.0, "slow_call_rate": 0.0}
+        errors = sum(1 for _, ok, _ in self._calls if not ok)
+        slow = sum(1 for _, _, latency in self._calls if latency >= self.slow_call_seconds)
+        return {"calls": total, "error_rate": errors / total, "slow_call_rate": slow / total}
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may proceed.
+
+        Returns:
+            True if the call may be made, False if it should fail fast
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self._transition(self.HALF_OPEN, f"open for {self.open_seconds}s, probing")
+
+            if self.state == self.HALF_OPEN:
+                if self._probes_in_flight + self._probe_successes >= self.half_open_probes:
+                    self.rejected += 1
+                    return False
+                self._probes_in_flight += 1
+
+            return True
+
+    def record_success(self, latency: float):
+        """Record a successful call and its latency in seconds"""
+        self._record(True, latency)
+
+    def record_failure(self, latency: float):
+        """Record a failed call (server error, timeout, connection error)"""
+        self._record(False, latency)
+
+    def record_ignored(self):
+        """Release a call that says nothing about upstream health (e.g. rate limited)"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+    def _record(self, ok: bool, latency: float):
+        with self._lock:
+            now = time.monotonic()
+            slow = latency >= self.slow_call_seconds
+
+            if self.state == self.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if not ok or slow:
+                    self._transition(self.OPEN, "probe failed" if not ok else f"probe slow ({latency:.1f}s)")
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._transition(self.CLOSED, "probes succeeded")
+                return
+
+            if self.state == self.OPEN:
+                # Call that started before the breaker opened
+                return
+
+            self._calls.append((now, ok, latency))
+            self._prune(now)
+            rates = self._window_rates()
+            if rates["calls"] < self.min_calls:
+                return
+            if rates["error_rate"] >= self.error_rate_threshold:
+                self._transition(self.OPEN, f"error rate {rates['error_rate']:.0%} over {rates['calls']} calls")
+            elif rates["slow_call_rate"] >= self.slow_call_rate_threshold:
+                self._transition(self.OPEN, f"slow call rate {rates['slow_call_rate']:.0%} over {rates['calls']} calls")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get breaker state for monitoring.
+
+        Returns:
+            Dict with state, rolling window rates, rejected count and recent transitions
+        """
+        with self._lock:
+            self._prune(time.monotonic())
+            rates = self._window_rates()
+            return {
+                "state": self.state,
+                "window_calls": rates["calls"],
+                "error_rate": round(rates["error_rate"], 3),
+                "slow_call_rate": round(rates["slow_call_rate"], 3),
+                "rejected": self.rejected,
+                "open_remaining": round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+                if self.state == self.OPEN else 0.0,
+                "transitions": list(self.transitions)
+            }
@@ -0,0 +1,120 @@
+"""
+Token-budgeted conversation context for Grok turns.
+Fills a token budget with the newest messages and folds everything older into a
+condensed transcript cached on the Conversation (context_summary), so prompt size
+stays bounded however long the thread gets. The condensed transcript is truncation,
+not summarization: one shortened line per message, keeping the opening lines and
+the most recent ones.
+"""
+import os
+from typing import List, Optional
+
+from models import Conversation, Message
+
+# Tokens of message history sent per turn (estimated locally)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# Maximum characters kept in the condensed transcript of older turns
+CONTEXT_SUMMARY_MAX_CHARS = int(os.getenv("CONTEXT_SUMMARY_MAX_CHARS", "1500"))
+# Opening lines that are never dropped (how the conversation started)
+CONTEXT_SUMMARY_HEAD_LINES = int(os.getenv("CONTEXT_SUMMARY_HEAD_LINES", "2"))
+# Characters of each older message kept in the condensed transcript
+CONTEXT_SUMMARY_LINE_CHARS = 160
+# Marks where lines between the head and the recent lines were dropped
+ELIDED_LINE = "- ..."
+
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token), good enough for budgeting"""
+    return len(text or "") // 4 + 1
+
+def message_tokens(msg: Message) -> int:
+    """Estimated tokens of a message including chat-format overhead"""
+    return estimate_tokens(msg.content) + MESSAGE_OVERHEAD_TOKENS
+
+class ContextWindow:
+    """Messages selected for a turn plus the condensed transcript of everything older"""
+
+    def __init__(self, messages: List[Message], summary: Optional[str], tokens: int, folded: int):
+        self.messages = messages  # chronological order
+        self.summary = summary
+        self.tokens = tokens
+        self.folded = folded  # messages newly folded into the summary this turn
+
+def _summary_line(msg: Message) -> str:
+    sender = "Customer" if msg.sender == "user" else "Agent"
+    content = " ".join((msg.content or "").split())
+    if len(content) > CONTEXT_SUMMARY_LINE_CHARS:
+        content = content[:CONTEXT_SUMMARY_LINE_CHARS - 3].rstrip() + "..."
+    return f"- {sender}: {content}"
+
+def fold_into_summary(summary: Optional[str], messages: List[Message], max_chars: int = CONTEXT_SUMMARY_MAX_CHARS,
+                      head_lines: int = CONTEXT_SUMMARY_HEAD_LINES) -> str:
+    """
+    Append older messages to the condensed transcript, truncating it to max_chars.
+
+    Each message becomes one shortened line; nothing is summarized, so folding never
+    costs an extra Grok call on the request path. Past max_chars the first head_lines
+    lines are kept and the oldest lines after them are dropped, marked by ELIDED_LINE.
+
+    Args:
+        summary: Existing condensed transcript
+        messages: Messages leaving the window, in chronological order
+        max_chars: Size cap of the transcript (the head and newest line are always kept)
+        head_lines: Opening lines that are never dropped
+
+    Returns:
+        Updated condensed transcript
+    """
+    lines = summary.split("\n") if summary else []
+    lines.extend(_summary_line(msg) for msg in messages)
+    head, tail = lines[:head_lines], lines[head_lines:]
+    elided = bool(tail) and tail[0] == ELIDED_LINE
+    if elided:
+        tail.pop(0)
+
+    def size() -> int:
+        return sum(len(line) + 1 for line in head + tail) + (len(ELIDED_LINE) + 1 if elided else 0)
+
+    while len(tail) > 1 and size() > max_chars:
+        tail.pop(0)
+        elided = True
+    return "\n".join(head + ([ELIDED_LINE] if elided else []) + tail)
+
+def select_context_window(conversation: Conversation, messages: List[Message],
+                          token_budget: int = CONTEXT_TOKEN_BUDGET) -> ContextWindow:
+    """
+    Select the newest messages that fit the token budget from already-loaded messages
+    and fold older ones into the conversation's condensed transcript. Updates
+    conversation.context_summary and conversation.context_summary_through_id; the
+    caller commits.
+
+    Args:
+        conversation: Conversation being processed
+        messages: Messages after context_summary_through_id, in chronological order
+        token_budget: Tokens of message history to send
+
+    Returns:
+        ContextWindow with messages in chronological order
+    """
+    newest_first = list(reversed(messages))
+
+    window = []
+    used = 0
+    for msg in newest_first:
+        cost = message_tokens(msg)
+        # Always keep the newest message, even if it exceeds the budget on its own
+        if window and used + cost > token_budget:
+            break
+        window.append(msg)
+        used += cost
+    window.reverse()
+
+    older = newest_first[len(window):]
+    if older:
+        older.reverse()
+        conversation.context_summary = fold_into_summary(conversation.context_summary, older)
+        conversation.context_summary_through_id = max(msg.id for msg in older)
+
+    return ContextWindow(window, conversation.context_summary, used, len(older))
@@ -0,0 +1,149 @@
+"""
+Incrementally maintained conversation rollup (conversation_stats table).
+List and dashboard views need message counts, last activity, latest mood and
+outcome and escalation count per conversation. Instead of rescanning Message rows
+on every view, a session after_flush hook folds each flushed message into its
+conversation's stats row with atomic increments, in the same transaction as the
+message insert. This covers every insert path, sync and async sessions alike.
+Escalations are counted through record_escalation (called by create_escalation_task).
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import case, delete, event, insert, or_, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from models import Conversation, ConversationStats, Message
+
+COUNTERS = ("user_message_count", "assistant_message_count", "user_word_count", "escalation_count")
+
+# Session.info key for escalations recorded since the last flush
+_ESCALATIONS_KEY = "conversation_stats_escalations"
+
+def record_escalation(db, conversation: Conversation):
+    """
+    Count an escalation of a conversation; applied when the session next flushes.
+    Only touches session state, so it works with sync and async sessions.
+
+    Args:
+        db: Database session (Session or AsyncSession)
+        conversation: Escalated conversation
+    """
+    escalations = db.info.setdefault(_ESCALATIONS_KEY, defaultdict(int))
+    escalations[conversation.id] += 1
+
+def stats_dict(stats: Optional[ConversationStats]) -> Optional[Dict[str, Any]]:
+    """Serialize a stats row for API responses (None if the conversation has none yet)"""
+    if stats is None:
+        return None
+    return {
+        "user_messages": stats.user_message_count,
+        "assistant_messages": stats.assistant_message_count,
+        "user_words": stats.user_word_count,
+        "escalations": stats.escalation_count,
+        "last_message_at": stats.last_message_at,
+        "latest_mood": stats.latest_mood,
+        "latest_outcome": stats.latest_outcome
+    }
+
+def _new_delta() -> Dict[str, Any]:
+    return {**{name: 0 for name in COUNTERS}, "last_message_at": None, "latest_mood": None, "latest_outcome": None}
+
+def _add_message(delta: Dict[str, Any], msg):
+    """Fold one message (ORM object or row, in chronological order) into a delta"""
+    if msg.sender == "user":
+        delta["user_message_count"] += 1
+        delta["user_word_count"] += len((msg.content or "").split())
+    elif msg.sender == "assistant":
+        delta["assistant_message_count"] += 1
+    delta["last_message_at"] = msg.created_at or delta["last_message_at"]
+    if msg.mood:
+        delta["latest_mood"] = msg.mood
+    if msg.outcome_hint:
+        delta["latest_outcome"] = msg.outcome_hint
+
+def _insert_stats(conn: Connection, conversation_id: int, delta: Dict[str, Any]):
+    conn.execute(insert(ConversationStats.__table__).values(
+        conversation_id=conversation_id, updated_at=datetime.utcnow(), **delta
+    ))
+
+def _apply_delta(conn: Connection, conversation_id: int, delta: Dict[str, Any]):
+    """Add a delta to a conversation's stats row (created if missing)"""
+    stats = ConversationStats.__table__.c
+    values = {name: stats[name] + delta[name] for name in COUNTERS if delta[name]}
+    last_message_at = delta["last_message_at"]
+    if last_message_at:
+        values["last_message_at"] = case(
+            (or_(stats.last_message_at.is_(None), stats.last_message_at < last_message_at), last_message_at),
+            else_=stats.last_message_at
+        )
+    for name in ("latest_mood", "latest_outcome"):
+        if delta[name] is not None:
+            values[name] = delta[name]
+    values["updated_at"] = datetime.utcnow()
+
+    result = conn.execute(update(ConversationStats.__table__)
+                          .where(stats.conversation_id == conversation_id).values(values))
+    if result.rowcount == 0:
+        # Conversation created before the rollup existed and not yet backfilled
+        _insert_stats(conn, conversation_id, delta)
+
+@event.listens_for(Session, "after_flush")
+def _update_stats_after_flush(session: Session, flush_context):
+    new_conversations = [obj.id for obj in session.new if isinstance(obj, Conversation)]
+    new_messages = sorted((obj for obj in session.new if isinstance(obj, Message)),
+                          key=lambda msg: (msg.created_at or datetime.min, msg.id))
+    escalations = session.info.pop(_ESCALATIONS_KEY, None) or {}
+    if not (new_conversations or new_messages or escalations):
+        return
+
+    deltas = defaultdict(_new_delta)
+    for msg in new_messages:
+        _add_message(deltas[msg.conversation_id], msg)
+    for conversation_id, count in escalations.items():
+        deltas[conversation_id]["escalation_count"] += count
+
+    conn = session.connection()
+    for conversation_id in new_conversations:
+        _insert_stats(conn, conversation_id, deltas.pop(conversation_id, _new_delta()))
+    for conversation_id, delta in deltas.items():
+        _apply_delta(conn, conversation_id, delta)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_escalations_after_rollback(session: Session, previous_transaction):
+    session.info.pop(_ESCALATIONS_KEY, None)
+
+def rebuild_conversation_stats(conn: Connection) -> int:
+    """
+    Recompute every conversation's stats row from its messages (backfill/repair).
+    Escalation counts are not recoverable from messages, so escalated conversations
+    are counted as escalated once.
+
+    Args:
+        conn: Connection in a transaction
+
+    Returns:
+        Number of stats rows written
+    """
+    deltas = defaultdict(_new_delta)
+    for conversation_id, status in conn.execute(select(Conversation.id, Conversation.status)):
+        deltas[conversation_id]["escalation_count"] = 1 if status == "escalated" else 0
+
+    rows = conn.execute(select(
+        Message.conversation_id, Message.sender, Message.content, Message.mood,
+        Message.outcome_hint, Message.created_at
+    ).order_by(Message.created_at, Message.id))
+    for row in rows:
+        if row.conversation_id in deltas:
+            _add_message(deltas[row.conversation_id], row)
+
+    conn.execute(delete(ConversationStats.__table__))
+    now = datetime.utcnow()
+    if deltas:
+        conn.execute(insert(ConversationStats.__table__), [
+            {"conversation_id": conversation_id, "updated_at": now, **delta}
+            for conversation_id, delta in deltas.items()
+        ])
+    return len(deltas)
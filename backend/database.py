@@ -1,19 +1,125 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import StaticPool, QueuePool, AsyncAdaptedQueuePool
+from typing import AsyncIterator, Optional
 import os
 
+# Async drivers for the async engine, by dialect
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+def async_database_url(url: str) -> str:
+    """Map a database URL to its async driver (sqlite:///x.db -> sqlite+aiosqlite:///x.db)"""
+    scheme, rest = url.split("://", 1)
+    if "+" in scheme or scheme not in ASYNC_DRIVERS:
+        return url  # explicit driver (or unknown dialect): use as given
+    return f"{scheme}+{ASYNC_DRIVERS[scheme]}://{rest}"
+
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./demo.db")
+# Same database through an async driver, used by request handlers
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+
+# SQLite engine mode:
+#   wal    - pooled connection per session, WAL journaling (concurrent readers, one writer)
+#   shared - one connection shared by all threads (in-memory databases, debugging)
+SQLITE_MODE = os.getenv("SQLITE_MODE", "wal").lower()
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))  # wait for the write lock
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # NORMAL is durable across app crashes in WAL mode
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))  # page cache per connection
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "10"))
+SQLITE_MAX_OVERFLOW = int(os.getenv("SQLITE_MAX_OVERFLOW", "20"))
+
+def _is_memory_database(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Configure each new SQLite connection for concurrent use"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+def _uses_shared_connection(url: str, sqlite_mode: str) -> bool:
+    return sqlite_mode == "shared" or _is_memory_database(url)
+
+def build_engine(url: str = DATABASE_URL, sqlite_mode: str = SQLITE_MODE):
+    """
+    Create the SQLAlchemy engine for a database URL.
+
+    File-backed SQLite in "wal" mode gets a connection pool (each session checks
+    out its own connection, so concurrent requests and background tasks never
+    share one) and per-connection pragmas. In-memory SQLite and "shared" mode use
+    a single StaticPool connection.
+
+    Args:
+        url: Database URL
+        sqlite_mode: "wal" or "shared" (ignored for other databases)
+
+    Returns:
+        SQLAlchemy engine
+    """
+    if not url.startswith("sqlite"):
+        return create_engine(url, echo=False)
+
+    if _uses_shared_connection(url, sqlite_mode):
+        return create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+            echo=False  # Set to True for SQL query logging
+        )
+
+    sqlite_engine = create_engine(
+        url,
+        # Pooled connections are handed between threads, but only one session uses each at a time
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=SQLITE_POOL_SIZE,
+        max_overflow=SQLITE_MAX_OVERFLOW,
+        echo=False  # Set to True for SQL query logging
+    )
+    event.listen(sqlite_engine, "connect", _set_sqlite_pragmas)
+    return sqlite_engine
+
+def build_async_engine(url: str = ASYNC_DATABASE_URL, sqlite_mode: str = SQLITE_MODE) -> AsyncEngine:
+    """
+    Create the async SQLAlchemy engine (aiosqlite for SQLite), pooled and configured
+    like build_engine. In-memory databases are private to each engine, so the sync
+    and async engines only share data for file-backed or server databases.
+
+    Args:
+        url: Async database URL
+        sqlite_mode: "wal" or "shared" (ignored for other databases)
+
+    Returns:
+        Async SQLAlchemy engine
+    """
+    if not url.startswith("sqlite"):
+        return create_async_engine(url, echo=False)
+
+    if _uses_shared_connection(url, sqlite_mode):
+        return create_async_engine(url, poolclass=StaticPool, echo=False)
+
+    sqlite_engine = create_async_engine(
+        url,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=SQLITE_POOL_SIZE,
+        max_overflow=SQLITE_MAX_OVERFLOW,
+        echo=False
+    )
+    event.listen(sqlite_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return sqlite_engine
 
 # Create SQLAlchemy engine
-# For SQLite, we use StaticPool to allow multiple threads to access the same connection
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-    poolclass=StaticPool if "sqlite" in DATABASE_URL else None,
-    echo=False  # Set to True for SQL query logging
-)
+engine = build_engine()
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -26,13 +132,48 @@ def get_db() -> Session:
     finally:
         db.close()
 
+# Async engine and session factory, created on first use so the async driver
+# is only required by code paths that use it
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+def get_async_engine() -> AsyncEngine:
+    """Get the async SQLAlchemy engine"""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        _async_engine = build_async_engine()
+        # Objects stay usable after commit: async sessions cannot lazily reload expired attributes
+        _async_session_factory = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+def AsyncSessionLocal() -> AsyncSession:
+    """Create a new async session"""
+    get_async_engine()
+    return _async_session_factory()
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def close_async_db():
+    """Dispose the async engine's pooled connections"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
 def init_db():
-    """Initialize database by creating all tables"""
+    """Initialize database by creating missing tables and applying pending migrations"""
     from models import Base
+    from migrations import run_migrations
     
     try:
         # Create all tables
         Base.metadata.create_all(bind=engine)
+        # Upgrade tables created by older versions (columns, indexes)
+        run_migrations(engine)
         print("Database initialized successfully")
     except Exception as e:
         print(f"Error initializing database: {e}")
@@ -0,0 +1,451 @@
+"""
+Response cache for Grok LLM calls.
+Bounded LRU + TTL caches keyed by a stable digest of the request, with an
+in-memory backend (per worker) and a SQLite backend (shared by all workers on a host).
+The async call path uses aget/aset, which keep blocking disk I/O off the event loop.
+"""
+import os
+import abc
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def make_cache_key(messages: List[Dict], agent_type: str, language: str) -> str:
+    """
+    Build a stable cache key for a Grok request.
+
+    Uses a SHA-256 digest of the canonical JSON form of the request, so the key is
+    identical across processes and restarts (unlike Python's randomized hash()).
+
+    Args:
+        messages: List of conversation messages
+        agent_type: Type of agent (renewal, policy_info, crosssell)
+        language: Language hint for Grok
+
+    Returns:
+        Hex digest string
+    """
+    content = json.dumps(
+        {"messages": messages, "agent_type": agent_type, "language": language},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class CacheBackend(abc.ABC):
+    """
+    Interface for Grok response cache backends.
+    Backends must be safe to call from multiple threads and must never raise on
+    lookup failures - a broken cache should behave like an empty one.
+    """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached response, or None if missing or expired"""
+
+    @abc.abstractmethod
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        """Store a response for ttl seconds (None uses the backend default)"""
+
+    @abc.abstractmethod
+    def clear(self):
+        """Remove all entries"""
+
+    @abc.abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """Async get; backends doing blocking I/O override this to run it off the event loop"""
+        return self.get(key)
+
+    async def aset(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        """Async set; backends doing blocking I/O override this to run it off the event loop"""
+        self.set(key, value, ttl)
+
+class ResponseCache(CacheBackend):
+    """
+    Thread-safe in-memory LRU cache with per-entry TTL.
+
+    Entries are stored as serialized JSON, which gives a real byte size for the
+    memory bound and means callers can never mutate a cached response in place.
+    The cache is bounded both by entry count and by total stored bytes; the least
+    recently used entries are evicted first.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 5 * 1024 * 1024, default_ttl: float = 30):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (expires_at, serialized value, size in bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached response.
+
+        Args:
+            key: Cache key from make_cache_key()
+
+        Returns:
+            Cached response dict or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, data, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        return json.loads(data)
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        """
+        Store a response in the cache.
+
+        Args:
+            key: Cache key from make_cache_key()
+            value: Response dict (must be JSON serializable)
+            ttl: Time to live in seconds (defaults to default_ttl, <= 0 skips caching)
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, data, size)
+            self._bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        """Remove an entry and update the byte count (caller holds the lock)"""
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dict with hits, misses, evictions, expirations, entries, bytes and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+class SQLiteResponseCache(CacheBackend):
+    """
+    On-disk LRU + TTL cache in a SQLite file shared by every worker process on a host.
+
+    Each thread (and each process) opens its own connection; the database runs in
+    WAL mode with a busy timeout so concurrent readers never block each other and
+    writers queue briefly instead of failing. Size caps are enforced inside a
+    BEGIN IMMEDIATE transaction so two workers cannot over-evict or overfill.
+    Hits are read-only: their last-access times are buffered in memory and
+    written in one batch by the next set(), or by a hit once access_flush_seconds
+    have passed, so cache hits do not queue for the write lock.
+    Hit/miss/eviction counters are per process; entries and bytes are global.
+    """
+
+    def __init__(self, path: str = "./grok_cache.db", max_entries: int = 10000,
+                 max_bytes: int = 50 * 1024 * 1024, default_ttl: float = 30, busy_timeout_ms: int = 5000,
+                 access_flush_seconds: float = 5):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.busy_timeout_ms = busy_timeout_ms
+        self.access_flush_seconds = access_flush_seconds
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        self._access_lock = threading.Lock()
+        self._pending_access = {}  # key -> last access time not yet written
+        self._access_flushed_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS grok_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_grok_cache_last_access ON grok_cache (last_access)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_grok_cache_expires_at ON grok_cache (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, reopening it after a fork"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached response.
+
+        Args:
+            key: Cache key from make_cache_key()
+
+        Returns:
+            Cached response dict or None if missing, expired or the cache is unavailable
+        """
+        try:
+            conn = self._connect()
+            now = time.time()
+            row = conn.execute("SELECT value, expires_at FROM grok_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+
+            value, expires_at = row
+            if expires_at <= now:
+                conn.execute("DELETE FROM grok_cache WHERE key = ? AND expires_at <= ?", (key, now))
+                self._count("expirations")
+                self._count("misses")
+                return None
+
+            self._count("hits")
+            if self._touch(key, now):
+                self._flush_access(conn)
+            return json.loads(value)
+        except sqlite3.Error as e:
+            logger.warning(f"Grok cache read failed: {str(e)}")
+            self._count("errors")
+            self._count("misses")
+            return None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        """
+        Store a response and evict expired, then least recently used, entries over the caps.
+
+        Args:
+            key: Cache key from make_cache_key()
+            value: Response dict (must be JSON serializable)
+            ttl: Time to live in seconds (defaults to default_ttl, <= 0 skips caching)
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        try:
+            conn = self._connect()
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO grok_cache (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, data, size, now + ttl, now)
+                )
+                # Buffered hits first, so eviction sees the real access order
+                self._write_access(conn)
+                expired = conn.execute("DELETE FROM grok_cache WHERE expires_at <= ?", (now,)).rowcount
+                evicted = self._enforce_caps(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._count("expirations", expired)
+            self._count("evictions", evicted)
+        except sqlite3.Error as e:
+            logger.warning(f"Grok cache write failed: {str(e)}")
+            self._count("errors")
+
+    def _touch(self, key: str, now: float) -> bool:
+        """Buffer a hit's access time; returns whether the buffer is due to be written"""
+        with self._access_lock:
+            self._pending_access[key] = now
+            return time.monotonic() - self._access_flushed_at >= self.access_flush_seconds
+
+    def _write_access(self, conn: sqlite3.Connection):
+        """Write buffered access times (caller holds the write lock)"""
+        with self._access_lock:
+            pending, self._pending_access = self._pending_access, {}
+            self._access_flushed_at = time.monotonic()
+        if pending:
+            conn.executemany(
+                "UPDATE grok_cache SET last_access = ? WHERE key = ? AND last_access < ?",
+                [(accessed, key, accessed) for key, accessed in pending.items()]
+            )
+
+    def _flush_access(self, conn: sqlite3.Connection):
+        """Write buffered access times in their own transaction (LRU order only, so failures are logged)"""
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_access(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.warning(f"Grok cache access update failed: {str(e)}")
+            self._count("errors")
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """get() in a worker thread, so disk I/O and lock waits never block the event loop"""
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        """set() in a worker thread, so disk I/O and lock waits never block the event loop"""
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    def _enforce_caps(self, conn: sqlite3.Connection) -> int:
+        """Evict least recently used entries until both caps hold (caller holds the write lock)"""
+        entries, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM grok_cache").fetchone()
+        evicted = 0
+        while entries > self.max_entries or total_bytes > self.max_bytes:
+            # Evict in small batches, oldest access first
+            batch = max(entries - self.max_entries, 1)
+            rows = conn.execute(
+                "SELECT key, size FROM grok_cache ORDER BY last_access LIMIT ?", (min(batch, 500),)
+            ).fetchall()
+            if not rows:
+                break
+            conn.executemany("DELETE FROM grok_cache WHERE key = ?", [(row[0],) for row in rows])
+            entries -= len(rows)
+            total_bytes -= sum(row[1] for row in rows)
+            evicted += len(rows)
+        return evicted
+
+    def clear(self):
+        """Remove all entries"""
+        try:
+            self._connect().execute("DELETE FROM grok_cache")
+        except sqlite3.Error as e:
+            logger.warning(f"Grok cache clear failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dict with per-process hits, misses, evictions, expirations, errors and
+            host-wide entries and bytes
+        """
+        try:
+            entries, total_bytes = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM grok_cache"
+            ).fetchone()
+        except sqlite3.Error:
+            entries, total_bytes = None, None
+
+        with self._counter_lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "sqlite",
+                "path": self.path,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "errors": self.errors,
+                "entries": entries,
+                "bytes": total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+def get_cache_backend(backend_type: str = None, **kwargs) -> CacheBackend:
+    """
+    Factory function to get the configured response cache backend.
+
+    Args:
+        backend_type: "memory" or "sqlite". If None, uses environment variable GROK_CACHE_BACKEND
+        **kwargs: Overrides for the backend settings (max_entries, max_bytes, default_ttl, path)
+
+    Returns:
+        CacheBackend instance
+    """
+    if backend_type is None:
+        backend_type = os.getenv("GROK_CACHE_BACKEND", "memory")
+
+    settings = {
+        "max_entries": int(os.getenv("GROK_CACHE_MAX_ENTRIES", "1000")),
+        "max_bytes": int(os.getenv("GROK_CACHE_MAX_BYTES", str(5 * 1024 * 1024))),
+        "default_ttl": float(os.getenv("GROK_CACHE_TTL", "30"))
+    }
+
+    if backend_type.lower() == "memory":
+        settings.update(kwargs)
+        return ResponseCache(**settings)
+    elif backend_type.lower() == "sqlite":
+        settings["path"] = os.getenv("GROK_CACHE_PATH", "./grok_cache.db")
+        settings["access_flush_seconds"] = float(os.getenv("GROK_CACHE_ACCESS_FLUSH_SECONDS", "5"))
+        settings.update(kwargs)
+        return SQLiteResponseCache(**settings)
+    else:
+        raise ValueError(f"Unknown cache backend: {backend_type}")
@@ -0,0 +1,349 @@
+"""
+Local Grok stand-in server for load testing.
+OpenAI-compatible /chat/completions endpoint that replays demo_data fixtures and
+recorded exchanges with configurable latency and error injection, so the
+conversation pipeline can be exercised without spending Grok quota.
+
+Usage:
+    python grok_standin.py --port 8001 --latency lognormal:-0.7,0.4 --error-rate 0.02
+    GROK_API_BASE=http://localhost:8001/v1 uvicorn app:app
+
+Record mode forwards requests to the real API and appends each exchange to the
+recordings file; replay mode serves recorded exchanges first and falls back to
+the demo_data fixtures:
+    python grok_standin.py --mode record --upstream https://api.x.ai/v1
+"""
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import argparse
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+DEMO_DATA_DIR = Path(__file__).parent / "demo_data"
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Parse a latency distribution spec into a sampler returning seconds.
+
+    Supported specs: "none", "fixed:S", "uniform:MIN,MAX", "normal:MEAN,STDDEV",
+    "lognormal:MU,SIGMA" (parameters of the underlying normal, in log-seconds).
+
+    Args:
+        spec: Distribution spec
+
+    Returns:
+        Zero-argument function sampling a latency in seconds
+    """
+    kind, _, params = (spec or "none").partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()]
+    kind = kind.strip().lower()
+    if kind == "none":
+        return lambda: 0.0
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda: random.lognormvariate(values[0], values[1])
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+def request_key(messages: List[Dict[str, Any]]) -> str:
+    """Stable key of a chat request, used to match recorded exchanges"""
+    canonical = json.dumps(
+        [{"role": m.get("role"), "content": m.get("content")} for m in messages],
+        sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def load_fixtures(data_dir: Path = DEMO_DATA_DIR) -> List[Dict[str, Any]]:
+    """
+    Load the expected_grok_response fixtures from demo_data.
+
+    Args:
+        data_dir: Directory with *.json fixture files
+
+    Returns:
+        List of {"name", "transcript", "response"} dicts
+    """
+    fixtures = []
+    for path in sorted(data_dir.glob("*.json")):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping fixture {path.name}: {e}")
+            continue
+        if isinstance(data, dict) and isinstance(data.get("expected_grok_response"), dict):
+            fixtures.append({
+                "name": path.stem,
+                "transcript": data.get("transcript", ""),
+                "response": data["expected_grok_response"]
+            })
+    return fixtures
+
+class StandinConfig:
+    """Stand-in server settings, read from STANDIN_* environment variables"""
+
+    def __init__(self):
+        self.mode = os.getenv("STANDIN_MODE", "replay")  # replay, record
+        self.latency = os.getenv("STANDIN_LATENCY", "lognormal:-0.7,0.4")
+        self.error_rate = float(os.getenv("STANDIN_ERROR_RATE", "0"))
+        self.rate_limit_rate = float(os.getenv("STANDIN_RATE_LIMIT_RATE", "0"))
+        self.retry_after = float(os.getenv("STANDIN_RETRY_AFTER", "1"))
+        self.timeout_rate = float(os.getenv("STANDIN_TIMEOUT_RATE", "0"))
+        self.timeout_seconds = float(os.getenv("STANDIN_TIMEOUT_SECONDS", "60"))
+        self.invalid_json_rate = float(os.getenv("STANDIN_INVALID_JSON_RATE", "0"))
+        self.recordings_path = os.getenv("STANDIN_RECORDINGS", "grok_recordings.jsonl")
+        self.upstream_base = os.getenv("STANDIN_UPSTREAM_BASE", "https://api.x.ai/v1")
+        self.upstream_key = os.getenv("STANDIN_UPSTREAM_KEY") or os.getenv("GROK_API_KEY")
+        self.seed = os.getenv("STANDIN_SEED")
+
+class GrokStandin:
+    """
+    Response source and fault injector behind the stand-in endpoint.
+
+    Replay order: recorded exchange with the same messages, then the fixture whose
+    transcript matches the last user message, then a fixture picked
+    deterministically from the last user message so repeated runs behave the same.
+    """
+
+    def __init__(self, config: StandinConfig):
+        self.config = config
+        if config.seed is not None:
+            random.seed(config.seed)
+        self.sample_latency = parse_latency(config.latency)
+        self.fixtures = load_fixtures()
+        self.recordings = self._load_recordings()
+        self._record_lock = threading.Lock()
+        self.counters = {
+            "requests": 0, "replayed_recordings": 0, "replayed_fixtures": 0, "recorded": 0,
+            "errors_5xx": 0, "rate_limited": 0, "timeouts": 0, "invalid_json": 0
+        }
+
+    def _load_recordings(self) -> Dict[str, str]:
+        recordings = {}
+        path = Path(self.config.recordings_path)
+        if not path.exists():
+            return recordings
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    recordings[entry["key"]] = entry["content"]
+                except (ValueError, KeyError):
+                    continue
+        logger.info(f"Loaded {len(recordings)} recorded exchanges from {path}")
+        return recordings
+
+    def _record(self, key: str, messages: List[Dict[str, Any]], content: str):
+        entry = {"key": key, "messages": messages, "content": content, "recorded_at": time.time()}
+        with self._record_lock:
+            self.recordings[key] = content
+            with open(self.config.recordings_path, "a") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.counters["recorded"] += 1
+
+    def replay_content(self, messages: List[Dict[str, Any]]) -> str:
+        """Pick the reply content for a request in replay mode"""
+        key = request_key(messages)
+        if key in self.recordings:
+            self.counters["replayed_recordings"] += 1
+            return self.recordings[key]
+
+        self.counters["replayed_fixtures"] += 1
+        if not self.fixtures:
+            return json.dumps({
+                "mood": {"label": "neutral", "confidence": 0.5},
+                "action": "reply",
+                "outcome_hint": {"label": "Needs Follow-up", "confidence": 0.5},
+                "assistant_text": "Thank you for your message. How can I help you today?",
+                "summary": ["Customer contacted", "Stand-in reply", "No fixtures loaded"]
+            })
+
+        last_user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        for fixture in self.fixtures:
+            if fixture["transcript"] and fixture["transcript"].strip() == last_user.strip():
+                return json.dumps(fixture["response"])
+        index = int(hashlib.sha256(last_user.encode("utf-8")).hexdigest(), 16) % len(self.fixtures)
+        return json.dumps(self.fixtures[index]["response"])
+
+    async def record_content(self, body: Dict[str, Any], authorization: Optional[str]) -> Dict[str, Any]:
+        """Forward a request to the real API, record the exchange and return the upstream response"""
+        payload = {k: v for k, v in body.items() if k != "stream"}
+        auth = f"Bearer {self.config.upstream_key}" if self.config.upstream_key else authorization
+        async with httpx.AsyncClient(timeout=self.config.timeout_seconds) as client:
+            response = await client.post(
+                f"{self.config.upstream_base}/chat/completions",
+                json=payload,
+                headers={"Authorization": auth or "", "Content-Type": "application/json"}
+            )
+        if response.status_code != 200:
+            return {"status": response.status_code, "body": response.text}
+        content = response.json()["choices"][0]["message"]["content"]
+        self._record(request_key(body.get("messages", [])), body.get("messages", []), content)
+        return {"status": 200, "content": content}
+
+    def inject_fault(self) -> Optional[str]:
+        """Roll the configured error rates; returns the fault to inject, if any"""
+        roll = random.random()
+        for fault, rate in (("timeout", self.config.timeout_rate),
+                            ("rate_limited", self.config.rate_limit_rate),
+                            ("error_5xx", self.config.error_rate),
+                            ("invalid_json", self.config.invalid_json_rate)):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+def _completion(model: str, content: str) -> Dict[str, Any]:
+    prompt_tokens = 0
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens}
+    }
+
+async def _stream_completion(model: str, content: str, latency: float):
+    """Yield SSE chunks, spreading the sampled latency across the reply"""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    chunks = [content[i:i + 16] for i in range(0, len(content), 16)] or [""]
+    first_token = latency * 0.3
+    per_chunk = (latency - first_token) / len(chunks)
+    await asyncio.sleep(first_token)
+    for piece in chunks:
+        data = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(data)}\n\n"
+        if per_chunk > 0:
+            await asyncio.sleep(per_chunk)
+    yield "data: [DONE]\n\n"
+
+def create_app(config: Optional[StandinConfig] = None) -> FastAPI:
+    """
+    Build the stand-in FastAPI app.
+
+    Args:
+        config: Settings (defaults to STANDIN_* environment variables)
+
+    Returns:
+        FastAPI app serving /v1/chat/completions and /stats
+    """
+    standin = GrokStandin(config or StandinConfig())
+    app = FastAPI(title="Grok Stand-in", version="1.0.0")
+    app.state.standin = standin
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        standin.counters["requests"] += 1
+        model = body.get("model", "grok-standin")
+        messages = body.get("messages", [])
+
+        if standin.config.mode == "record":
+            result = await standin.record_content(body, request.headers.get("Authorization"))
+            if result["status"] != 200:
+                return JSONResponse(status_code=result["status"], content={"error": {"message": result["body"]}})
+            content = result["content"]
+            latency = 0.0
+        else:
+            latency = standin.sample_latency()
+            fault = standin.inject_fault()
+            if fault == "timeout":
+                standin.counters["timeouts"] += 1
+                await asyncio.sleep(standin.config.timeout_seconds)
+                return JSONResponse(status_code=504, content={"error": {"message": "stand-in timeout"}})
+            if fault == "rate_limited":
+                standin.counters["rate_limited"] += 1
+                return JSONResponse(
+                    status_code=429,
+                    content={"error": {"message": "stand-in rate limit"}},
+                    headers={"Retry-After": str(standin.config.retry_after)}
+                )
+            if fault == "error_5xx":
+                standin.counters["errors_5xx"] += 1
+                await asyncio.sleep(latency)
+                return JSONResponse(status_code=503, content={"error": {"message": "stand-in upstream error"}})
+            if fault == "invalid_json":
+                standin.counters["invalid_json"] += 1
+                content = "Sure! Here is my reply, but not as JSON."
+            else:
+                content = standin.replay_content(messages)
+
+        if body.get("stream"):
+            return StreamingResponse(_stream_completion(model, content, latency), media_type="text/event-stream")
+
+        await asyncio.sleep(latency)
+        return _completion(model, content)
+
+    app.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/chat/completions", chat_completions, methods=["POST"])
+
+    @app.get("/stats")
+    async def stats():
+        """Request counters by outcome"""
+        return {
+            "mode": standin.config.mode,
+            "latency": standin.config.latency,
+            "fixtures": len(standin.fixtures),
+            "recordings": len(standin.recordings),
+            **standin.counters
+        }
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Grok stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--mode", choices=["replay", "record"], help="overrides STANDIN_MODE")
+    parser.add_argument("--latency", help="latency spec, e.g. fixed:0.5, uniform:0.2,1.5, lognormal:-0.7,0.4")
+    parser.add_argument("--error-rate", type=float, help="share of 503 responses")
+    parser.add_argument("--rate-limit-rate", type=float, help="share of 429 responses")
+    parser.add_argument("--timeout-rate", type=float, help="share of requests that hang until timeout")
+    parser.add_argument("--invalid-json-rate", type=float, help="share of replies that are not JSON")
+    parser.add_argument("--recordings", help="JSONL file of recorded exchanges")
+    parser.add_argument("--upstream", help="real API base for record mode")
+    parser.add_argument("--seed", help="random seed for reproducible runs")
+    args = parser.parse_args()
+
+    config = StandinConfig()
+    for attr, value in (("mode", args.mode), ("latency", args.latency), ("error_rate", args.error_rate),
+                        ("rate_limit_rate", args.rate_limit_rate), ("timeout_rate", args.timeout_rate),
+                        ("invalid_json_rate", args.invalid_json_rate), ("recordings_path", args.recordings),
+                        ("upstream_base", args.upstream), ("seed", args.seed)):
+        if value is not None:
+            setattr(config, attr, value)
+
+    logging.basicConfig(level=logging.INFO)
+    import uvicorn
+    uvicorn.run(create_app(config), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
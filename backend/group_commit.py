@@ -0,0 +1,177 @@
+"""
+Group commit for the async write path.
+Handlers and background turns submit their inserts/updates as write functions
+instead of committing their own sessions. A single writer task per event loop
+collects the writes that arrive within a short window (plus everything queued
+while the previous commit was in flight), applies them in one session and
+commits once, then acknowledges each caller. Under SQLite every commit is a
+write-lock handoff (and an fsync at synchronous=FULL), so batching lets write
+throughput grow with load instead of with commit rate.
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "2"))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "64"))
+
+# Applies changes to the writer's session (without committing) and returns a result
+Write = Callable[[AsyncSession], Awaitable[Any]]
+
+class GroupCommitWriter:
+    """
+    Batch async writes into shared transactions.
+
+    submit() resolves only after the transaction holding the write has committed,
+    so an acknowledged write is as durable as a direct commit. If a batch fails,
+    its writes are retried one per transaction, so a failing write only fails
+    its own caller. Write functions must create their objects inside the call,
+    since a retried write runs again in a fresh session.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+                 window_ms: float = GROUP_COMMIT_WINDOW_MS, max_batch: int = GROUP_COMMIT_MAX_BATCH):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._loop = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.writes = 0
+        self.failed = 0
+        self.retried_batches = 0
+        self.max_batch_seen = 0
+        self.commit_seconds = 0.0
+
+    async def submit(self, write: Write) -> Any:
+        """
+        Queue a write and wait until it has been committed.
+
+        Args:
+            write: Coroutine function applying the changes to the given session
+
+        Returns:
+            Result of write
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+        future = loop.create_future()
+        self._queue.put_nowait((write, future))
+        return await future
+
+    async def close(self):
+        """Commit the writes already queued and stop the writer task"""
+        if self._worker is None or self._worker.done() or self._loop is not asyncio.get_running_loop():
+            return
+        self._queue.put_nowait(None)
+        await self._worker
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            await asyncio.sleep(self.window)  # let concurrent writers join the batch
+            stop = False
+            while len(batch) < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._commit(batch)
+            if stop:
+                return
+
+    async def _apply(self, batch: List[Tuple[Write, asyncio.Future]]) -> List[Any]:
+        async with self.session_factory() as db:
+            try:
+                results = [await write(db) for write, _ in batch]
+                await db.commit()
+                return results
+            except BaseException:
+                await db.rollback()
+                raise
+
+    async def _commit(self, batch: List[Tuple[Write, asyncio.Future]]):
+        started = time.monotonic()
+        try:
+            results = await self._apply(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                self.failed += 1
+                future = batch[0][1]
+                if not future.done():
+                    future.set_exception(e)
+                return
+            logger.warning(f"Group commit of {len(batch)} writes failed ({e}); retrying one per transaction")
+            self.retried_batches += 1
+            for item in batch:
+                await self._commit([item])
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        self.commit_seconds += time.monotonic() - started
+        for (_, future), result in zip(batch, results):
+            if not future.done():  # caller may have been cancelled
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get counters: committed batches and writes, batch sizes, failures"""
+        return {
+            "batches": self.batches,
+            "writes": self.writes,
+            "failed": self.failed,
+            "retried_batches": self.retried_batches,
+            "avg_batch": round(self.writes / self.batches, 2) if self.batches else 0,
+            "max_batch": self.max_batch_seen,
+            "avg_commit_ms": round(self.commit_seconds * 1000 / self.batches, 2) if self.batches else 0,
+            "queued": self._queue.qsize() if self._queue else 0
+        }
+
+writer = GroupCommitWriter()
+
+async def group_commit(write: Write) -> Any:
+    """Apply a write through the shared group-commit writer; returns once committed"""
+    return await writer.submit(write)
+
+async def group_commit_add(make: Callable[[], Any]) -> Any:
+    """
+    Group-commit a new object.
+
+    Args:
+        make: Builds the object (called again if the write is retried)
+
+    Returns:
+        The committed object (detached, with its ID loaded)
+    """
+    async def write(db: AsyncSession) -> Any:
+        obj = make()
+        db.add(obj)
+        return obj
+    return await group_commit(write)
+
+async def close_group_commit():
+    """Flush and stop the shared writer (on shutdown)"""
+    await writer.close()
+
+def get_group_commit_stats() -> Dict[str, Any]:
+    """Get the shared writer's counters"""
+    return writer.stats()
@@ -0,0 +1,566 @@
+"""
+Durable job queue (jobs table) for background processing.
+Request handlers enqueue a job in the same transaction as the row it refers to
+(e.g. the inbound interaction or message), so accepted work survives restarts.
+Worker processes claim due jobs with an atomic UPDATE ... RETURNING and hold a
+lease (visibility timeout) while running them; the lease is extended while the
+job runs, so a lease only expires when its worker died, and the job is then
+handed to another worker. Failed jobs are retried with exponential backoff and
+jitter and dead-lettered (status "dead") after max_attempts. Delivery is
+at-least-once, so handlers must tolerate re-runs: handle_inbound_message
+checkpoints a sent reply in the job payload and skips retries of messages that
+were already answered, so a retry does not call Grok or text the customer again
+(only a worker dying between the send and its checkpoint can repeat a send).
+
+Ingestion and processing scale independently: the API only inserts jobs, and
+any number of workers (processes, on any host sharing the database) drain them.
+The API process also runs an embedded worker unless JOB_EMBEDDED_WORKER=false.
+
+Usage:
+    python job_queue.py worker --concurrency 16
+    python job_queue.py status
+    python job_queue.py requeue-dead [--kind handle_inbound_message]
+    python job_queue.py purge --older-than-days 7
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import signal
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+from group_commit import group_commit
+from models import Job
+from processors import (process_inbound_interaction, ahandle_inbound_message, ahas_reply_after,
+                        start_outbound_conversation, generate_conversation_summary)
+
+logger = logging.getLogger(__name__)
+
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "300"))  # lease length in seconds
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))  # first retry delay, doubled per attempt
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "900"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))  # idle wait between claims
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "8"))  # jobs run at once per worker
+JOB_EMBEDDED_WORKER = os.getenv("JOB_EMBEDDED_WORKER", "true").lower() in ("1", "true", "yes", "on")
+JOB_SHUTDOWN_GRACE_SECONDS = float(os.getenv("JOB_SHUTDOWN_GRACE_SECONDS", "10"))
+
+JOB_STATUSES = ("queued", "running", "done", "dead")
+
+async def _process_inbound_interaction(job: Dict[str, Any]):
+    await asyncio.to_thread(process_inbound_interaction, job["payload"]["interaction_id"])
+
+async def _checkpoint(job: Dict[str, Any], **values: Any):
+    """Merge values into a running job's payload, so a retry of the job can pick up from them"""
+    jobs = Job.__table__.c
+    job["payload"] = {**job["payload"], **values}
+    async def write(db: AsyncSession):
+        await db.execute(update(Job.__table__)
+                         .where(jobs.id == job["id"], jobs.status == "running", jobs.attempts == job["attempts"])
+                         .values(payload=job["payload"], updated_at=datetime.utcnow()))
+    await group_commit(write)
+
+async def _handle_inbound_message(job: Dict[str, Any]):
+    payload = job["payload"]
+    conversation_id, message_id = payload["conversation_id"], payload["message_id"]
+    # A retry must not answer (and text the customer) twice: skip it if the reply was
+    # saved by an earlier attempt (e.g. only the job acknowledgment failed), or a later
+    # turn has answered since, with this message in its context
+    if job["attempts"] > 1 and await ahas_reply_after(conversation_id, message_id):
+        logger.info(f"Message {message_id} already answered; skipping retry of job {job['id']}")
+        return
+    
+    async def on_sent(grok_response: Dict[str, Any], send_result: Dict[str, Any]):
+        # Record the send before saving the reply; if the save fails, the retry saves
+        # this reply instead of calling Grok and sending again
+        try:
+            await _checkpoint(job, sent_reply={"grok_response": grok_response, "send_result": send_result})
+        except Exception as e:
+            logger.error(f"Could not checkpoint the reply sent for job {job['id']}: {e}")
+    
+    result = await ahandle_inbound_message(conversation_id, message_id, payload.get("language"),
+                                           sent_reply=payload.get("sent_reply"), on_sent=on_sent)
+    if "error" in result:
+        if result.get("permanent"):
+            logger.warning(f"Skipping message {message_id}: {result['error']}")
+            return
+        raise RuntimeError(result["error"])
+
+async def _start_outbound_conversation(job: Dict[str, Any]):
+    await asyncio.to_thread(start_outbound_conversation, job["payload"])
+
+async def _generate_conversation_summary(job: Dict[str, Any]):
+    await asyncio.to_thread(generate_conversation_summary, job["payload"]["conversation_id"])
+
+# Job kind -> handler, called with the claimed job (id, kind, payload, attempts,
+# max_attempts); a job fails when its handler raises
+JOB_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]] = {
+    "process_inbound_interaction": _process_inbound_interaction,
+    "handle_inbound_message": _handle_inbound_message,
+    "start_outbound_conversation": _start_outbound_conversation,
+    "generate_conversation_summary": _generate_conversation_summary,
+}
+
+def enqueue_job(db, kind: str, payload: Dict[str, Any], delay_seconds: float = 0,
+                max_attempts: int = JOB_MAX_ATTEMPTS) -> Job:
+    """
+    Add a job to a session; it is queued when the session commits.
+    Only touches session state, so it works with sync and async sessions.
+
+    Args:
+        db: Database session (Session or AsyncSession)
+        kind: Job kind (key of JOB_HANDLERS)
+        payload: JSON-serializable handler arguments
+        delay_seconds: Run no earlier than this many seconds from now
+        max_attempts: Attempts before the job is dead-lettered
+
+    Returns:
+        The new job
+
+    Raises:
+        ValueError: If the kind is unknown
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    now = datetime.utcnow()
+    job = Job(kind=kind, payload=payload, status="queued", attempts=0, max_attempts=max_attempts,
+              available_at=now + timedelta(seconds=delay_seconds), created_at=now, updated_at=now)
+    db.add(job)
+    return job
+
+async def group_commit_add_with_job(make: Callable[[], Any], kind: str,
+                                    payload: Callable[[Any], Dict[str, Any]]) -> Any:
+    """
+    Group-commit a new object together with a job that processes it.
+
+    Args:
+        make: Builds the object (called again if the write is retried)
+        kind: Job kind
+        payload: Builds the job payload from the flushed object (e.g. from its ID)
+
+    Returns:
+        The committed object (detached, with its ID loaded)
+    """
+    async def write(db: AsyncSession) -> Any:
+        obj = make()
+        db.add(obj)
+        await db.flush()
+        enqueue_job(db, kind, payload(obj))
+        return obj
+    obj = await group_commit(write)
+    notify()
+    return obj
+
+async def submit_job(kind: str, payload: Dict[str, Any]) -> int:
+    """
+    Group-commit a job on its own.
+
+    Returns:
+        Job ID
+    """
+    async def write(db: AsyncSession) -> Job:
+        return enqueue_job(db, kind, payload)
+    job = await group_commit(write)
+    notify()
+    return job.id
+
+def retry_delay(attempts: int) -> float:
+    """Backoff before the next attempt: base * 2^(attempts - 1), capped, with jitter in [50%, 100%]"""
+    delay = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.5, 1.0)
+
+async def claim_jobs(worker_id: str, limit: int, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT) -> List[Dict[str, Any]]:
+    """
+    Lease up to limit due jobs, oldest first.
+
+    The select and update are one statement, so concurrent workers never claim
+    the same job (SQLite serializes writers; other databases skip locked rows).
+
+    Args:
+        worker_id: Lease holder
+        limit: Maximum number of jobs to claim
+        visibility_timeout: Lease length in seconds
+
+    Returns:
+        Claimed jobs as dicts (id, kind, payload, attempts, max_attempts)
+    """
+    jobs = Job.__table__.c
+    now = datetime.utcnow()
+    due = (select(jobs.id)
+           .where(jobs.status == "queued", jobs.available_at <= now)
+           .order_by(jobs.available_at, jobs.id)
+           .limit(limit)
+           .with_for_update(skip_locked=True))
+    claim = (update(Job.__table__)
+             .where(jobs.id.in_(due.scalar_subquery()))
+             .values(status="running", attempts=jobs.attempts + 1, locked_by=worker_id,
+                     available_at=now + timedelta(seconds=visibility_timeout), updated_at=now)
+             .returning(jobs.id, jobs.kind, jobs.payload, jobs.attempts, jobs.max_attempts))
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(claim)).mappings().all()
+        await db.commit()
+    return sorted((dict(row) for row in rows), key=lambda job: job["id"])
+
+async def extend_leases(worker_id: str, job_ids: List[int], visibility_timeout: float = JOB_VISIBILITY_TIMEOUT):
+    """Push back the lease expiry of jobs this worker is still running"""
+    if not job_ids:
+        return
+    jobs = Job.__table__.c
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Job.__table__)
+                         .where(jobs.id.in_(job_ids), jobs.status == "running", jobs.locked_by == worker_id)
+                         .values(available_at=now + timedelta(seconds=visibility_timeout), updated_at=now))
+        await db.commit()
+
+async def recover_expired_leases() -> int:
+    """
+    Requeue running jobs whose lease expired (their worker died), or dead-letter
+    them if they have used up their attempts.
+
+    Returns:
+        Number of jobs recovered
+    """
+    jobs = Job.__table__.c
+    now = datetime.utcnow()
+    expired = (jobs.status == "running", jobs.available_at <= now)
+    async with AsyncSessionLocal() as db:
+        dead = await db.execute(update(Job.__table__)
+                                .where(*expired, jobs.attempts >= jobs.max_attempts)
+                                .values(status="dead", locked_by=None, finished_at=now, updated_at=now,
+                                        last_error="Lease expired (worker lost) on the last attempt"))
+        requeued = await db.execute(update(Job.__table__)
+                                    .where(*expired)
+                                    .values(status="queued", locked_by=None, available_at=now, updated_at=now,
+                                            last_error="Lease expired (worker lost)"))
+        await db.commit()
+    if dead.rowcount or requeued.rowcount:
+        logger.warning(f"Recovered expired job leases: {requeued.rowcount} requeued, {dead.rowcount} dead-lettered")
+    return dead.rowcount + requeued.rowcount
+
+def _leased(job: Dict[str, Any], worker_id: str):
+    """Conditions under which this worker still holds the job's lease"""
+    jobs = Job.__table__.c
+    return (jobs.id == job["id"], jobs.status == "running", jobs.locked_by == worker_id,
+            jobs.attempts == job["attempts"])
+
+async def _finish(job: Dict[str, Any], worker_id: str, values: Dict[str, Any]) -> bool:
+    """Group-commit a job's new state if the lease is still ours; returns whether it was"""
+    async def write(db: AsyncSession) -> int:
+        result = await db.execute(update(Job.__table__).where(*_leased(job, worker_id)).values(values))
+        return result.rowcount
+    if await group_commit(write):
+        return True
+    logger.warning(f"Job {job['id']} lost its lease before finishing; its outcome is left to the new holder")
+    return False
+
+class JobWorker:
+    """
+    Claims and runs jobs, up to concurrency at a time, on the running event loop.
+
+    Async handlers run on the loop; sync processors run in threads. Job state
+    changes are group-committed, so acknowledgments of concurrent jobs share
+    transactions.
+    """
+
+    def __init__(self, concurrency: int = JOB_WORKER_CONCURRENCY, worker_id: Optional[str] = None,
+                 poll_interval: float = JOB_POLL_INTERVAL, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT):
+        self.concurrency = concurrency
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self._running: Dict[int, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.claimed = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.dead = 0
+        self.job_seconds = 0.0
+
+    def notify(self):
+        """Wake the worker to claim new jobs now (call on the worker's event loop)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stop(self):
+        """Stop claiming jobs; run() returns once the running jobs are finished"""
+        self._stopping = True
+        self.notify()
+
+    async def run(self, shutdown_grace: Optional[float] = None):
+        """
+        Claim and run jobs until stop() is called.
+
+        Args:
+            shutdown_grace: Seconds to wait for running jobs after stop(); jobs still
+                running then are cancelled and requeued (None waits for them)
+        """
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        next_maintenance = 0.0
+        logger.info(f"Job worker {self.worker_id} started (concurrency {self.concurrency})")
+        try:
+            while not self._stopping:
+                self._wakeup.clear()
+                try:
+                    if time.monotonic() >= next_maintenance:
+                        await recover_expired_leases()
+                        await extend_leases(self.worker_id, list(self._running), self.visibility_timeout)
+                        next_maintenance = time.monotonic() + self.visibility_timeout / 3
+                    free = self.concurrency - len(self._running)
+                    jobs = await claim_jobs(self.worker_id, free, self.visibility_timeout) if free > 0 else []
+                except Exception as e:
+                    logger.error(f"Job worker {self.worker_id} could not claim jobs: {e}")
+                    jobs = []
+                for job in jobs:
+                    self.claimed += 1
+                    task = asyncio.create_task(self._execute(job))
+                    self._running[job["id"]] = task
+                    task.add_done_callback(lambda _, job_id=job["id"]: self._job_done(job_id))
+                if jobs and len(jobs) == free:
+                    continue  # more may be due
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self._drain(shutdown_grace)
+            logger.info(f"Job worker {self.worker_id} stopped")
+
+    def _job_done(self, job_id: int):
+        self._running.pop(job_id, None)
+        if self._wakeup is not None:
+            self._wakeup.set()  # a slot is free
+
+    async def _drain(self, shutdown_grace: Optional[float]):
+        tasks = list(self._running.values())
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=shutdown_grace)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+    async def _execute(self, job: Dict[str, Any]):
+        started = time.monotonic()
+        try:
+            handler = JOB_HANDLERS.get(job["kind"])
+            if handler is None:
+                raise ValueError(f"Unknown job kind: {job['kind']}")
+            await handler(job)
+        except asyncio.CancelledError:
+            await self._release(job)
+            raise
+        except Exception as e:
+            await self._fail(job, e)
+        else:
+            now = datetime.utcnow()
+            if await _finish(job, self.worker_id, {"status": "done", "locked_by": None, "last_error": None,
+                                                   "finished_at": now, "updated_at": now}):
+                self.succeeded += 1
+        finally:
+            self.job_seconds += time.monotonic() - started
+
+    async def _fail(self, job: Dict[str, Any], error: Exception):
+        now = datetime.utcnow()
+        message = f"{type(error).__name__}: {error}"
+        if job["attempts"] >= job["max_attempts"]:
+            logger.error(f"Job {job['id']} ({job['kind']}) dead-lettered after {job['attempts']} attempts: {message}")
+            if await _finish(job, self.worker_id, {"status": "dead", "locked_by": None, "last_error": message,
+                                                   "finished_at": now, "updated_at": now}):
+                self.dead += 1
+            return
+        delay = retry_delay(job["attempts"])
+        logger.warning(f"Job {job['id']} ({job['kind']}) failed on attempt {job['attempts']}, retrying in {delay:.1f}s: {message}")
+        if await _finish(job, self.worker_id, {"status": "queued", "locked_by": None, "last_error": message,
+                                               "available_at": now + timedelta(seconds=delay), "updated_at": now}):
+            self.retried += 1
+
+    async def _release(self, job: Dict[str, Any]):
+        """Hand back a cancelled job (on shutdown) so another worker can run it right away"""
+        now = datetime.utcnow()
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(update(Job.__table__).where(*_leased(job, self.worker_id)).values(
+                    status="queued", locked_by=None, available_at=now, updated_at=now,
+                    last_error="Interrupted by worker shutdown"))
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Could not release job {job['id']} (requeued when its lease expires): {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get counters: claimed, succeeded, retried and dead-lettered jobs, jobs running now"""
+        finished = self.succeeded + self.retried + self.dead
+        return {
+            "worker_id": self.worker_id,
+            "claimed": self.claimed,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "dead": self.dead,
+            "running": len(self._running),
+            "avg_job_ms": round(self.job_seconds * 1000 / finished, 2) if finished else 0
+        }
+
+# Worker running inside the API process (see start_embedded_worker)
+embedded_worker: Optional[JobWorker] = None
+_embedded_task: Optional[asyncio.Task] = None
+
+def notify():
+    """Wake the embedded worker after enqueueing, instead of waiting for its next poll"""
+    if embedded_worker is not None:
+        embedded_worker.notify()
+
+def start_embedded_worker():
+    """Run a worker on the current event loop if JOB_EMBEDDED_WORKER is enabled (on startup)"""
+    global embedded_worker, _embedded_task
+    if not JOB_EMBEDDED_WORKER or embedded_worker is not None:
+        return
+    embedded_worker = JobWorker()
+    _embedded_task = asyncio.get_running_loop().create_task(embedded_worker.run(JOB_SHUTDOWN_GRACE_SECONDS))
+
+async def stop_embedded_worker():
+    """Stop the embedded worker, letting running jobs finish within the grace period (on shutdown)"""
+    global embedded_worker, _embedded_task
+    if embedded_worker is None:
+        return
+    embedded_worker.stop()
+    await _embedded_task
+    embedded_worker, _embedded_task = None, None
+
+async def aget_job_stats(db: AsyncSession) -> Dict[str, Any]:
+    """
+    Get job counts by status and kind, the age of the oldest due job and the
+    embedded worker's counters.
+
+    Args:
+        db: Async database session
+
+    Returns:
+        Dict with counts, by_kind, oldest_due_seconds and worker
+    """
+    jobs = Job.__table__.c
+    rows = (await db.execute(select(jobs.kind, jobs.status, func.count()).group_by(jobs.kind, jobs.status))).all()
+    now = datetime.utcnow()
+    oldest_due = (await db.execute(select(func.min(jobs.available_at)).where(
+        jobs.status == "queued", jobs.available_at <= now
+    ))).scalar()
+    return {
+        **_count_rows(rows),
+        "oldest_due_seconds": round((now - oldest_due).total_seconds(), 1) if oldest_due else 0,
+        "worker": embedded_worker.stats() if embedded_worker else None
+    }
+
+def _count_rows(rows) -> Dict[str, Any]:
+    counts = {status: 0 for status in JOB_STATUSES}
+    by_kind: Dict[str, Dict[str, int]] = {}
+    for kind, status, count in rows:
+        counts[status] = counts.get(status, 0) + count
+        by_kind.setdefault(kind, {})[status] = count
+    return {"counts": counts, "by_kind": by_kind}
+
+def requeue_dead_jobs(db, kind: Optional[str] = None) -> int:
+    """
+    Give dead-lettered jobs a fresh set of attempts (after fixing the cause).
+
+    Args:
+        db: Sync database session (committed here)
+        kind: Only requeue jobs of this kind
+
+    Returns:
+        Number of jobs requeued
+    """
+    jobs = Job.__table__.c
+    now = datetime.utcnow()
+    query = update(Job.__table__).where(jobs.status == "dead")
+    if kind:
+        query = query.where(jobs.kind == kind)
+    count = db.execute(query.values(status="queued", attempts=0, available_at=now, updated_at=now,
+                                    finished_at=None)).rowcount
+    db.commit()
+    return count
+
+def purge_jobs(db, older_than_days: float, include_dead: bool = False) -> int:
+    """
+    Delete finished jobs.
+
+    Args:
+        db: Sync database session (committed here)
+        older_than_days: Only jobs finished at least this long ago
+        include_dead: Also delete dead-lettered jobs
+
+    Returns:
+        Number of jobs deleted
+    """
+    jobs = Job.__table__.c
+    statuses = ("done", "dead") if include_dead else ("done",)
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    count = db.execute(delete(Job.__table__).where(jobs.status.in_(statuses), jobs.finished_at < cutoff)).rowcount
+    db.commit()
+    return count
+
+async def _run_worker(concurrency: int):
+    from group_commit import close_group_commit
+    from database import close_async_db
+    from llm_grok import grok_api
+
+    worker = JobWorker(concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run(JOB_SHUTDOWN_GRACE_SECONDS)
+    finally:
+        print(worker.stats())
+        await grok_api.aclose()
+        await close_group_commit()
+        await close_async_db()
+
+def main():
+    parser = argparse.ArgumentParser(description="Durable job queue worker and maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    worker = commands.add_parser("worker", help="run jobs until interrupted")
+    worker.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY, help="jobs run at once")
+    commands.add_parser("status", help="show job counts by kind and status")
+    requeue = commands.add_parser("requeue-dead", help="requeue dead-lettered jobs")
+    requeue.add_argument("--kind", choices=sorted(JOB_HANDLERS), help="only jobs of this kind")
+    purge = commands.add_parser("purge", help="delete finished jobs")
+    purge.add_argument("--older-than-days", type=float, default=7, help="finished at least this long ago")
+    purge.add_argument("--include-dead", action="store_true", help="also delete dead-lettered jobs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from database import init_db, get_db
+    init_db()
+
+    if args.command == "worker":
+        asyncio.run(_run_worker(args.concurrency))
+        return
+
+    db = next(get_db())
+    try:
+        if args.command == "status":
+            jobs = Job.__table__.c
+            rows = db.execute(select(jobs.kind, jobs.status, func.count()).group_by(jobs.kind, jobs.status)).all()
+            stats = _count_rows(rows)
+            print("  ".join(f"{status}={count}" for status, count in stats["counts"].items()))
+            for kind, counts in sorted(stats["by_kind"].items()):
+                print(f"  {kind:<32} " + "  ".join(f"{status}={count}" for status, count in sorted(counts.items())))
+        elif args.command == "requeue-dead":
+            print(f"Requeued {requeue_dead_jobs(db, args.kind)} dead jobs")
+        elif args.command == "purge":
+            print(f"Deleted {purge_jobs(db, args.older_than_days, args.include_dead)} finished jobs")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
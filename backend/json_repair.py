@@ -0,0 +1,276 @@
+"""
+Local repair of malformed Grok replies.
+Fixes common syntax slips (code fences, trailing commas, comments, Python literals)
+and coerces fields to the response schema, so a nearly-valid reply does not cost
+a second Grok call.
+"""
+import re
+import ast
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+REQUIRED_FIELDS = ["assistant_text", "mood", "summary", "action", "outcome_hint"]
+VALID_MOODS = ["receptive", "neutral", "negative"]
+VALID_ACTIONS = ["reply", "escalate", "schedule_followup", "request_payment"]
+VALID_OUTCOMES = ["Resolved", "Payment Promised", "Needs Follow-up", "Escalate"]
+
+# Common off-schema labels mapped to the schema enums (keys are normalized)
+MOOD_SYNONYMS = {
+    "positive": "receptive", "happy": "receptive", "interested": "receptive",
+    "angry": "negative", "upset": "negative", "frustrated": "negative", "hostile": "negative",
+    "neutralish": "neutral", "mixed": "neutral", "unknown": "neutral"
+}
+ACTION_SYNONYMS = {
+    "respond": "reply", "answer": "reply", "send": "reply",
+    "followup": "schedule_followup", "follow_up": "schedule_followup", "schedule_follow_up": "schedule_followup",
+    "payment_request": "request_payment", "request_payment_link": "request_payment", "payment": "request_payment",
+    "escalation": "escalate", "handoff": "escalate", "transfer": "escalate"
+}
+OUTCOME_SYNONYMS = {
+    "resolved": "Resolved", "paymentpromised": "Payment Promised", "promisedpayment": "Payment Promised",
+    "needsfollowup": "Needs Follow-up", "followup": "Needs Follow-up", "escalate": "Escalate", "escalated": "Escalate"
+}
+# Keys Grok sometimes uses instead of assistant_text
+ASSISTANT_TEXT_ALIASES = ["reply", "message", "response", "text", "assistant_reply"]
+
+_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_SMART_QUOTES = {"“": '"', "”": '"', "‘": "'", "’": "'"}
+
+def validate_response(data: Any) -> Optional[str]:
+    """
+    Check a parsed reply against the response schema.
+
+    Args:
+        data: Parsed JSON
+
+    Returns:
+        Reason the reply is invalid, or None if it is valid
+    """
+    if not isinstance(data, dict):
+        return "Response is not a JSON object"
+    for field in REQUIRED_FIELDS:
+        if field not in data:
+            return f"Missing required field: {field}"
+    if not isinstance(data["mood"], dict) or "label" not in data["mood"] or "confidence" not in data["mood"]:
+        return "Invalid mood structure"
+    if data["mood"]["label"] not in VALID_MOODS:
+        return f"Invalid mood label: {data['mood']['label']}"
+    if data["action"] not in VALID_ACTIONS:
+        return f"Invalid action: {data['action']}"
+    if not isinstance(data["outcome_hint"], dict) or "label" not in data["outcome_hint"] or "confidence" not in data["outcome_hint"]:
+        return "Invalid outcome_hint structure"
+    if data["outcome_hint"]["label"] not in VALID_OUTCOMES:
+        return f"Invalid outcome label: {data['outcome_hint']['label']}"
+    return None
+
+class _JSONLiterals(ast.NodeTransformer):
+    """Turn bare true/false/null names into constants so literal_eval accepts them"""
+
+    VALUES = {"true": True, "false": False, "null": None}
+
+    def visit_Name(self, node):
+        if node.id in self.VALUES:
+            return ast.copy_location(ast.Constant(self.VALUES[node.id]), node)
+        return node
+
+def _strip_comments(text: str) -> str:
+    """Remove // and /* */ comments that are outside string literals"""
+    out = []
+    i = 0
+    in_string = False
+    quote = ""
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            out.append(ch)
+            if ch == "\\" and i + 1 < len(text):
+                out.append(text[i + 1])
+                i += 2
+                continue
+            if ch == quote:
+                in_string = False
+            i += 1
+            continue
+        if ch in ('"', "'"):
+            in_string = True
+            quote = ch
+            out.append(ch)
+            i += 1
+            continue
+        if text.startswith("//", i):
+            end = text.find("\n", i)
+            i = len(text) if end == -1 else end
+            continue
+        if text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = len(text) if end == -1 else end + 2
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+def load_lenient(text: str) -> Tuple[Optional[Any], List[str]]:
+    """
+    Parse JSON that may be wrapped or slightly malformed.
+
+    Args:
+        text: Raw reply text
+
+    Returns:
+        Tuple of (parsed value or None, list of repairs applied)
+    """
+    repairs = []
+    candidate = (text or "").strip()
+
+    unfenced = _FENCE_RE.sub("", candidate).strip()
+    if unfenced != candidate:
+        repairs.append("code_fence")
+        candidate = unfenced
+
+    start, end = candidate.find("{"), candidate.rfind("}")
+    if start == -1 or end < start:
+        return None, repairs
+    if start > 0 or end < len(candidate) - 1:
+        repairs.append("surrounding_text")
+        candidate = candidate[start:end + 1]
+
+    try:
+        return json.loads(candidate), repairs
+    except ValueError:
+        pass
+
+    for smart, plain in _SMART_QUOTES.items():
+        if smart in candidate:
+            candidate = candidate.replace(smart, plain)
+            if "smart_quotes" not in repairs:
+                repairs.append("smart_quotes")
+
+    cleaned = _TRAILING_COMMA_RE.sub(r"\1", _strip_comments(candidate))
+    if cleaned != candidate:
+        repairs.append("syntax")
+    try:
+        return json.loads(cleaned), repairs
+    except ValueError:
+        pass
+
+    # Python-style dict (single quotes), possibly mixed with JSON true/false/null
+    try:
+        value = ast.literal_eval(_JSONLiterals().visit(ast.parse(cleaned, mode="eval")))
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None, repairs
+    repairs.append("python_literal")
+    return value, repairs
+
+def _normalize(label: Any) -> str:
+    return re.sub(r"[\s\-]+", "_", str(label).strip().lower())
+
+def _coerce_confidence(value: Any, default: float = 0.5) -> float:
+    """Parse a confidence (0-1, percentage or "85%") and clamp it to 0-1"""
+    text = str(value).strip() if value is not None else ""
+    try:
+        number = float(text.rstrip("%"))
+    except ValueError:
+        return default
+    if text.endswith("%") or 1 < number <= 100:
+        number /= 100
+    return min(1.0, max(0.0, number))
+
+def _coerce_labelled(value: Any, valid: List[str], synonyms: Dict[str, str], compact: bool = False) -> Optional[Dict[str, Any]]:
+    """Coerce a {"label", "confidence"} field (or a bare label string) to the schema"""
+    if isinstance(value, str):
+        value = {"label": value}
+    if not isinstance(value, dict) or "label" not in value:
+        return None
+    key = _normalize(value["label"])
+    if compact:
+        key = key.replace("_", "")
+    by_key = {(_normalize(v).replace("_", "") if compact else _normalize(v)): v for v in valid}
+    label = by_key.get(key) or synonyms.get(key)
+    if label is None:
+        return None
+    return {**value, "label": label, "confidence": _coerce_confidence(value.get("confidence"))}
+
+def coerce_response(data: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """
+    Coerce a parsed reply to the response schema.
+
+    Labels are matched case-insensitively and through common synonyms; a missing
+    summary becomes an empty list and a missing outcome_hint is derived from the
+    action. Replies without usable assistant_text, mood or action are not
+    guessed at and return None.
+
+    Args:
+        data: Parsed reply
+
+    Returns:
+        Tuple of (coerced reply or None, list of repairs applied)
+    """
+    if not isinstance(data, dict):
+        return None, []
+    repairs = []
+    data = dict(data)
+
+    if not isinstance(data.get("assistant_text"), str) or not data["assistant_text"].strip():
+        alias = next((k for k in ASSISTANT_TEXT_ALIASES if isinstance(data.get(k), str) and data[k].strip()), None)
+        if alias is None:
+            return None, repairs
+        data["assistant_text"] = data.pop(alias)
+        repairs.append("assistant_text_alias")
+
+    mood = _coerce_labelled(data.get("mood"), VALID_MOODS, MOOD_SYNONYMS)
+    if mood is None:
+        return None, repairs
+    if mood != data.get("mood"):
+        repairs.append("mood")
+    data["mood"] = mood
+
+    if "action" not in data:
+        return None, repairs
+    action_key = _normalize(data["action"])
+    action = action_key if action_key in VALID_ACTIONS else ACTION_SYNONYMS.get(action_key)
+    if action is None:
+        return None, repairs
+    if action != data["action"]:
+        repairs.append("action")
+    data["action"] = action
+
+    if "outcome_hint" in data:
+        outcome = _coerce_labelled(data["outcome_hint"], VALID_OUTCOMES, OUTCOME_SYNONYMS, compact=True)
+        if outcome is None:
+            return None, repairs
+    else:
+        outcome = {"label": "Escalate" if action == "escalate" else "Needs Follow-up", "confidence": 0.5}
+    if outcome != data.get("outcome_hint"):
+        repairs.append("outcome_hint")
+    data["outcome_hint"] = outcome
+
+    summary = data.get("summary")
+    if isinstance(summary, str):
+        summary = [line.strip(" -•*\t") for line in summary.splitlines() if line.strip(" -•*\t")]
+    elif not isinstance(summary, list):
+        summary = []
+    if summary != data.get("summary"):
+        repairs.append("summary")
+    data["summary"] = summary
+
+    return data, repairs
+
+def repair_response(text: str) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """
+    Parse and coerce a malformed reply.
+
+    Args:
+        text: Raw reply text
+
+    Returns:
+        Tuple of (schema-valid reply or None, list of repairs applied)
+    """
+    data, repairs = load_lenient(text)
+    if data is None:
+        return None, repairs
+    coerced, coerce_repairs = coerce_response(data)
+    repairs.extend(coerce_repairs)
+    if coerced is None or validate_response(coerced) is not None:
+        return None, repairs
+    return coerced, repairs
@@ -0,0 +1,186 @@
+"""
+Incremental JSON parsing for streamed LLM output.
+Surfaces top-level fields of a JSON object as soon as each value is complete.
+"""
+import json
+from typing import Any, List, Optional, Tuple
+
+_WHITESPACE = " \t\r\n"
+
+class IncrementalJSONParser:
+    """
+    Incremental parser for a single top-level JSON object arriving in chunks.
+
+    feed() returns the (field, value) pairs whose values were completed by the
+    new chunk, in document order. Nested objects and arrays are surfaced whole
+    once their closing bracket arrives. partial_string() exposes the decoded
+    prefix of a top-level string value that is still streaming (e.g. the
+    assistant reply for live display).
+
+    Anything before the opening brace (such as a ```json fence) is skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self._pos = 0
+        self._state = "start"  # start, key, colon, value, after_value, done
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+
+    @property
+    def done(self) -> bool:
+        """True once the top-level object has been closed"""
+        return self._state == "done"
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Feed the next chunk of text.
+
+        Args:
+            chunk: Next piece of the streamed JSON text
+
+        Returns:
+            List of (field, value) pairs completed by this chunk
+        """
+        self.buffer += chunk
+        completed = []
+        buffer = self.buffer
+        i = self._pos
+
+        while i < len(buffer) and self._state != "done":
+            ch = buffer[i]
+
+            if self._state == "start":
+                if ch == "{":
+                    self._state = "key"
+                i += 1
+                continue
+
+            if self._state == "key":
+                if self._key_start is None:
+                    if ch == '"':
+                        self._key_start = i
+                        self._in_string = True
+                    elif ch == "}":
+                        self._state = "done"
+                    i += 1
+                    continue
+                # Inside the key string
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._key = json.loads(buffer[self._key_start:i + 1])
+                    self._key_start = None
+                    self._state = "colon"
+                i += 1
+                continue
+
+            if self._state == "colon":
+                if ch == ":":
+                    self._state = "value"
+                    self._value_start = None
+                i += 1
+                continue
+
+            if self._state == "value":
+                if self._value_start is None:
+                    if ch in _WHITESPACE:
+                        i += 1
+                        continue
+                    self._value_start = i
+                    self._depth = 0
+
+                if self._in_string:
+                    if self._escape:
+                        self._escape = False
+                    elif ch == "\\":
+                        self._escape = True
+                    elif ch == '"':
+                        self._in_string = False
+                        if self._depth == 0:
+                            # Top-level string value is complete
+                            completed.append(self._complete_value(i + 1))
+                    i += 1
+                    continue
+
+                if ch == '"':
+                    self._in_string = True
+                elif ch in "{[":
+                    self._depth += 1
+                elif ch in "}]":
+                    if self._depth == 0:
+                        # Closing brace of the top-level object ends a scalar value
+                        completed.append(self._complete_value(i))
+                        self._state = "done"
+                        i += 1
+                        continue
+                    self._depth -= 1
+                    if self._depth == 0:
+                        completed.append(self._complete_value(i + 1))
+                elif ch == "," and self._depth == 0:
+                    completed.append(self._complete_value(i))
+                    self._state = "key"
+                i += 1
+                continue
+
+            if self._state == "after_value":
+                if ch == ",":
+                    self._state = "key"
+                elif ch == "}":
+                    self._state = "done"
+                i += 1
+                continue
+
+        self._pos = i
+        return [item for item in completed if item is not None]
+
+    def _complete_value(self, end: int) -> Optional[Tuple[str, Any]]:
+        """Decode the value ending at buffer[end] and record it"""
+        raw = self.buffer[self._value_start:end].strip()
+        key = self._key
+        self._value_start = None
+        self._key = None
+        if self._state == "value" and raw[:1] in ('"', "{", "["):
+            self._state = "after_value"
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return None
+        self.fields[key] = value
+        return key, value
+
+    def partial_string(self, field: str) -> Optional[str]:
+        """
+        Get the decoded prefix of a top-level string value that is still streaming.
+
+        Args:
+            field: Field name
+
+        Returns:
+            Completed value, decoded partial value, or None if the field has not started
+        """
+        if field in self.fields:
+            value = self.fields[field]
+            return value if isinstance(value, str) else None
+        if self._state != "value" or self._key != field or self._value_start is None:
+            return None
+        if not self._in_string or self._depth != 0:
+            return None
+
+        raw = self.buffer[self._value_start + 1:self._pos]
+        # Drop a trailing incomplete escape sequence before decoding
+        for cut in range(0, 7):
+            candidate = raw[:len(raw) - cut] if cut else raw
+            try:
+                return json.loads('"' + candidate + '"')
+            except ValueError:
+                continue
+        return None
@@ -0,0 +1,159 @@
+"""
+Language detection for inbound messages.
+Detects the customer's language with langdetect, with a per-customer cache and a
+fast path for very short SMS where statistical detection is unreliable.
+"""
+import os
+import re
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+try:
+    from langdetect import DetectorFactory, detect_langs
+    from langdetect.lang_detect_exception import LangDetectException
+    DetectorFactory.seed = 0  # deterministic results
+    LANGDETECT_AVAILABLE = True
+except ImportError:
+    LANGDETECT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Texts shorter than this (letters only) skip statistical detection
+SHORT_TEXT_CHARS = int(os.getenv("LANGUAGE_SHORT_TEXT_CHARS", "20"))
+# Minimum langdetect probability to trust a detection
+MIN_CONFIDENCE = float(os.getenv("LANGUAGE_MIN_CONFIDENCE", "0.8"))
+CACHE_SIZE = int(os.getenv("LANGUAGE_CACHE_SIZE", "10000"))
+
+# Common short replies whose language is unambiguous ("no", "ok", "si" are not)
+SHORT_REPLIES = {
+    "en": ["yes", "thanks", "thank you", "sure", "yes please", "no thanks", "call me", "later"],
+    "es": ["sí", "gracias", "vale", "claro", "por favor", "de acuerdo", "no gracias", "luego"],
+    "fr": ["oui", "merci", "non merci", "d'accord", "bien sûr", "plus tard"],
+    "de": ["ja", "nein", "danke", "bitte", "genau", "später"],
+    "pt": ["sim", "obrigado", "obrigada", "não", "tudo bem"],
+    "it": ["grazie", "va bene", "certo"],
+    "hi": ["haan", "nahi", "theek hai", "dhanyavaad", "shukriya", "हाँ", "नहीं", "धन्यवाद"]
+}
+_SHORT_REPLY_LANGUAGE = {phrase: lang for lang, phrases in SHORT_REPLIES.items() for phrase in phrases}
+_NON_LETTERS_RE = re.compile(r"[\W\d_]+", re.UNICODE)
+
+class LanguageDetector:
+    """
+    Inbound message language detector.
+
+    Short texts are resolved from a phrase table or the customer's cached language
+    instead of running langdetect. Longer texts are detected and, when the result
+    is confident, remembered per customer so later short replies inherit it.
+    """
+
+    def __init__(self, short_text_chars: int = SHORT_TEXT_CHARS, min_confidence: float = MIN_CONFIDENCE,
+                 cache_size: int = CACHE_SIZE):
+        self.short_text_chars = short_text_chars
+        self.min_confidence = min_confidence
+        self.cache_size = cache_size
+        self._customers = OrderedDict()  # customer_id -> language
+        self._lock = threading.Lock()
+        self.stats = {"fast_path": 0, "detected": 0, "low_confidence": 0, "cache_hits": 0}
+
+    def remembered(self, customer_id: Optional[int]) -> Optional[str]:
+        """Get the cached language of a customer"""
+        if customer_id is None:
+            return None
+        with self._lock:
+            language = self._customers.get(customer_id)
+            if language is not None:
+                self._customers.move_to_end(customer_id)
+            return language
+
+    def remember(self, customer_id: Optional[int], language: str):
+        """Cache a customer's language (LRU-bounded)"""
+        if customer_id is None:
+            return
+        with self._lock:
+            self._customers[customer_id] = language
+            self._customers.move_to_end(customer_id)
+            while len(self._customers) > self.cache_size:
+                self._customers.popitem(last=False)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _detect_text(self, text: str) -> Tuple[Optional[str], float]:
+        """Run langdetect; returns (language, probability) or (None, 0.0)"""
+        if not LANGDETECT_AVAILABLE:
+            return None, 0.0
+        try:
+            best = detect_langs(text)[0]
+        except LangDetectException:
+            return None, 0.0
+        # Normalize regional codes (zh-cn -> zh)
+        return best.lang.split("-")[0], best.prob
+
+    def detect(self, text: str, customer_id: Optional[int] = None, fallback: str = "en") -> Tuple[str, bool]:
+        """
+        Detect the language of an inbound message.
+
+        Args:
+            text: Message text
+            customer_id: Customer who sent it, for the per-customer cache
+            fallback: Language to use when nothing better is known (e.g. preferred_language)
+
+        Returns:
+            Tuple of (language code, whether it was confidently detected from this text)
+        """
+        known = self.remembered(customer_id)
+        if known is not None:
+            self._count("cache_hits")
+        default = known or fallback
+
+        normalized = " ".join((text or "").lower().split()).strip(" .!?¡¿,")
+        if normalized in _SHORT_REPLY_LANGUAGE:
+            self._count("fast_path")
+            return _SHORT_REPLY_LANGUAGE[normalized], False
+
+        if len(_NON_LETTERS_RE.sub("", normalized)) < self.short_text_chars:
+            self._count("fast_path")
+            return default, False
+
+        language, probability = self._detect_text(text)
+        if language is None or probability < self.min_confidence:
+            self._count("low_confidence")
+            return default, False
+
+        self._count("detected")
+        self.remember(customer_id, language)
+        return language, True
+
+language_detector = LanguageDetector()
+
+def detect_language(text: str, customer=None, fallback: str = "en") -> str:
+    """
+    Detect the language of a customer's message.
+
+    A confident detection that differs from customer.preferred_language updates it
+    (the caller commits), so the preference follows the language the customer
+    actually writes in.
+
+    Args:
+        text: Message text
+        customer: Customer who sent the message (optional)
+        fallback: Language to use when there is no customer preference
+
+    Returns:
+        Language code (e.g. "en", "es")
+    """
+    customer_id = customer.id if customer is not None else None
+    preferred = (customer.preferred_language if customer is not None else None) or fallback
+    language, confident = language_detector.detect(text, customer_id, preferred)
+    if confident and customer is not None and customer.preferred_language != language:
+        logger.info(f"Customer {customer.id} language changed {customer.preferred_language} -> {language}")
+        customer.preferred_language = language
+    return language
+
+def get_language_stats() -> Dict[str, int]:
+    """Get detection counters (fast path, detections, low-confidence fallbacks, cache hits)"""
+    with language_detector._lock:
+        return dict(language_detector.stats, cached_customers=len(language_detector._customers))
@@ -2,14 +2,59 @@ import os
 import json
 import time
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterator, AsyncIterator, Callable
+import socket
+import threading
+import asyncio
 import requests
-from datetime import datetime, timedelta
+import httpx
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from grok_cache import get_cache_backend, make_cache_key
+from singleflight import SingleFlight, AsyncSingleFlight
+from rate_limit import RateLimiter, parse_retry_after, with_jitter
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from json_stream import IncrementalJSONParser
+from prompts import language_instruction
+from json_repair import validate_response, repair_response
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean flag from the environment (true/1/yes/on)."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+class GrokRateLimitedError(Exception):
+    """Raised by the streaming calls on a 429, after the rate limiter has been told to hold back"""
+    pass
+
+class GrokUnavailableError(Exception):
+    """Raised by call_grok(fallback=False) instead of returning the rule-based fallback response"""
+    pass
+
+class KeepAliveHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that enables TCP keep-alive on pooled sockets so idle
+    connections to the Grok endpoint survive between conversation turns.
+    """
+    
+    def __init__(self, tcp_keepalive: bool = True, **kwargs):
+        self.tcp_keepalive = tcp_keepalive
+        super().__init__(**kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        if self.tcp_keepalive:
+            kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            ]
+        super().init_poolmanager(*args, **kwargs)
+
 class GrokAPI:
     """
     Grok LLM API integration for multilingual, multi-turn conversations.
@@ -20,24 +65,120 @@ class GrokAPI:
         self.api_key = os.getenv("GROK_API_KEY")
         self.api_base = os.getenv("GROK_API_BASE", "https://api.x.ai/v1")
         self.model = os.getenv("GROK_MODEL", "grok-beta")
-        self.cache = {}  # Simple in-memory cache
-        self.cache_duration = 30  # seconds
+        self.timeout = float(os.getenv("GROK_TIMEOUT", "30"))
+        self.max_tokens = 1000
+        self.cache = get_cache_backend()  # memory (per worker) or sqlite (shared per host)
+        
+        # Connection pool settings (one pool per host, reused across turns)
+        self.pool_connections = int(os.getenv("GROK_POOL_CONNECTIONS", "4"))
+        self.pool_maxsize = int(os.getenv("GROK_POOL_MAXSIZE", "10"))
+        self.pool_block = _env_bool("GROK_POOL_BLOCK", False)
+        self.keepalive = _env_bool("GROK_KEEPALIVE", True)
+        self.session = self._create_session()
+        self._async_client = None
+        self._async_client_loop = None
+        
+        # Coalesce identical in-flight requests (threads and asyncio tasks)
+        self._inflight = SingleFlight()
+        self._ainflight = AsyncSingleFlight()
+        
+        # Client-side rate limiting shared by every call path in this worker
+        self.rate_limiter = RateLimiter(
+            requests_per_minute=float(os.getenv("GROK_RATE_LIMIT_RPM", "0")),
+            tokens_per_minute=float(os.getenv("GROK_RATE_LIMIT_TPM", "0")),
+            max_concurrency=int(os.getenv("GROK_MAX_CONCURRENCY", "0"))
+        )
+        self.max_retry_after = float(os.getenv("GROK_MAX_RETRY_AFTER", "60"))
+        
+        # Circuit breaker: go straight to the rule-based fallback while Grok is degraded
+        self.circuit_breaker = CircuitBreaker(
+            name="grok",
+            window_seconds=float(os.getenv("GROK_BREAKER_WINDOW", "60")),
+            min_calls=int(os.getenv("GROK_BREAKER_MIN_CALLS", "10")),
+            error_rate_threshold=float(os.getenv("GROK_BREAKER_ERROR_RATE", "0.5")),
+            slow_call_seconds=float(os.getenv("GROK_BREAKER_SLOW_CALL_SECONDS", "10")),
+            slow_call_rate_threshold=float(os.getenv("GROK_BREAKER_SLOW_CALL_RATE", "0.8")),
+            open_seconds=float(os.getenv("GROK_BREAKER_OPEN_SECONDS", "30")),
+            half_open_probes=int(os.getenv("GROK_BREAKER_HALF_OPEN_PROBES", "1"))
+        )
+        
+        # Reply parsing outcomes: valid as returned, repaired locally, re-asked, failed after re-ask
+        self.parse_stats = {"valid": 0, "repaired": 0, "unrepairable": 0, "reasked": 0, "reask_failed": 0}
+        self._parse_stats_lock = threading.Lock()
         
         if not self.api_key:
             logger.warning("GROK_API_KEY not found - Grok integration disabled")
     
-    def _get_cache_key(self, messages: List[Dict], agent_type: str) -> str:
-        """Generate cache key for identical requests"""
-        content = json.dumps(messages, sort_keys=True) + agent_type
-        return str(hash(content))
+    def _create_session(self) -> requests.Session:
+        """
+        Create a long-lived HTTP session with a pooled, keep-alive transport.
+        
+        pool_connections caps how many per-host pools are kept, pool_maxsize caps
+        the connections kept open to any single host, and pool_block makes callers
+        wait for a free connection instead of opening an unpooled one.
+        
+        Returns:
+            Configured requests.Session
+        """
+        session = requests.Session()
+        adapter = KeepAliveHTTPAdapter(
+            tcp_keepalive=self.keepalive,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Connection"] = "keep-alive" if self.keepalive else "close"
+        return session
+    
+    def close(self):
+        """Close pooled HTTP connections"""
+        self.session.close()
     
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """Check if cached response is still valid"""
-        if cache_key not in self.cache:
-            return False
+    async def aclose(self):
+        """Close pooled HTTP connections, including the async client"""
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+    
+    def _build_request(self, messages: List[Dict], stream: bool = False) -> Dict[str, Any]:
+        """Build headers and JSON payload for a chat completions request"""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": self.max_tokens,
+            "response_format": {"type": "json_object"}
+        }
+        if stream:
+            payload["stream"] = True
         
-        cached_time = self.cache[cache_key]["timestamp"]
-        return datetime.now() - cached_time < timedelta(seconds=self.cache_duration)
+        return {"url": f"{self.api_base}/chat/completions", "headers": headers, "json": payload}
+    
+    def _estimate_tokens(self, messages: List[Dict]) -> int:
+        """Rough token estimate for rate limiting: ~4 characters per prompt token plus max completion"""
+        prompt_chars = sum(len(msg.get("content") or "") for msg in messages)
+        return prompt_chars // 4 + self.max_tokens
+    
+    def _record_usage(self, response_json: Dict[str, Any], estimated_tokens: int):
+        """Correct the tokens/min budget with the usage reported by the API"""
+        usage = response_json.get("usage") or {}
+        if usage.get("total_tokens"):
+            self.rate_limiter.adjust_tokens(estimated_tokens, usage["total_tokens"])
+    
+    def _rate_limited_delay(self, headers: Dict[str, str], attempt: int) -> float:
+        """Seconds to wait after a 429: the server's Retry-After, else exponential backoff, capped"""
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        if retry_after is None:
+            retry_after = 2 ** attempt
+        return min(retry_after, self.max_retry_after)
     
     def _call_grok_api(self, messages: List[Dict], agent_type: str) -> Dict[str, Any]:
         """
@@ -53,114 +194,351 @@ class GrokAPI:
         if not self.api_key:
             raise ValueError("Grok API key not configured")
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": 0.7,
-            "max_tokens": 1000,
-            "response_format": {"type": "json_object"}
-        }
+        request = self._build_request(messages)
+        estimated_tokens = self._estimate_tokens(messages)
         
         for attempt in range(3):  # Max 3 attempts
+            # Fail fast while Grok is degraded instead of waiting out timeouts
+            if not self.circuit_breaker.allow_request():
+                raise CircuitOpenError("Grok circuit breaker is open")
+            
+            started = None
             try:
-                response = requests.post(
-                    f"{self.api_base}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=30
-                )
+                with self.rate_limiter.acquire(estimated_tokens):
+                    started = time.monotonic()
+                    response = self.session.post(
+                        request["url"],
+                        headers=request["headers"],
+                        json=request["json"],
+                        timeout=self.timeout
+                    )
+                latency = time.monotonic() - started
                 
                 if response.status_code == 200:
-                    return response.json()
+                    self.circuit_breaker.record_success(latency)
+                    response_json = response.json()
+                    self._record_usage(response_json, estimated_tokens)
+                    return response_json
+                elif response.status_code == 429:
+                    # Rate limited - back off for Retry-After (plus jitter) and retry
+                    self.circuit_breaker.record_ignored()
+                    delay = self._rate_limited_delay(response.headers, attempt)
+                    logger.warning(f"Grok API rate limited (attempt {attempt + 1}), retrying in {delay:.1f}s")
+                    self.rate_limiter.block_for(delay)
+                    if attempt < 2:
+                        time.sleep(with_jitter(delay))
+                        continue
                 elif response.status_code >= 500:
                     # Server error - retry
+                    self.circuit_breaker.record_failure(latency)
                     logger.warning(f"Grok API server error (attempt {attempt + 1}): {response.status_code}")
                     if attempt < 2:
                         time.sleep(2 ** attempt)  # Exponential backoff
                         continue
                 else:
-                    # Client error - don't retry
+                    # Client error - don't retry (Grok itself is responding)
+                    self.circuit_breaker.record_success(latency)
                     logger.error(f"Grok API client error: {response.status_code} - {response.text}")
                     break
                     
             except requests.exceptions.Timeout:
+                self.circuit_breaker.record_failure(time.monotonic() - started if started else 0.0)
                 logger.warning(f"Grok API timeout (attempt {attempt + 1})")
                 if attempt < 2:
                     time.sleep(2 ** attempt)
                     continue
             except requests.exceptions.RequestException as e:
+                self.circuit_breaker.record_failure(time.monotonic() - started if started else 0.0)
                 logger.error(f"Grok API request error: {str(e)}")
                 break
+            except Exception:
+                self.circuit_breaker.record_ignored()
+                raise
         
         raise Exception("Grok API failed after all retries")
     
-    def _validate_json_response(self, response_text: str) -> Optional[Dict[str, Any]]:
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """
+        Get the pooled async HTTP client for the running event loop.
+        
+        httpx connections are bound to the loop that opened them, so a new client
+        is created if the loop changes (e.g. a worker restarting its loop).
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client.is_closed or self._async_client_loop is not loop:
+            limits = httpx.Limits(
+                max_connections=self.pool_maxsize,
+                max_keepalive_connections=self.pool_maxsize if self.keepalive else 0
+            )
+            self._async_client = httpx.AsyncClient(
+                limits=limits,
+                timeout=self.timeout,
+                headers={"Connection": "keep-alive" if self.keepalive else "close"}
+            )
+            self._async_client_loop = loop
+        return self._async_client
+    
+    async def _acall_grok_api(self, messages: List[Dict], agent_type: str) -> Dict[str, Any]:
         """
-        Validate and parse Grok JSON response.
+        Async counterpart of _call_grok_api using non-blocking HTTP and asyncio.sleep backoff.
+        
+        Args:
+            messages: List of conversation messages
+            agent_type: Type of agent (renewal, policy_info, crosssell)
+        
+        Returns:
+            Grok API response
+        """
+        if not self.api_key:
+            raise ValueError("Grok API key not configured")
+        
+        request = self._build_request(messages)
+        estimated_tokens = self._estimate_tokens(messages)
+        client = self._get_async_client()
+        
+        for attempt in range(3):  # Max 3 attempts
+            # Fail fast while Grok is degraded instead of waiting out timeouts
+            if not self.circuit_breaker.allow_request():
+                raise CircuitOpenError("Grok circuit breaker is open")
+            
+            started = None
+            try:
+                async with self.rate_limiter.aacquire(estimated_tokens):
+                    started = time.monotonic()
+                    response = await client.post(
+                        request["url"],
+                        headers=request["headers"],
+                        json=request["json"]
+                    )
+                latency = time.monotonic() - started
+                
+                if response.status_code == 200:
+                    self.circuit_breaker.record_success(latency)
+                    response_json = response.json()
+                    self._record_usage(response_json, estimated_tokens)
+                    return response_json
+                elif response.status_code == 429:
+                    # Rate limited - back off for Retry-After (plus jitter) and retry
+                    self.circuit_breaker.record_ignored()
+                    delay = self._rate_limited_delay(response.headers, attempt)
+                    logger.warning(f"Grok API rate limited (attempt {attempt + 1}), retrying in {delay:.1f}s")
+                    self.rate_limiter.block_for(delay)
+                    if attempt < 2:
+                        await asyncio.sleep(with_jitter(delay))
+                        continue
+                elif response.status_code >= 500:
+                    # Server error - retry
+                    self.circuit_breaker.record_failure(latency)
+                    logger.warning(f"Grok API server error (attempt {attempt + 1}): {response.status_code}")
+                    if attempt < 2:
+                        await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                        continue
+                else:
+                    # Client error - don't retry (Grok itself is responding)
+                    self.circuit_breaker.record_success(latency)
+                    logger.error(f"Grok API client error: {response.status_code} - {response.text}")
+                    break
+                    
+            except httpx.TimeoutException:
+                self.circuit_breaker.record_failure(time.monotonic() - started if started else 0.0)
+                logger.warning(f"Grok API timeout (attempt {attempt + 1})")
+                if attempt < 2:
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+            except httpx.HTTPError as e:
+                self.circuit_breaker.record_failure(time.monotonic() - started if started else 0.0)
+                logger.error(f"Grok API request error: {str(e)}")
+                break
+            except BaseException:
+                self.circuit_breaker.record_ignored()
+                raise
+        
+        raise Exception("Grok API failed after all retries")
+    
+    def _count_parse(self, outcome: str):
+        with self._parse_stats_lock:
+            self.parse_stats[outcome] += 1
+    
+    def _parse_response_text(self, response_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse a reply, repairing it locally if it is not schema-valid as returned.
         
         Args:
             response_text: Raw response text from Grok
         
         Returns:
-            Parsed JSON dict or None if invalid
+            Schema-valid dict, or None if the reply could not be repaired (caller re-asks)
         """
         try:
             data = json.loads(response_text)
+            error = validate_response(data)
+        except json.JSONDecodeError as e:
+            error = f"Invalid JSON from Grok: {str(e)}"
+        
+        if not error:
+            self._count_parse("valid")
+            return data
+        
+        repaired, repairs = repair_response(response_text)
+        if repaired is not None:
+            self._count_parse("repaired")
+            logger.info(f"Repaired Grok reply locally ({error}; fixes: {', '.join(repairs) or 'none'})")
+            return repaired
+        
+        self._count_parse("unrepairable")
+        logger.error(f"Grok reply could not be repaired: {error}")
+        return None
+    
+    def _prepare_messages(self, messages: List[Dict], language: str) -> List[Dict]:
+        """
+        Make sure the request carries the language instruction without touching the system prompt.
+        
+        Messages built by prompts.build_agent_messages already end their system prompt with the
+        instruction and are returned as-is. Otherwise the instruction is added as a separate
+        system message right after the leading one, so the leading system prompt stays
+        byte-identical across languages and keeps its provider-side prompt cache prefix.
+        """
+        instruction = language_instruction(language)
+        if any(msg["role"] == "system" and msg["content"].endswith(instruction) for msg in messages):
+            return messages
+        
+        messages = list(messages)
+        insert_at = 1 if messages and messages[0]["role"] == "system" else 0
+        messages.insert(insert_at, {"role": "system", "content": instruction})
+        return messages
+    
+    def _with_json_reminder(self, messages: List[Dict]) -> List[Dict]:
+        """Return a copy of messages with an explicit valid-JSON instruction appended as the last message"""
+        return list(messages) + [{"role": "system", "content": "CRITICAL: You must return valid JSON only. No other text."}]
+    
+    def _parse_api_response(self, response: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Extract and validate the structured reply from a chat completions response"""
+        if "choices" not in response or not response["choices"]:
+            raise Exception("No choices in Grok response")
+        
+        response_text = response["choices"][0]["message"]["content"]
+        return self._parse_response_text(response_text)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get Grok client counters for monitoring"""
+        return {
+            "cache": self.cache.stats(),
+            "singleflight": self._inflight.stats(),
+            "async_singleflight": self._ainflight.stats(),
+            "rate_limiter": self.rate_limiter.stats(),
+            "circuit_breaker": self.circuit_breaker.stats(),
+            "json": self._json_stats()
+        }
+    
+    def _json_stats(self) -> Dict[str, Any]:
+        """Reply parsing counters with repair and re-ask rates"""
+        with self._parse_stats_lock:
+            stats = dict(self.parse_stats)
+        replies = stats["valid"] + stats["repaired"] + stats["unrepairable"]
+        stats["repair_rate"] = round(stats["repaired"] / replies, 3) if replies else 0.0
+        stats["reask_rate"] = round(stats["reasked"] / replies, 3) if replies else 0.0
+        return stats
+    
+    def call_grok(self, messages: List[Dict], agent_type: str, language: str = "en",
+                  cache_ttl: Optional[float] = None, fallback: bool = True) -> Dict[str, Any]:
+        """
+        Call Grok API with conversation messages and return structured response.
+        
+        Args:
+            messages: List of conversation messages with role and content
+            agent_type: Type of agent (renewal, policy_info, crosssell)
+            language: Language hint for Grok
+            cache_ttl: Seconds to cache the response (None uses GROK_CACHE_TTL, 0 disables)
+            fallback: Return the rule-based fallback response when Grok cannot answer
+        
+        Returns:
+            Structured response dict with assistant_text, mood, summary, action, outcome_hint
+        
+        Raises:
+            GrokUnavailableError: If fallback is False and Grok did not produce a valid response
+        """
+        if not self.api_key:
+            logger.warning("Grok API key not configured - returning fallback response")
+            return self._fallback_or_raise(messages, agent_type, fallback, "Grok API key not configured")
+        
+        # Check cache first
+        cache_key = make_cache_key(messages, agent_type, language)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info("Returning cached Grok response")
+            return cached
+        
+        # Identical concurrent requests share one upstream call (callers that want the
+        # fallback and callers that want an error never share a flight)
+        return self._inflight.do(
+            cache_key if fallback else f"{cache_key}:strict",
+            lambda: self._fetch_grok(messages, agent_type, language, cache_key, cache_ttl, fallback)
+        )
+    
+    def _fallback_or_raise(self, messages: List[Dict], agent_type: str, fallback: bool, reason: str) -> Dict[str, Any]:
+        """Return the fallback response, or raise GrokUnavailableError for callers that opted out of it"""
+        if not fallback:
+            raise GrokUnavailableError(reason)
+        return self._get_fallback_response(messages, agent_type)
+    
+    def _fetch_grok(self, messages: List[Dict], agent_type: str, language: str,
+                    cache_key: str, cache_ttl: Optional[float], fallback: bool = True) -> Dict[str, Any]:
+        """Call Grok for a cache miss and cache the validated response (runs once per in-flight key)"""
+        # A flight for this key may have completed between the cache check and joining
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            # Add language instruction (the system prompt itself is never modified)
+            grok_messages = self._prepare_messages(messages, language)
             
-            # Validate required fields
-            required_fields = ["assistant_text", "mood", "summary", "action", "outcome_hint"]
-            for field in required_fields:
-                if field not in data:
-                    logger.error(f"Missing required field: {field}")
-                    return None
-            
-            # Validate mood structure
-            if not isinstance(data["mood"], dict) or "label" not in data["mood"] or "confidence" not in data["mood"]:
-                logger.error("Invalid mood structure")
-                return None
-            
-            # Validate mood labels
-            valid_moods = ["receptive", "neutral", "negative"]
-            if data["mood"]["label"] not in valid_moods:
-                logger.error(f"Invalid mood label: {data['mood']['label']}")
-                return None
+            # Make API call and validate JSON response
+            response = self._call_grok_api(grok_messages, agent_type)
+            parsed_response = self._parse_api_response(response)
             
-            # Validate action
-            valid_actions = ["reply", "escalate", "schedule_followup", "request_payment"]
-            if data["action"] not in valid_actions:
-                logger.error(f"Invalid action: {data['action']}")
-                return None
+            if parsed_response is None:
+                # Local repair failed - try again with explicit JSON instruction
+                logger.warning("Invalid JSON from Grok, retrying with explicit instruction")
+                self._count_parse("reasked")
+                grok_messages = self._with_json_reminder(grok_messages)
+                
+                response = self._call_grok_api(grok_messages, agent_type)
+                parsed_response = self._parse_api_response(response)
             
-            # Validate outcome_hint structure
-            if not isinstance(data["outcome_hint"], dict) or "label" not in data["outcome_hint"] or "confidence" not in data["outcome_hint"]:
-                logger.error("Invalid outcome_hint structure")
-                return None
+            if parsed_response is None:
+                logger.error("Grok returned invalid JSON after retries - using fallback")
+                self._count_parse("reask_failed")
+                return self._fallback_or_raise(messages, agent_type, fallback, "Grok returned invalid JSON after retries")
             
-            # Validate outcome labels
-            valid_outcomes = ["Resolved", "Payment Promised", "Needs Follow-up", "Escalate"]
-            if data["outcome_hint"]["label"] not in valid_outcomes:
-                logger.error(f"Invalid outcome label: {data['outcome_hint']['label']}")
-                return None
+            # Cache successful response
+            self.cache.set(cache_key, parsed_response, ttl=cache_ttl)
             
-            return data
+            logger.info(f"Grok API call successful for agent: {agent_type}")
+            return parsed_response
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON from Grok: {str(e)}")
-            return None
+        except GrokUnavailableError:
+            raise
+        except CircuitOpenError:
+            logger.warning("Grok circuit breaker open - using fallback")
+            return self._fallback_or_raise(messages, agent_type, fallback, "Grok circuit breaker open")
+        except Exception as e:
+            logger.error(f"Grok API call failed: {str(e)}")
+            if not fallback:
+                raise GrokUnavailableError(f"Grok API call failed: {e}") from e
+            return self._get_fallback_response(messages, agent_type)
     
-    def call_grok(self, messages: List[Dict], agent_type: str, language: str = "en") -> Dict[str, Any]:
+    async def acall_grok(self, messages: List[Dict], agent_type: str, language: str = "en",
+                         cache_ttl: Optional[float] = None) -> Dict[str, Any]:
         """
-        Call Grok API with conversation messages and return structured response.
+        Async counterpart of call_grok for use inside the FastAPI event loop.
+        Same validation, JSON retry, caching and fallback semantics, but never blocks the loop.
         
         Args:
             messages: List of conversation messages with role and content
             agent_type: Type of agent (renewal, policy_info, crosssell)
             language: Language hint for Grok
+            cache_ttl: Seconds to cache the response (None uses GROK_CACHE_TTL, 0 disables)
         
         Returns:
             Structured response dict with assistant_text, mood, summary, action, outcome_hint
@@ -170,60 +548,306 @@ class GrokAPI:
             return self._get_fallback_response(messages, agent_type)
         
         # Check cache first
-        cache_key = self._get_cache_key(messages, agent_type)
-        if self._is_cache_valid(cache_key):
+        cache_key = make_cache_key(messages, agent_type, language)
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
             logger.info("Returning cached Grok response")
-            return self.cache[cache_key]["response"]
+            return cached
+        
+        # Identical concurrent requests share one upstream call
+        return await self._ainflight.do(
+            cache_key,
+            lambda: self._afetch_grok(messages, agent_type, language, cache_key, cache_ttl)
+        )
+    
+    async def _afetch_grok(self, messages: List[Dict], agent_type: str, language: str,
+                           cache_key: str, cache_ttl: Optional[float]) -> Dict[str, Any]:
+        """Async counterpart of _fetch_grok"""
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
+            return cached
         
         try:
-            # Add language instruction to system message
-            system_message = messages[0] if messages and messages[0]["role"] == "system" else None
-            if system_message:
-                system_message["content"] += f"\n\nIMPORTANT: Reply in {language} language. Return JSON only with the exact schema specified."
-            else:
-                # Add system message if not present
-                messages.insert(0, {
-                    "role": "system",
-                    "content": f"Reply in {language} language. Return JSON only with the exact schema specified."
-                })
-            
-            # Make API call
-            response = self._call_grok_api(messages, agent_type)
-            
-            if "choices" not in response or not response["choices"]:
-                raise Exception("No choices in Grok response")
-            
-            response_text = response["choices"][0]["message"]["content"]
+            # Add language instruction (the system prompt itself is never modified)
+            grok_messages = self._prepare_messages(messages, language)
             
-            # Validate JSON response
-            parsed_response = self._validate_json_response(response_text)
+            # Make API call and validate JSON response
+            response = await self._acall_grok_api(grok_messages, agent_type)
+            parsed_response = self._parse_api_response(response)
             
             if parsed_response is None:
-                # Try again with explicit JSON instruction
+                # Local repair failed - try again with explicit JSON instruction
                 logger.warning("Invalid JSON from Grok, retrying with explicit instruction")
-                messages[0]["content"] += "\n\nCRITICAL: You must return valid JSON only. No other text."
+                self._count_parse("reasked")
+                grok_messages = self._with_json_reminder(grok_messages)
                 
-                response = self._call_grok_api(messages, agent_type)
-                response_text = response["choices"][0]["message"]["content"]
-                parsed_response = self._validate_json_response(response_text)
+                response = await self._acall_grok_api(grok_messages, agent_type)
+                parsed_response = self._parse_api_response(response)
             
             if parsed_response is None:
                 logger.error("Grok returned invalid JSON after retries - using fallback")
+                self._count_parse("reask_failed")
                 return self._get_fallback_response(messages, agent_type)
             
             # Cache successful response
-            self.cache[cache_key] = {
-                "response": parsed_response,
-                "timestamp": datetime.now()
-            }
+            await self.cache.aset(cache_key, parsed_response, ttl=cache_ttl)
             
             logger.info(f"Grok API call successful for agent: {agent_type}")
             return parsed_response
             
+        except CircuitOpenError:
+            logger.warning("Grok circuit breaker open - using fallback")
+            return self._get_fallback_response(messages, agent_type)
         except Exception as e:
             logger.error(f"Grok API call failed: {str(e)}")
             return self._get_fallback_response(messages, agent_type)
     
+    def _parse_sse_line(self, line: str) -> Optional[str]:
+        """
+        Extract the content delta from one server-sent events line.
+        
+        Returns:
+            Content text (possibly empty), or None once the stream signals [DONE]
+        """
+        if not line or not line.startswith("data:"):
+            return ""
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return None
+        chunk = json.loads(data)
+        choices = chunk.get("choices") or [{}]
+        return (choices[0].get("delta") or {}).get("content") or ""
+    
+    def _stream_rate_limited(self, headers):
+        """Hold back new requests for Retry-After, as the non-streaming calls do, and raise"""
+        delay = self._rate_limited_delay(headers, 0)
+        logger.warning(f"Grok API rate limited the stream, holding requests for {delay:.1f}s")
+        self.rate_limiter.block_for(delay)
+        raise GrokRateLimitedError(f"Grok API rate limited (retry after {delay:.1f}s)")
+    
+    def _stream_grok_api(self, messages: List[Dict]) -> Iterator[str]:
+        """
+        Stream a chat completion (stream=true SSE) and yield content deltas.
+        No retries here - callers fall back to the non-streaming path on failure.
+        A 429 is not counted against the circuit breaker; it blocks the rate
+        limiter for Retry-After and raises GrokRateLimitedError.
+        
+        Args:
+            messages: List of conversation messages
+        
+        Yields:
+            Content text deltas
+        """
+        if not self.api_key:
+            raise ValueError("Grok API key not configured")
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError("Grok circuit breaker is open")
+        
+        request = self._build_request(messages, stream=True)
+        estimated_tokens = self._estimate_tokens(messages)
+        started = None
+        try:
+            with self.rate_limiter.acquire(estimated_tokens):
+                started = time.monotonic()
+                with self.session.post(
+                    request["url"],
+                    headers=request["headers"],
+                    json=request["json"],
+                    timeout=self.timeout,
+                    stream=True
+                ) as response:
+                    if response.status_code == 429:
+                        self._stream_rate_limited(response.headers)
+                    if response.status_code != 200:
+                        raise requests.exceptions.HTTPError(f"Grok API stream error: {response.status_code}")
+                    for line in response.iter_lines(decode_unicode=True):
+                        content = self._parse_sse_line(line)
+                        if content is None:
+                            break
+                        if content:
+                            yield content
+            self.circuit_breaker.record_success(time.monotonic() - started)
+        except (requests.exceptions.RequestException, ValueError):
+            self.circuit_breaker.record_failure(time.monotonic() - started if started else 0.0)
+            raise
+        except BaseException:
+            # Includes GeneratorExit when the consumer stops early
+            self.circuit_breaker.record_ignored()
+            raise
+    
+    async def _astream_grok_api(self, messages: List[Dict]) -> AsyncIterator[str]:
+        """Async counterpart of _stream_grok_api"""
+        if not self.api_key:
+            raise ValueError("Grok API key not configured")
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError("Grok circuit breaker is open")
+        
+        request = self._build_request(messages, stream=True)
+        estimated_tokens = self._estimate_tokens(messages)
+        client = self._get_async_client()
+        started = None
+        try:
+            async with self.rate_limiter.aacquire(estimated_tokens):
+                started = time.monotonic()
+                async with client.stream(
+                    "POST",
+                    request["url"],
+                    headers=request["headers"],
+                    json=request["json"]
+                ) as response:
+                    if response.status_code == 429:
+                        self._stream_rate_limited(response.headers)
+                    if response.status_code != 200:
+                        raise httpx.HTTPError(f"Grok API stream error: {response.status_code}")
+                    async for line in response.aiter_lines():
+                        content = self._parse_sse_line(line)
+                        if content is None:
+                            break
+                        if content:
+                            yield content
+            self.circuit_breaker.record_success(time.monotonic() - started)
+        except (httpx.HTTPError, ValueError):
+            self.circuit_breaker.record_failure(time.monotonic() - started if started else 0.0)
+            raise
+        except BaseException:
+            self.circuit_breaker.record_ignored()
+            raise
+    
+    def _response_events(self, response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Events for a response that was not streamed (cache hit or fallback)"""
+        events = [{"type": "delta", "text": response.get("assistant_text", "")}]
+        events += [{"type": "field", "name": name, "value": value} for name, value in response.items()]
+        events.append({"type": "done", "response": response})
+        return events
+    
+    def _stream_events(self, parser: IncrementalJSONParser, chunk: str, sent_chars: int) -> List[Dict[str, Any]]:
+        """Feed a chunk to the parser and build the delta/field events it unlocks"""
+        completed = parser.feed(chunk)
+        events = []
+        partial = parser.partial_string("assistant_text")
+        if partial is not None and len(partial) > sent_chars:
+            events.append({"type": "delta", "text": partial[sent_chars:]})
+        events += [{"type": "field", "name": name, "value": value} for name, value in completed]
+        return events
+    
+    def stream_grok(self, messages: List[Dict], agent_type: str, language: str = "en",
+                    cache_ttl: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a Grok reply, surfacing structured fields as soon as each one is complete.
+        
+        Yields events:
+            {"type": "delta", "text": str}                 - new assistant_text characters
+            {"type": "field", "name": str, "value": Any}   - a top-level field finished parsing
+            {"type": "done", "response": dict}             - final validated response
+        
+        The done event is always emitted and is authoritative: if the stream fails or the
+        result does not validate, it carries the non-streaming call_grok result (with its
+        retries and rule-based fallback), which may differ from fields already surfaced.
+        
+        Args:
+            messages: List of conversation messages with role and content
+            agent_type: Type of agent (renewal, policy_info, crosssell)
+            language: Language hint for Grok
+            cache_ttl: Seconds to cache the response (None uses GROK_CACHE_TTL, 0 disables)
+        """
+        cache_key = make_cache_key(messages, agent_type, language)
+        cached = self.cache.get(cache_key) if self.api_key else None
+        if not self.api_key or cached is not None:
+            yield from self._response_events(cached or self._get_fallback_response(messages, agent_type))
+            return
+        
+        parser = IncrementalJSONParser()
+        sent_chars = 0
+        try:
+            for chunk in self._stream_grok_api(self._prepare_messages(messages, language)):
+                for event in self._stream_events(parser, chunk, sent_chars):
+                    if event["type"] == "delta":
+                        sent_chars += len(event["text"])
+                    yield event
+            parsed_response = self._parse_response_text(parser.buffer)
+        except CircuitOpenError:
+            logger.warning("Grok circuit breaker open - using fallback")
+            yield {"type": "done", "response": self._get_fallback_response(messages, agent_type)}
+            return
+        except Exception as e:
+            logger.warning(f"Grok stream failed, retrying without streaming: {str(e)}")
+            parsed_response = None
+        
+        if parsed_response is None:
+            yield {"type": "done", "response": self.call_grok(messages, agent_type, language, cache_ttl)}
+            return
+        
+        self.cache.set(cache_key, parsed_response, ttl=cache_ttl)
+        logger.info(f"Grok streaming call successful for agent: {agent_type}")
+        yield {"type": "done", "response": parsed_response}
+    
+    async def astream_grok(self, messages: List[Dict], agent_type: str, language: str = "en",
+                           cache_ttl: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async counterpart of stream_grok, yielding the same events without blocking the loop.
+        
+        Args:
+            messages: List of conversation messages with role and content
+            agent_type: Type of agent (renewal, policy_info, crosssell)
+            language: Language hint for Grok
+            cache_ttl: Seconds to cache the response (None uses GROK_CACHE_TTL, 0 disables)
+        """
+        cache_key = make_cache_key(messages, agent_type, language)
+        cached = await self.cache.aget(cache_key) if self.api_key else None
+        if not self.api_key or cached is not None:
+            for event in self._response_events(cached or self._get_fallback_response(messages, agent_type)):
+                yield event
+            return
+        
+        parser = IncrementalJSONParser()
+        sent_chars = 0
+        try:
+            async for chunk in self._astream_grok_api(self._prepare_messages(messages, language)):
+                for event in self._stream_events(parser, chunk, sent_chars):
+                    if event["type"] == "delta":
+                        sent_chars += len(event["text"])
+                    yield event
+            parsed_response = self._parse_response_text(parser.buffer)
+        except CircuitOpenError:
+            logger.warning("Grok circuit breaker open - using fallback")
+            yield {"type": "done", "response": self._get_fallback_response(messages, agent_type)}
+            return
+        except Exception as e:
+            logger.warning(f"Grok stream failed, retrying without streaming: {str(e)}")
+            parsed_response = None
+        
+        if parsed_response is None:
+            yield {"type": "done", "response": await self.acall_grok(messages, agent_type, language, cache_ttl)}
+            return
+        
+        await self.cache.aset(cache_key, parsed_response, ttl=cache_ttl)
+        logger.info(f"Grok streaming call successful for agent: {agent_type}")
+        yield {"type": "done", "response": parsed_response}
+    
+    def call_grok_streaming(self, messages: List[Dict], agent_type: str, language: str = "en",
+                            on_field: Optional[Callable[[str, Any], None]] = None,
+                            cache_ttl: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Call Grok in streaming mode, invoking on_field as each top-level field completes.
+        
+        Args:
+            messages: List of conversation messages with role and content
+            agent_type: Type of agent (renewal, policy_info, crosssell)
+            language: Language hint for Grok
+            on_field: Callback(field_name, value) for early decisions (e.g. mood, action)
+            cache_ttl: Seconds to cache the response (None uses GROK_CACHE_TTL, 0 disables)
+        
+        Returns:
+            Final structured response dict (same shape as call_grok)
+        """
+        response = None
+        for event in self.stream_grok(messages, agent_type, language, cache_ttl):
+            if event["type"] == "field" and on_field:
+                on_field(event["name"], event["value"])
+            elif event["type"] == "done":
+                response = event["response"]
+        return response
+    
     def _get_fallback_response(self, messages: List[Dict], agent_type: str) -> Dict[str, Any]:
         """
         Generate fallback response when Grok fails.
@@ -270,7 +894,8 @@ class GrokAPI:
 # Global instance
 grok_api = GrokAPI()
 
-def call_grok(messages: List[Dict], agent_type: str, language: str = "en") -> Dict[str, Any]:
+def call_grok(messages: List[Dict], agent_type: str, language: str = "en",
+              cache_ttl: Optional[float] = None, fallback: bool = True) -> Dict[str, Any]:
     """
     Convenience function to call Grok API.
     
@@ -278,8 +903,63 @@ def call_grok(messages: List[Dict], agent_type: str, language: str = "en") -> Di
         messages: List of conversation messages
         agent_type: Type of agent (renewal, policy_info, crosssell)
         language: Language hint for Grok
+        cache_ttl: Seconds to cache the response (None uses GROK_CACHE_TTL, 0 disables)
+        fallback: Return the rule-based fallback response when Grok cannot answer
+    
+    Returns:
+        Structured response dict
+    
+    Raises:
+        GrokUnavailableError: If fallback is False and Grok did not produce a valid response
+    """
+    return grok_api.call_grok(messages, agent_type, language, cache_ttl, fallback)
+
+async def acall_grok(messages: List[Dict], agent_type: str, language: str = "en",
+                     cache_ttl: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Async convenience function to call Grok API without blocking the event loop.
+    
+    Args:
+        messages: List of conversation messages
+        agent_type: Type of agent (renewal, policy_info, crosssell)
+        language: Language hint for Grok
+        cache_ttl: Seconds to cache the response (None uses GROK_CACHE_TTL, 0 disables)
     
     Returns:
         Structured response dict
     """
-    return grok_api.call_grok(messages, agent_type, language)
+    return await grok_api.acall_grok(messages, agent_type, language, cache_ttl)
+
+def call_grok_streaming(messages: List[Dict], agent_type: str, language: str = "en",
+                        on_field: Optional[Callable[[str, Any], None]] = None,
+                        cache_ttl: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Convenience function to call Grok in streaming mode.
+    
+    Args:
+        messages: List of conversation messages
+        agent_type: Type of agent (renewal, policy_info, crosssell)
+        language: Language hint for Grok
+        on_field: Callback(field_name, value) invoked as each top-level field completes
+        cache_ttl: Seconds to cache the response (None uses GROK_CACHE_TTL, 0 disables)
+    
+    Returns:
+        Structured response dict
+    """
+    return grok_api.call_grok_streaming(messages, agent_type, language, on_field, cache_ttl)
+
+def astream_grok(messages: List[Dict], agent_type: str, language: str = "en",
+                 cache_ttl: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Convenience function to stream Grok events (delta, field, done) inside the event loop.
+    
+    Args:
+        messages: List of conversation messages
+        agent_type: Type of agent (renewal, policy_info, crosssell)
+        language: Language hint for Grok
+        cache_ttl: Seconds to cache the response (None uses GROK_CACHE_TTL, 0 disables)
+    
+    Returns:
+        Async iterator of event dicts
+    """
+    return grok_api.astream_grok(messages, agent_type, language, cache_ttl)
@@ -0,0 +1,212 @@
+"""
+Offline throughput measurement for handle_inbound_message.
+Seeds conversations in a scratch database, replays the demo_data transcripts as
+inbound messages and reports throughput, latency percentiles and Grok client
+counters.
+
+DATABASE_URL defaults to loadtest.db and GROK_API_BASE to a local grok_standin.py,
+so no app data is touched and no Grok quota is used. Other targets are refused
+unless --allow-database / --allow-remote-grok is given.
+
+Usage:
+    python grok_standin.py --port 8001 &
+    GROK_API_KEY=standin python loadtest_inbound.py --messages 500 --concurrency 16
+"""
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Tuple
+from urllib.parse import urlparse
+
+from sqlalchemy.engine import make_url
+
+LOADTEST_DATABASE_URL = "sqlite:///./loadtest.db"
+STANDIN_API_BASE = "http://127.0.0.1:8001/v1"
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+APP_DATABASE_FILES = ("demo.db",)  # the app's default database
+
+# Modules read these at import time, so the safe defaults go in first.
+# Never send real SMS from a load test either.
+os.environ.setdefault("DATABASE_URL", LOADTEST_DATABASE_URL)
+os.environ.setdefault("GROK_API_BASE", STANDIN_API_BASE)
+os.environ.setdefault("MESSAGING_ADAPTER", "mock")
+
+from database import get_db, init_db
+from models import Customer, Lead, Conversation, Message
+from grok_standin import load_fixtures
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def check_targets(database_url: str, api_base: str, allow_database: bool = False,
+                  allow_remote_grok: bool = False) -> List[str]:
+    """
+    Check that a load test only writes to a scratch database and only calls a local Grok stand-in.
+
+    Args:
+        database_url: Database the messages are seeded into
+        api_base: Grok API base the pipeline calls
+        allow_database: Accept a non-SQLite or app database
+        allow_remote_grok: Accept a Grok endpoint that is not on this machine
+
+    Returns:
+        List of problems (empty if the targets are safe)
+    """
+    problems = []
+    url = make_url(database_url)
+    if not allow_database:
+        if url.get_backend_name() != "sqlite":
+            problems.append(f"DATABASE_URL {url.render_as_string(hide_password=True)} is not a scratch SQLite "
+                            f"database (use --allow-database to seed it anyway)")
+        elif os.path.basename(url.database or "") in APP_DATABASE_FILES:
+            problems.append(f"DATABASE_URL points at the app database {url.database} "
+                            f"(use e.g. {LOADTEST_DATABASE_URL})")
+    if not allow_remote_grok and urlparse(api_base).hostname not in LOCAL_HOSTS:
+        problems.append(f"GROK_API_BASE {api_base} is not a local stand-in and would use Grok quota "
+                        f"(start grok_standin.py, or use --allow-remote-grok)")
+    return problems
+
+def seed_inbound_messages(count: int, conversations: int) -> List[Tuple[int, int]]:
+    """
+    Create consenting customers, conversations and inbound user messages.
+
+    Args:
+        count: Number of inbound messages
+        conversations: Number of conversations to spread them over
+
+    Returns:
+        List of (conversation_id, message_id) pairs
+    """
+    transcripts = [f["transcript"] for f in load_fixtures() if f["transcript"]] or ["Hello, I have a question."]
+    agent_types = ["renewal", "policy_info", "crosssell"]
+    run_id = int(time.time())
+    db = next(get_db())
+
+    try:
+        conversation_ids = []
+        for i in range(conversations):
+            customer = Customer(
+                name=f"Load Test {i}",
+                phone=f"+1999{run_id % 100000:05d}{i:05d}",
+                consent_given_at=datetime.utcnow()
+            )
+            db.add(customer)
+            db.flush()
+            lead = Lead(
+                customer_id=customer.id,
+                policy_id=f"LT-{run_id}-{i}",
+                expected_value=1000.0,
+                due_date=datetime.utcnow() + timedelta(days=30)
+            )
+            db.add(lead)
+            db.flush()
+            conversation = Conversation(
+                lead_id=lead.id,
+                customer_id=customer.id,
+                agent_type=agent_types[i % len(agent_types)],
+                channel="sms",
+                language="en",
+                status="active"
+            )
+            db.add(conversation)
+            db.flush()
+            conversation_ids.append(conversation.id)
+
+        pairs = []
+        for i in range(count):
+            conversation_id = conversation_ids[i % len(conversation_ids)]
+            message = Message(
+                conversation_id=conversation_id,
+                sender="user",
+                content=f"{transcripts[i % len(transcripts)]} (#{i})",
+                created_at=datetime.utcnow()
+            )
+            db.add(message)
+            db.flush()
+            pairs.append((conversation_id, message.id))
+
+        db.commit()
+        return pairs
+    finally:
+        db.close()
+
+def run_load_test(count: int = 200, concurrency: int = 8, conversations: int = 50) -> Dict[str, Any]:
+    """
+    Run handle_inbound_message for seeded messages on a thread pool.
+
+    Args:
+        count: Number of inbound messages
+        concurrency: Worker threads calling handle_inbound_message
+        conversations: Number of conversations to spread the messages over
+
+    Returns:
+        Dict with throughput, latency percentiles (ms), outcome counts and Grok stats
+    """
+    from processors import handle_inbound_message
+    from llm_grok import grok_api
+
+    pairs = seed_inbound_messages(count, min(conversations, count))
+    latencies = []
+    outcomes = {"ok": 0, "escalated": 0, "errors": 0}
+
+    def handle(pair: Tuple[int, int]) -> Tuple[float, Dict[str, Any]]:
+        started = time.perf_counter()
+        result = handle_inbound_message(*pair)
+        return time.perf_counter() - started, result
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for latency, result in executor.map(handle, pairs):
+            latencies.append(latency)
+            if "error" in result:
+                outcomes["errors"] += 1
+            elif result.get("escalated"):
+                outcomes["escalated"] += 1
+            else:
+                outcomes["ok"] += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        "messages": count,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_per_second": round(count / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50) * 1000, 1),
+            "p95": round(_percentile(latencies, 95) * 1000, 1),
+            "p99": round(_percentile(latencies, 99) * 1000, 1),
+            "max": round(max(latencies) * 1000, 1) if latencies else 0.0
+        },
+        "outcomes": outcomes,
+        "grok": grok_api.get_stats()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure handle_inbound_message throughput offline")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--allow-database", action="store_true",
+                        help="seed a database other than a scratch SQLite file")
+    parser.add_argument("--allow-remote-grok", action="store_true",
+                        help="call a Grok endpoint other than a local stand-in (uses quota)")
+    args = parser.parse_args()
+
+    problems = check_targets(os.environ["DATABASE_URL"], os.environ["GROK_API_BASE"],
+                             args.allow_database, args.allow_remote_grok)
+    if problems:
+        parser.error("refusing to run: " + "; ".join(problems))
+
+    init_db()
+    result = run_load_test(args.messages, args.concurrency, args.conversations)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
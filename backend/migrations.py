@@ -0,0 +1,164 @@
+"""
+Schema migrations.
+create_all() only creates missing tables, so changes to existing tables (new
+columns, new indexes) are applied here. Applied versions are recorded in the
+schema_version table; each migration runs in its own transaction together with
+its version row and is written to be safe on databases that already have the
+change (e.g. freshly created by create_all).
+
+Usage:
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # show applied and pending migrations
+"""
+import argparse
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from models import Base, SchemaVersion, Conversation, ConversationStats, Message, MessagePayload, Lead, Task, Interaction, Job
+from conversation_stats import rebuild_conversation_stats
+
+logger = logging.getLogger(__name__)
+
+def add_column(conn: Connection, table, column_name: str):
+    """Add a nullable model column to an existing table if it is missing"""
+    existing = {col["name"] for col in inspect(conn).get_columns(table.name)}
+    if column_name in existing:
+        return
+    column = table.c[column_name]
+    column_type = column.type.compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+    logger.info(f"Added column {table.name}.{column.name}")
+
+def create_index(conn: Connection, table, index_name: str):
+    """Create a model index on an existing table if it is missing"""
+    index = next(idx for idx in table.indexes if idx.name == index_name)
+    index.create(bind=conn, checkfirst=True)
+    logger.info(f"Ensured index {index_name}")
+
+def _conversation_summary_columns(conn: Connection):
+    for column_name in ("summary_through_message_id", "context_summary", "context_summary_through_id"):
+        add_column(conn, Conversation.__table__, column_name)
+
+def _hot_path_indexes(conn: Connection):
+    create_index(conn, Message.__table__, "ix_messages_conversation_created")
+    create_index(conn, Conversation.__table__, "ix_conversations_customer_status_created")
+    create_index(conn, Lead.__table__, "ix_leads_customer_due_date")
+    create_index(conn, Task.__table__, "ix_tasks_lead_status")
+    if conn.dialect.name == "sqlite":
+        # Refresh planner statistics so the new indexes are picked up
+        conn.execute(text("ANALYZE"))
+
+def _pagination_indexes(conn: Connection):
+    create_index(conn, Conversation.__table__, "ix_conversations_created")
+    create_index(conn, Conversation.__table__, "ix_conversations_status_created")
+    create_index(conn, Interaction.__table__, "ix_interactions_created")
+    create_index(conn, Interaction.__table__, "ix_interactions_customer_created")
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("ANALYZE"))
+
+def _conversation_stats(conn: Connection):
+    ConversationStats.__table__.create(bind=conn, checkfirst=True)
+    count = rebuild_conversation_stats(conn)
+    logger.info(f"Backfilled stats for {count} conversations")
+
+def _message_payloads(conn: Connection):
+    MessagePayload.__table__.create(bind=conn, checkfirst=True)
+    existing = {col["name"] for col in inspect(conn).get_columns("messages")}
+    raw_columns = [name for name in ("provider_raw", "llm_raw") if name in existing]
+    if not raw_columns:
+        return
+    
+    # Move payloads to the side table, then drop them from messages
+    moved = conn.execute(text(
+        f"INSERT INTO message_payloads (message_id, {', '.join(raw_columns)}) "
+        f"SELECT id, {', '.join(raw_columns)} FROM messages "
+        f"WHERE {' OR '.join(f'{name} IS NOT NULL' for name in raw_columns)}"
+    )).rowcount
+    logger.info(f"Moved raw payloads of {moved} messages to message_payloads")
+    if conn.dialect.name == "sqlite" and conn.dialect.dbapi.sqlite_version_info < (3, 35):
+        # No DROP COLUMN before SQLite 3.35; clear the copies (VACUUM reclaims the space)
+        conn.execute(text(f"UPDATE messages SET {', '.join(f'{name} = NULL' for name in raw_columns)}"))
+        return
+    for name in raw_columns:
+        conn.execute(text(f"ALTER TABLE messages DROP COLUMN {name}"))
+
+def _jobs(conn: Connection):
+    Job.__table__.create(bind=conn, checkfirst=True)
+
+def _interaction_filter_indexes(conn: Connection):
+    create_index(conn, Interaction.__table__, "ix_interactions_lead_created")
+    create_index(conn, Interaction.__table__, "ix_interactions_status_created")
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("ANALYZE"))
+
+# Ordered list of (version, description, upgrade function); append only
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Conversation summary checkpoint and context window columns", _conversation_summary_columns),
+    (2, "Composite indexes for message, conversation, lead and task lookups", _hot_path_indexes),
+    (3, "(created_at, id) indexes for conversation and interaction list pagination", _pagination_indexes),
+    (4, "conversation_stats rollup table, backfilled from messages", _conversation_stats),
+    (5, "Move message llm_raw/provider_raw to message_payloads", _message_payloads),
+    (6, "jobs table for the durable job queue", _jobs),
+    (7, "(lead_id|status, created_at, id) indexes for filtered interaction pages", _interaction_filter_indexes),
+]
+
+def applied_versions(engine: Engine) -> Dict[int, datetime]:
+    """Get applied migration versions and when they were applied"""
+    SchemaVersion.__table__.create(bind=engine, checkfirst=True)
+    with engine.connect() as conn:
+        rows = conn.execute(SchemaVersion.__table__.select()).fetchall()
+    return {row.version: row.applied_at for row in rows}
+
+def run_migrations(engine: Engine) -> List[int]:
+    """
+    Apply pending migrations in version order.
+
+    Args:
+        engine: Engine of the database to upgrade
+
+    Returns:
+        Versions applied by this call
+    """
+    done = applied_versions(engine)
+    applied = []
+    for version, description, upgrade in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            if conn.dialect.name == "sqlite":
+                # pysqlite only opens a transaction before DML; without an explicit
+                # BEGIN, DDL in a failed migration would already be committed
+                conn.exec_driver_sql("BEGIN")
+            upgrade(conn)
+            conn.execute(SchemaVersion.__table__.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        logger.info(f"Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument("--status", action="store_true", help="show migration status without applying")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from database import engine
+
+    if args.status:
+        done = applied_versions(engine)
+        for version, description, _ in MIGRATIONS:
+            state = f"applied {done[version].isoformat()}" if version in done else "pending"
+            print(f"{version:>4}  {state:<35} {description}")
+        return
+
+    Base.metadata.create_all(bind=engine)
+    applied = run_migrations(engine)
+    print(f"Applied migrations: {applied}" if applied else "Database schema is up to date")
+
+if __name__ == "__main__":
+    main()
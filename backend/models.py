@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -21,6 +22,10 @@ class Customer(Base):
 
 class Lead(Base):
     __tablename__ = "leads"
+    __table_args__ = (
+        # Most recent lead of a customer (webhooks)
+        Index("ix_leads_customer_due_date", "customer_id", "due_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
@@ -51,6 +56,13 @@ class MessageJob(Base):
 
 class Interaction(Base):
     __tablename__ = "interactions"
+    __table_args__ = (
+        # Keyset pagination, newest first (all / per customer, lead or status)
+        Index("ix_interactions_created", "created_at", "id"),
+        Index("ix_interactions_customer_created", "customer_id", "created_at", "id"),
+        Index("ix_interactions_lead_created", "lead_id", "created_at", "id"),
+        Index("ix_interactions_status_created", "status", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     lead_id = Column(Integer, ForeignKey("leads.id"), nullable=True)
@@ -88,6 +100,9 @@ class Interaction(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_lead_status", "lead_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     lead_id = Column(Integer, ForeignKey("leads.id"), nullable=False)
@@ -102,6 +117,13 @@ class Task(Base):
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Active conversation of a customer, newest first (webhooks)
+        Index("ix_conversations_customer_status_created", "customer_id", "status", "created_at"),
+        # Keyset pagination, newest first (all / per status)
+        Index("ix_conversations_created", "created_at", "id"),
+        Index("ix_conversations_status_created", "status", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     lead_id = Column(Integer, ForeignKey("leads.id"), nullable=True)
@@ -111,6 +133,9 @@ class Conversation(Base):
     language = Column(String(10), default="en")
     status = Column(String(50), default="active")  # active, completed, escalated
     summary = Column(Text, nullable=True)  # 3-bullet summary
+    summary_through_message_id = Column(Integer, nullable=True)  # Last message covered by summary
+    context_summary = Column(Text, nullable=True)  # Rolling summary of turns outside the context window
+    context_summary_through_id = Column(Integer, nullable=True)  # Last message folded into context_summary
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -118,9 +143,14 @@ class Conversation(Base):
     lead = relationship("Lead")
     customer = relationship("Customer")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
+    stats = relationship("ConversationStats", uselist=False, viewonly=True)
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Messages of a conversation in order (every turn and summary)
+        Index("ix_messages_conversation_created", "conversation_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
@@ -128,8 +158,6 @@ class Message(Base):
     content = Column(Text, nullable=False)
     message_type = Column(String(20), default="text")  # text, audio, image
     provider_message_id = Column(String(100), nullable=True)  # Twilio SID, etc.
-    provider_raw = Column(JSON, nullable=True)  # Raw provider data
-    llm_raw = Column(JSON, nullable=True)  # Raw LLM response
     mood = Column(JSON, nullable=True)  # Mood analysis from LLM
     action = Column(String(50), nullable=True)  # Action from LLM
     outcome_hint = Column(JSON, nullable=True)  # Outcome hint from LLM
@@ -137,3 +165,70 @@ class Message(Base):
     
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
+    payload = relationship("MessagePayload", uselist=False, cascade="all, delete-orphan")
+    
+    # Raw payloads live in message_payloads and are loaded only when accessed
+    provider_raw = association_proxy("payload", "provider_raw", creator=lambda value: MessagePayload(provider_raw=value))
+    llm_raw = association_proxy("payload", "llm_raw", creator=lambda value: MessagePayload(llm_raw=value))
+
+class MessagePayload(Base):
+    """Bulky raw payloads of a message, kept off the messages rows"""
+    __tablename__ = "message_payloads"
+    
+    message_id = Column(Integer, ForeignKey("messages.id"), primary_key=True)
+    provider_raw = Column(JSON, nullable=True)  # Raw provider data
+    llm_raw = Column(JSON, nullable=True)  # Raw LLM response
+
+class ConversationStats(Base):
+    """Per-conversation rollup, maintained on every message flush (see conversation_stats.py)"""
+    __tablename__ = "conversation_stats"
+    
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), primary_key=True)
+    user_message_count = Column(Integer, nullable=False, default=0)
+    assistant_message_count = Column(Integer, nullable=False, default=0)
+    user_word_count = Column(Integer, nullable=False, default=0)
+    escalation_count = Column(Integer, nullable=False, default=0)
+    last_message_at = Column(DateTime, nullable=True)
+    latest_mood = Column(JSON, nullable=True)  # Mood of the latest assistant message that had one
+    latest_outcome = Column(JSON, nullable=True)  # Outcome hint of the latest assistant message that had one
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class Job(Base):
+    """Durable background job (see job_queue.py)"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Claim scan: queued or lease-expired jobs that are due, oldest first
+        Index("ix_jobs_status_available", "status", "available_at", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)  # handler name
+    payload = Column(JSON, nullable=False)  # handler keyword arguments
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, done, dead
+    attempts = Column(Integer, nullable=False, default=0)  # times claimed
+    max_attempts = Column(Integer, nullable=False, default=5)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # due time; lease expiry while running
+    locked_by = Column(String(100), nullable=True)  # worker holding the lease
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+class SummaryJobCheckpoint(Base):
+    __tablename__ = "summary_job_checkpoints"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String(100), nullable=False, unique=True)
+    last_conversation_id = Column(Integer, default=0)  # Highest conversation ID already handled
+    processed = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    status = Column(String(50), default="running")  # running, completed, failed
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+    
+    version = Column(Integer, primary_key=True)
+    description = Column(String(255), nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
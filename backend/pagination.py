@@ -0,0 +1,85 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+Pages are ordered by (created_at, id) and continue from an opaque cursor that
+encodes the last row's sort key, so every page is an index range scan instead of
+an OFFSET scan, and rows inserted while paging never shift or repeat a page.
+"""
+import os
+import json
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import Select
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "200"))
+
+class InvalidCursor(ValueError):
+    """Cursor could not be decoded"""
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a row's (created_at, id) sort key as an opaque cursor"""
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor from encode_cursor; raises InvalidCursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+def page_size(limit: Optional[int]) -> int:
+    """Clamp a requested page size to 1..PAGE_SIZE_MAX (default PAGE_SIZE_DEFAULT)"""
+    if not limit:
+        return PAGE_SIZE_DEFAULT
+    return max(1, min(limit, PAGE_SIZE_MAX))
+
+def paginate(query: Select, model, cursor: Optional[str], limit: Optional[int], descending: bool = True) -> Select:
+    """
+    Apply keyset ordering, the cursor bound and the page limit to a select.
+
+    One extra row is fetched so page() can tell whether another page follows.
+
+    Args:
+        query: Select of model rows, already filtered
+        model: Model with created_at and id columns
+        cursor: Cursor of the last row of the previous page (None for the first page)
+        limit: Requested page size
+        descending: Newest first (True) or oldest first
+
+    Returns:
+        Select for the page
+    """
+    created_at, row_id = model.created_at, model.id
+    if cursor:
+        after_created_at, after_id = decode_cursor(cursor)
+        if descending:
+            query = query.where(or_(created_at < after_created_at,
+                                    and_(created_at == after_created_at, row_id < after_id)))
+        else:
+            query = query.where(or_(created_at > after_created_at,
+                                    and_(created_at == after_created_at, row_id > after_id)))
+    order = (created_at.desc(), row_id.desc()) if descending else (created_at.asc(), row_id.asc())
+    return query.order_by(*order).limit(page_size(limit) + 1)
+
+def page(rows: List[Any], limit: Optional[int], serialize) -> Dict[str, Any]:
+    """
+    Build a page response from the rows of a paginate() query.
+
+    Args:
+        rows: Fetched rows (up to page size + 1)
+        limit: Requested page size (same as passed to paginate)
+        serialize: Function turning a row into a response dict
+
+    Returns:
+        Dict with items and next_cursor (None on the last page)
+    """
+    size = page_size(limit)
+    items = rows[:size]
+    next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if len(rows) > size else None
+    return {"items": [serialize(row) for row in items], "next_cursor": next_cursor}
@@ -1,23 +1,46 @@
-from typing import Dict, Any, List
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
+import os
 import re
 import json
+import asyncio
+import logging
 from datetime import datetime
+from sqlalchemy import func, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from database import get_db
+from database import get_db, AsyncSessionLocal
 from models import Interaction, Task, Conversation, Message, Customer, Lead
-from llm_grok import call_grok
-from prompts import get_agent_prompt, format_prompt_with_context
+from llm_grok import GrokUnavailableError, call_grok, call_grok_streaming, acall_grok, astream_grok
+from prompts import build_agent_messages, GREETING_USER_PROMPT
+from context_window import ContextWindow, select_context_window
+from turn_context import TurnContext, load_turn_context, aload_turn_context
+from language import detect_language
+from conversation_stats import record_escalation
+from group_commit import group_commit, group_commit_add
+
+logger = logging.getLogger(__name__)
+
+# Opening greetings only depend on the agent prompt and customer context, so they
+# can be cached much longer than per-turn replies.
+GREETING_CACHE_TTL = float(os.getenv("GROK_GREETING_CACHE_TTL", "300"))
+
+# Stream Grok replies so escalation can start as soon as mood/action are known
+GROK_STREAMING = os.getenv("GROK_STREAMING", "false").lower() in ("1", "true", "yes", "on")
 
 def process_inbound_interaction(interaction_id: int):
     """
     Process an inbound interaction by analyzing mood, generating summary, and determining outcome.
-    This function runs as a background task.
+    This function runs as a queued job (see job_queue.py).
     
     Args:
         interaction_id: ID of the interaction to process
+    
+    Raises:
+        Exception: If processing failed (the interaction is marked failed and the job retried)
     """
     db = next(get_db())
+    interaction = None
     
     try:
         # Get the interaction
@@ -28,6 +51,10 @@ def process_inbound_interaction(interaction_id: int):
         
         print(f"Processing interaction {interaction_id}: {interaction.transcript[:50]}...")
         
+        # Step 0: Detect language (falls back to the hinted language for short texts)
+        customer = db.query(Customer).filter(Customer.id == interaction.customer_id).first() if interaction.customer_id else None
+        interaction.language = detect_language(interaction.transcript, customer, interaction.language or "en")
+        
         # Step 1: Detect mood
         mood_result = detect_mood(interaction.transcript)
         interaction.mood_label = mood_result["label"]
@@ -74,9 +101,12 @@ def process_inbound_interaction(interaction_id: int):
         
     except Exception as e:
         print(f"Error processing interaction {interaction_id}: {str(e)}")
-        # Mark interaction as failed
-        interaction.status = "failed"
-        db.commit()
+        # Mark interaction as failed (until a retry succeeds)
+        db.rollback()
+        if interaction is not None:
+            interaction.status = "failed"
+            db.commit()
+        raise
     finally:
         db.close()
 
@@ -239,31 +269,257 @@ def run_stt(audio_file_path: str, language: str = "en") -> str:
     # TODO: Implement STT integration
     raise NotImplementedError("STT integration not implemented")
 
-def process_conversation_message(conversation_id: int, user_message: str, language: str = "en"):
+def build_turn_messages(turn: TurnContext, window: ContextWindow, language: str = "en") -> List[Dict[str, str]]:
+    """
+    Build the Grok messages for a conversation turn: agent system prompt, rolling summary
+    of older turns and the messages in the context window.
+    
+    Args:
+        turn: Loaded turn context
+        window: Context window selected from the turn's messages
+        language: Language the agent must reply in
+    
+    Returns:
+        List of Grok messages
+    """
+    # Add conversation history
+    history = [
+        {"role": "user" if msg.sender == "user" else "assistant", "content": msg.content}
+        for msg in window.messages
+    ]
+    
+    return build_agent_messages(
+        turn.conversation.agent_type, turn.agent_context(), language, history,
+        conversation_summary=window.summary
+    )
+
+def prepare_turn(turn: TurnContext, text: str, language: Optional[str] = None) -> Tuple[str, List[Dict[str, str]]]:
+    """
+    Pick the reply language and build the Grok messages for a turn. Works on the
+    loaded turn only (no queries). Updates the conversation's language and rolling
+    summary; the caller commits.
+    
+    Args:
+        turn: Loaded turn context, including the latest customer message
+        text: Latest customer message
+        language: Reply language (detected from text if not given)
+    
+    Returns:
+        Tuple of (reply language, Grok messages)
+    """
+    conversation = turn.conversation
+    
+    # Reply in the language the customer writes in
+    conversation.language = language or detect_language(text, turn.customer, conversation.language or "en")
+    
+    # Newest messages within the token budget; older turns go into the rolling summary
+    window = select_context_window(conversation, turn.messages)
+    
+    return conversation.language, build_turn_messages(turn, window, conversation.language)
+
+def detected_customer_language(turn: TurnContext) -> Optional[str]:
+    """The customer's preferred language if prepare_turn changed it on this turn, else None"""
+    if inspect(turn.customer).attrs.preferred_language.history.has_changes():
+        return turn.customer.preferred_language
+    return None
+
+def needs_escalation(action: Any, mood: Any) -> bool:
+    """Check the escalation rule: escalate action, or negative mood with confidence >= 0.7"""
+    if action == "escalate":
+        return True
+    return isinstance(mood, dict) and mood.get("label") == "negative" and (mood.get("confidence") or 0) >= 0.7
+
+def create_escalation_task(db: Session, conversation: Conversation, action: Any, mood: Any) -> Task:
+    """
+    Create an escalation task for a conversation and mark it escalated.
+    
+    Args:
+        db: Database session
+        conversation: Conversation to escalate
+        action: Action from Grok (may be None if escalating early on mood)
+        mood: Mood dict from Grok (may be None if escalating early on action)
+    
+    Returns:
+        The new Task
+    """
+    confidence = mood.get("confidence", 0) if isinstance(mood, dict) else 0
+    task = Task(
+        lead_id=conversation.lead_id,
+        type="escalation",
+        status="open",
+        notes=f"Escalated due to {action or 'pending'} action or negative mood (confidence: {confidence:.2f})"
+    )
+    db.add(task)
+    conversation.status = "escalated"
+    record_escalation(db, conversation)
+    print(f"Created escalation task for conversation {conversation.id}")
+    return task
+
+def call_grok_for_turn(db: Session, conversation: Conversation, grok_messages: List[Dict], language: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Call Grok for a conversation turn.
+    
+    In streaming mode (GROK_STREAMING=true) the escalation rule is checked as soon as
+    mood or action finish streaming; if it fires, the escalation task is committed
+    right away instead of after the full reply has been generated.
+    
+    Args:
+        db: Database session
+        conversation: Conversation being processed
+        grok_messages: Prepared Grok messages
+        language: Language hint for Grok
+    
+    Returns:
+        Tuple of (Grok response, whether the conversation was already escalated early)
+    """
+    if not GROK_STREAMING:
+        return call_grok(grok_messages, conversation.agent_type, language), False
+    
+    early = {"escalated": False, "action": None, "mood": None}
+    
+    def on_field(name: str, value: Any):
+        if name not in ("action", "mood") or early["escalated"]:
+            return
+        early[name] = value
+        if needs_escalation(early["action"], early["mood"]):
+            create_escalation_task(db, conversation, early["action"], early["mood"])
+            db.commit()
+            early["escalated"] = True
+            print(f"Escalated conversation {conversation.id} early on streamed {name}")
+    
+    grok_response = call_grok_streaming(grok_messages, conversation.agent_type, language, on_field=on_field)
+    return grok_response, early["escalated"]
+
+def save_turn_reply(db: Session, conversation: Conversation, grok_response: Dict[str, Any],
+                    escalated_early: bool = False) -> Tuple[Message, bool]:
+    """
+    Add the assistant reply for a turn and create the escalation task if needed.
+    Only adds objects, so it works with sync and async sessions; the caller commits.
+    
+    Args:
+        db: Database session
+        conversation: Conversation being processed
+        grok_response: Structured Grok response
+        escalated_early: Escalation task was already created while streaming
+    
+    Returns:
+        Tuple of (assistant message, whether the conversation was escalated)
+    """
+    # Save assistant message
+    assistant_msg = Message(
+        conversation_id=conversation.id,
+        sender="assistant",
+        content=grok_response["assistant_text"],
+        llm_raw=grok_response,
+        mood=grok_response["mood"],
+        action=grok_response["action"],
+        outcome_hint=grok_response["outcome_hint"],
+        created_at=datetime.utcnow()
+    )
+    db.add(assistant_msg)
+    
+    # Check if escalation is needed
+    should_escalate = escalated_early or needs_escalation(grok_response["action"], grok_response["mood"])
+    if should_escalate and not escalated_early:
+        create_escalation_task(db, conversation, grok_response["action"], grok_response["mood"])
+    
+    # Update conversation
+    conversation.updated_at = datetime.utcnow()
+    return assistant_msg, should_escalate
+
+def send_reply(conversation: Conversation, customer: Customer, text: str) -> Dict[str, Any]:
+    """
+    Send an assistant reply via the messaging adapter.
+    
+    Args:
+        conversation: Conversation being processed
+        customer: Customer to send to
+        text: Reply text
+    
+    Returns:
+        Adapter send result
+    """
+    from adapters import get_adapter
+    adapter = get_adapter()
+    
+    job_data = {
+        "to_number": customer.phone,
+        "message_body": text,
+        "conversation_id": conversation.id
+    }
+    
+    send_result = adapter.send(job_data)
+    if send_result.get("success"):
+        print(f"Sent assistant message via {adapter.name}")
+    else:
+        print(f"Failed to send message: {send_result.get('error')}")
+    return send_result
+
+def record_send_result(assistant_msg: Message, send_result: Optional[Dict[str, Any]]):
+    """Record a successful send's provider info on the assistant message"""
+    if send_result and send_result.get("success"):
+        assistant_msg.provider_message_id = send_result.get("message_id")
+        assistant_msg.provider_raw = send_result
+
+def send_turn_reply(conversation: Conversation, customer: Customer, assistant_msg: Message):
+    """
+    Send an assistant reply via the messaging adapter and record the provider result
+    on the message.
+    
+    Args:
+        conversation: Conversation being processed
+        customer: Customer to send to
+        assistant_msg: Assistant message from save_turn_reply
+    """
+    record_send_result(assistant_msg, send_reply(conversation, customer, assistant_msg.content))
+
+def apply_turn_reply(db: Session, conversation: Conversation, customer: Customer,
+                     grok_response: Dict[str, Any], escalated_early: bool = False) -> bool:
+    """
+    Save the assistant reply for a turn, then escalate or send it via the messaging adapter.
+    The caller commits.
+    
+    Args:
+        db: Database session
+        conversation: Conversation being processed
+        customer: Customer of the conversation
+        grok_response: Structured Grok response
+        escalated_early: Escalation task was already created while streaming
+    
+    Returns:
+        Whether the conversation was escalated
+    """
+    assistant_msg, should_escalate = save_turn_reply(db, conversation, grok_response, escalated_early)
+    if not should_escalate:
+        send_turn_reply(conversation, customer, assistant_msg)
+    return should_escalate
+
+def process_conversation_message(conversation_id: int, user_message: str, language: Optional[str] = None):
     """
     Process a new user message in a conversation using Grok LLM.
     
     Args:
         conversation_id: ID of the conversation
         user_message: User's message content
-        language: Language hint for Grok
+        language: Language hint for Grok (detected from the message if not given)
     """
     db = next(get_db())
     
     try:
-        # Get conversation
-        conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
-        if not conversation:
+        # Conversation, customer, lead and unsummarized messages
+        turn = load_turn_context(db, conversation_id)
+        if not turn:
             print(f"Conversation {conversation_id} not found")
             return
+        conversation = turn.conversation
         
         # Check consent and DNC
-        customer = db.query(Customer).filter(Customer.id == conversation.customer_id).first()
-        if not customer or customer.do_not_contact or not customer.consent_given_at:
+        if not turn.can_contact:
             print(f"Customer {conversation.customer_id} has not consented or is DNC")
             return
         
-        # Add user message to conversation
+        # Add user message to conversation. Committed before calling Grok, so no write
+        # transaction stays open across the Grok call and the message survives a failed turn
         user_msg = Message(
             conversation_id=conversation_id,
             sender="user",
@@ -272,101 +528,17 @@ def process_conversation_message(conversation_id: int, user_message: str, langua
         )
         db.add(user_msg)
         db.commit()
-        
-        # Get last 8 messages for context
-        recent_messages = db.query(Message).filter(
-            Message.conversation_id == conversation_id
-        ).order_by(Message.created_at.desc()).limit(8).all()
-        
-        # Reverse to get chronological order
-        recent_messages.reverse()
+        turn.add_message(user_msg)
         
         # Prepare messages for Grok
-        grok_messages = []
-        
-        # Add system prompt
-        context = {
-            "customer_name": customer.name,
-            "policy_id": conversation.lead.policy_id if conversation.lead else "N/A",
-            "due_date": conversation.lead.due_date.isoformat() if conversation.lead and conversation.lead.due_date else "N/A",
-            "outstanding_amount": conversation.lead.expected_value if conversation.lead else 0,
-            "policy_type": "Insurance Policy",
-            "policy_value": conversation.lead.expected_value if conversation.lead else 0
-        }
-        
-        system_prompt = get_agent_prompt(conversation.agent_type)
-        formatted_prompt = format_prompt_with_context(system_prompt, context)
-        
-        grok_messages.append({
-            "role": "system",
-            "content": formatted_prompt
-        })
-        
-        # Add conversation history
-        for msg in recent_messages:
-            grok_messages.append({
-                "role": "user" if msg.sender == "user" else "assistant",
-                "content": msg.content
-            })
+        language, grok_messages = prepare_turn(turn, user_message, language)
         
         # Call Grok
         print(f"Calling Grok for conversation {conversation_id} with agent {conversation.agent_type}")
-        grok_response = call_grok(grok_messages, conversation.agent_type, language)
-        
-        # Save assistant message
-        assistant_msg = Message(
-            conversation_id=conversation_id,
-            sender="assistant",
-            content=grok_response["assistant_text"],
-            llm_raw=grok_response,
-            mood=grok_response["mood"],
-            action=grok_response["action"],
-            outcome_hint=grok_response["outcome_hint"],
-            created_at=datetime.utcnow()
-        )
-        db.add(assistant_msg)
-        
-        # Check if escalation is needed
-        should_escalate = (
-            grok_response["action"] == "escalate" or
-            (grok_response["mood"]["label"] == "negative" and grok_response["mood"]["confidence"] >= 0.7)
-        )
-        
-        if should_escalate:
-            # Create escalation task
-            task = Task(
-                lead_id=conversation.lead_id,
-                type="escalation",
-                status="open",
-                notes=f"Escalated due to {grok_response['action']} action or negative mood (confidence: {grok_response['mood']['confidence']:.2f})"
-            )
-            db.add(task)
-            conversation.status = "escalated"
-            print(f"Created escalation task for conversation {conversation_id}")
-        else:
-            # Send response via adapter
-            from adapters import get_adapter
-            adapter = get_adapter()
-            
-            # Prepare message for sending
-            job_dict = {
-                "to_number": customer.phone,
-                "message_body": grok_response["assistant_text"],
-                "conversation_id": conversation_id
-            }
-            
-            send_result = adapter.send(job_dict)
-            
-            # Update message with provider info
-            if send_result.get("success"):
-                assistant_msg.provider_message_id = send_result.get("message_id")
-                assistant_msg.provider_raw = send_result
-                print(f"Sent assistant message via {adapter.name}")
-            else:
-                print(f"Failed to send message: {send_result.get('error')}")
+        grok_response, escalated_early = call_grok_for_turn(db, conversation, grok_messages, language)
         
-        # Update conversation
-        conversation.updated_at = datetime.utcnow()
+        # Save reply, then escalate or send
+        apply_turn_reply(db, conversation, turn.customer, grok_response, escalated_early)
         db.commit()
         
         print(f"Successfully processed conversation {conversation_id}")
@@ -377,69 +549,148 @@ def process_conversation_message(conversation_id: int, user_message: str, langua
     finally:
         db.close()
 
+def build_summary_messages(messages: List[Message], previous_summary: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Build the Grok messages for a 3-bullet conversation summary.
+    
+    Args:
+        messages: Messages to summarize in chronological order (only the new ones when
+            previous_summary is given)
+        previous_summary: Summary of the conversation up to the first of these messages
+    
+    Returns:
+        List of Grok messages
+    """
+    # Prepare conversation context for summarization
+    conversation_text = "\n".join([
+        f"{msg.sender}: {msg.content}" for msg in messages
+    ])
+    
+    # Create summarization prompt
+    if previous_summary:
+        summary_prompt = f"""Here is the current 3-bullet summary of a customer conversation:
+
+{previous_summary}
+
+New messages since that summary:
+
+{conversation_text}
+
+Update the summary so it covers the whole conversation in exactly 3 bullet points.
+Return only the 3 bullet points, one per line, starting with "•"."""
+    else:
+        summary_prompt = f"""Summarize this customer conversation in exactly 3 bullet points:
+
+{conversation_text}
+
+Return only the 3 bullet points, one per line, starting with "•"."""
+    
+    return [
+        {
+            "role": "system",
+            "content": "You are a conversation summarizer. Return exactly 3 bullet points summarizing the key points of the conversation."
+        },
+        {
+            "role": "user",
+            "content": summary_prompt
+        }
+    ]
+
+def summarize_messages(messages: List[Message], language: str = "en", previous_summary: Optional[str] = None) -> str:
+    """
+    Summarize conversation messages with Grok.
+    
+    Args:
+        messages: Conversation messages in chronological order
+        language: Conversation language
+        previous_summary: Existing summary to extend with these messages
+    
+    Returns:
+        Summary string
+    
+    Raises:
+        GrokUnavailableError: If Grok did not produce a summary (the rule-based fallback
+            reply is never returned as a summary)
+    """
+    # Call Grok for summarization
+    grok_response = call_grok(build_summary_messages(messages, previous_summary), "policy_info", language,
+                              fallback=False)
+    
+    # Extract summary from response
+    summary = (grok_response.get("assistant_text") or "").strip()
+    if not summary:
+        raise GrokUnavailableError("Grok returned an empty summary")
+    return summary
+
+def get_cached_summary(db: Session, conversation: Conversation) -> Optional[str]:
+    """
+    Get the stored summary if it already covers the latest message.
+    
+    Args:
+        db: Database session
+        conversation: Conversation to check
+    
+    Returns:
+        Summary string, or None if there is no summary or new messages arrived since
+    """
+    if not conversation.summary or not conversation.summary_through_message_id:
+        return None
+    latest_id = db.query(func.max(Message.id)).filter(Message.conversation_id == conversation.id).scalar()
+    if latest_id is not None and latest_id > conversation.summary_through_message_id:
+        return None
+    return conversation.summary
+
 def generate_conversation_summary(conversation_id: int) -> str:
     """
     Generate a 3-bullet summary of a conversation using Grok.
     
+    Summaries are incremental: only messages after summary_through_message_id are sent,
+    together with the previous summary. If nothing changed, the stored summary is
+    returned without calling Grok.
+    
     Args:
         conversation_id: ID of the conversation
     
     Returns:
         Summary string
+    
+    Raises:
+        GrokUnavailableError: If Grok could not summarize (nothing is stored, so the job is retried)
+        Exception: If the summary could not be stored
     """
     db = next(get_db())
     
     try:
-        # Get conversation and all messages
         conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
         if not conversation:
             return "Conversation not found"
         
-        messages = db.query(Message).filter(
-            Message.conversation_id == conversation_id
-        ).order_by(Message.created_at).all()
-        
-        if not messages:
-            return "No messages in conversation"
-        
-        # Prepare conversation context for summarization
-        conversation_text = "\n".join([
-            f"{msg.sender}: {msg.content}" for msg in messages
-        ])
-        
-        # Create summarization prompt
-        summary_prompt = f"""Summarize this customer conversation in exactly 3 bullet points:
-
-{conversation_text}
-
-Return only the 3 bullet points, one per line, starting with "•"."""
+        cached = get_cached_summary(db, conversation)
+        if cached is not None:
+            return cached
         
-        grok_messages = [
-            {
-                "role": "system",
-                "content": "You are a conversation summarizer. Return exactly 3 bullet points summarizing the key points of the conversation."
-            },
-            {
-                "role": "user",
-                "content": summary_prompt
-            }
-        ]
+        # Only messages the current summary does not cover yet
+        previous_summary = conversation.summary if conversation.summary_through_message_id else None
+        query = db.query(Message).filter(Message.conversation_id == conversation_id)
+        if previous_summary:
+            query = query.filter(Message.id > conversation.summary_through_message_id)
+        messages = query.order_by(Message.created_at, Message.id).all()
         
-        # Call Grok for summarization
-        grok_response = call_grok(grok_messages, "policy_info", conversation.language)
+        if not messages:
+            return conversation.summary or "No messages in conversation"
         
-        # Extract summary from response
-        summary = grok_response.get("assistant_text", "Summary generation failed")
+        summary = summarize_messages(messages, conversation.language, previous_summary)
         
         # Update conversation with summary
         conversation.summary = summary
+        conversation.summary_through_message_id = max(msg.id for msg in messages)
         db.commit()
         
         return summary
         
     except Exception as e:
-        print(f"Error generating summary for conversation {conversation_id}: {str(e)}")
-        return "Summary generation failed"
+        logger.error(f"Error generating summary for conversation {conversation_id}: {str(e)}")
+        raise
     finally:
         db.close()
 
@@ -486,6 +737,9 @@ def start_outbound_conversation(job_dict: Dict[str, Any]):
     
     Args:
         job_dict: Dictionary containing conversation and job details
+    
+    Raises:
+        Exception: If the message could not be generated or stored
     """
     db = next(get_db())
     
@@ -515,19 +769,12 @@ def start_outbound_conversation(job_dict: Dict[str, Any]):
             "policy_value": initial_context.get("outstanding_amount", 0)
         }
         
-        # Get system prompt and format with context
-        system_prompt = get_agent_prompt(agent_type)
-        formatted_prompt = format_prompt_with_context(system_prompt, context)
-        
         # Create initial Grok messages
-        grok_messages = [
-            {"role": "system", "content": formatted_prompt},
-            {"role": "user", "content": "Start the conversation with a greeting and introduction."}
-        ]
+        language = initial_context.get("language", "en")
+        grok_messages = build_agent_messages(agent_type, context, language, user_prompt=GREETING_USER_PROMPT)
         
         # Call Grok to generate initial message
-        language = initial_context.get("language", "en")
-        grok_response = call_grok(grok_messages, agent_type, language)
+        grok_response = call_grok(grok_messages, agent_type, language, cache_ttl=GREETING_CACHE_TTL)
         
         # Create assistant message
         assistant_msg = Message(
@@ -565,143 +812,317 @@ def start_outbound_conversation(job_dict: Dict[str, Any]):
     except Exception as e:
         print(f"Error starting outbound conversation: {str(e)}")
         db.rollback()
+        raise
     finally:
         db.close()
 
-def handle_inbound_message(conversation_id: int, message_id: int) -> Dict[str, Any]:
+def _turn_result(grok_response: Dict[str, Any], escalated: bool) -> Dict[str, Any]:
+    return {
+        "action": grok_response["action"],
+        "mood": grok_response["mood"],
+        "outcome": grok_response["outcome_hint"],
+        "escalated": escalated
+    }
+
+def handle_inbound_message(conversation_id: int, message_id: int, language: Optional[str] = None) -> Dict[str, Any]:
     """
     Handle an inbound message by processing with Grok and sending response.
     
     Args:
         conversation_id: ID of the conversation
         message_id: ID of the user message
+        language: Language hint for Grok (detected from the message if not given)
     
     Returns:
-        Dictionary with processing results
+        Dictionary with processing results, or with "error" (and "permanent" if
+        retrying cannot help)
     """
     db = next(get_db())
     
     try:
-        # Get conversation and user message
-        conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
-        user_msg = db.query(Message).filter(Message.id == message_id).first()
+        # Conversation, customer, lead and unsummarized messages (including the new one)
+        turn = load_turn_context(db, conversation_id)
+        user_msg = turn and (turn.message(message_id) or db.get(Message, message_id))
         
-        if not conversation or not user_msg:
-            return {"error": "Conversation or message not found"}
+        if not turn or not user_msg:
+            return {"error": "Conversation or message not found", "permanent": True}
         
         # Check consent and DNC
-        customer = db.query(Customer).filter(Customer.id == conversation.customer_id).first()
-        if not customer or customer.do_not_contact or not customer.consent_given_at:
-            return {"error": "Customer has not consented or is DNC"}
-        
-        # Get last 8 messages for context
-        recent_messages = db.query(Message).filter(
-            Message.conversation_id == conversation_id
-        ).order_by(Message.created_at.desc()).limit(8).all()
-        
-        # Reverse to get chronological order
-        recent_messages.reverse()
+        if not turn.can_contact:
+            return {"error": "Customer has not consented or is DNC", "permanent": True}
         
         # Prepare messages for Grok
-        grok_messages = []
-        
-        # Add system prompt
-        context = {
-            "customer_name": customer.name,
-            "policy_id": conversation.lead.policy_id if conversation.lead else "N/A",
-            "due_date": conversation.lead.due_date.isoformat() if conversation.lead and conversation.lead.due_date else "N/A",
-            "outstanding_amount": conversation.lead.expected_value if conversation.lead else 0,
-            "policy_type": "Insurance Policy",
-            "policy_value": conversation.lead.expected_value if conversation.lead else 0
-        }
-        
-        system_prompt = get_agent_prompt(conversation.agent_type)
-        formatted_prompt = format_prompt_with_context(system_prompt, context)
-        
-        grok_messages.append({
-            "role": "system",
-            "content": formatted_prompt
-        })
-        
-        # Add conversation history
-        for msg in recent_messages:
-            grok_messages.append({
-                "role": "user" if msg.sender == "user" else "assistant",
-                "content": msg.content
-            })
+        language, grok_messages = prepare_turn(turn, user_msg.content, language)
         
         # Call Grok
-        grok_response = call_grok(grok_messages, conversation.agent_type, conversation.language)
+        grok_response, escalated_early = call_grok_for_turn(db, turn.conversation, grok_messages, language)
         
-        # Save assistant message
-        assistant_msg = Message(
-            conversation_id=conversation_id,
-            sender="assistant",
-            content=grok_response["assistant_text"],
-            llm_raw=grok_response,
-            mood=grok_response["mood"],
-            action=grok_response["action"],
-            outcome_hint=grok_response["outcome_hint"],
-            created_at=datetime.utcnow()
-        )
-        db.add(assistant_msg)
+        # Save reply, then escalate or send
+        should_escalate = apply_turn_reply(db, turn.conversation, turn.customer, grok_response, escalated_early)
+        db.commit()
         
-        # Check if escalation is needed
-        should_escalate = (
-            grok_response["action"] == "escalate" or
-            (grok_response["mood"]["label"] == "negative" and grok_response["mood"]["confidence"] >= 0.7)
-        )
+        return _turn_result(grok_response, should_escalate)
         
-        if should_escalate:
-            # Create escalation task
-            task = Task(
-                lead_id=conversation.lead_id,
-                type="escalation",
-                status="open",
-                notes=f"Escalated due to {grok_response['action']} action or negative mood (confidence: {grok_response['mood']['confidence']:.2f})"
-            )
-            db.add(task)
-            conversation.status = "escalated"
-            print(f"Created escalation task for conversation {conversation_id}")
-        else:
-            # Send response via adapter
-            from adapters import get_adapter
-            adapter = get_adapter()
-            
-            job_data = {
-                "to_number": customer.phone,
-                "message_body": grok_response["assistant_text"],
-                "conversation_id": conversation_id
-            }
-            
-            send_result = adapter.send(job_data)
-            
-            # Update message with provider info
-            if send_result.get("success"):
-                assistant_msg.provider_message_id = send_result.get("message_id")
-                assistant_msg.provider_raw = send_result
-                print(f"Sent assistant message via {adapter.name}")
-            else:
-                print(f"Failed to send message: {send_result.get('error')}")
+    except Exception as e:
+        print(f"Error handling inbound message: {str(e)}")
+        db.rollback()
+        return {"error": str(e)}
+    finally:
+        db.close()
+
+def complete_conversation_turn(conversation_id: int, grok_response: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Persist a Grok reply that was generated elsewhere (e.g. streamed to the UI), then
+    escalate or send it like handle_inbound_message.
+    
+    Args:
+        conversation_id: ID of the conversation
+        grok_response: Final structured Grok response
+    
+    Returns:
+        Dictionary with processing results
+    """
+    db = next(get_db())
+    
+    try:
+        turn = load_turn_context(db, conversation_id, with_messages=False)
+        if not turn:
+            return {"error": "Conversation not found"}
+        if not turn.can_contact:
+            return {"error": "Customer has not consented or is DNC"}
         
-        # Update conversation
-        conversation.updated_at = datetime.utcnow()
+        should_escalate = apply_turn_reply(db, turn.conversation, turn.customer, grok_response)
         db.commit()
         
-        return {
-            "action": grok_response["action"],
-            "mood": grok_response["mood"],
-            "outcome": grok_response["outcome_hint"],
-            "escalated": should_escalate
-        }
+        return _turn_result(grok_response, should_escalate)
         
     except Exception as e:
-        print(f"Error handling inbound message: {str(e)}")
+        print(f"Error completing conversation turn: {str(e)}")
         db.rollback()
         return {"error": str(e)}
     finally:
         db.close()
 
+# Async turn pipeline, used by request handlers. Same steps as the sync functions
+# above, but DB I/O goes through an async session and Grok is awaited, so a turn
+# holds no worker thread while it waits. The adapter send runs in a thread.
+
+def _escalation_write(conversation_id: int, action: Any, mood: Any):
+    async def write(db: AsyncSession):
+        create_escalation_task(db, await db.get(Conversation, conversation_id), action, mood)
+    return write
+
+async def acall_grok_for_turn(conversation: Conversation, grok_messages: List[Dict],
+                              language: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Async counterpart of call_grok_for_turn; an early escalation is group-committed.
+    
+    Args:
+        conversation: Conversation being processed
+        grok_messages: Prepared Grok messages
+        language: Language hint for Grok
+    
+    Returns:
+        Tuple of (Grok response, whether the conversation was already escalated early)
+    """
+    if not GROK_STREAMING:
+        return await acall_grok(grok_messages, conversation.agent_type, language), False
+    
+    early = {"escalated": False, "action": None, "mood": None}
+    grok_response = None
+    async for event in astream_grok(grok_messages, conversation.agent_type, language):
+        if event["type"] == "done":
+            grok_response = event["response"]
+        elif event["type"] == "field" and event["name"] in ("action", "mood") and not early["escalated"]:
+            early[event["name"]] = event["value"]
+            if needs_escalation(early["action"], early["mood"]):
+                await group_commit(_escalation_write(conversation.id, early["action"], early["mood"]))
+                early["escalated"] = True
+                print(f"Escalated conversation {conversation.id} early on streamed {event['name']}")
+    return grok_response, early["escalated"]
+
+# Called with (grok_response, send_result) right after a reply was sent
+SentCallback = Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]]
+
+async def aapply_turn_reply(turn: TurnContext, grok_response: Dict[str, Any], escalated_early: bool = False,
+                            send_result: Optional[Dict[str, Any]] = None, on_sent: Optional[SentCallback] = None) -> bool:
+    """
+    Async counterpart of apply_turn_reply.
+    
+    The reply is sent first (in a worker thread) unless the turn escalates; the
+    assistant message with its provider info, the escalation task and the
+    conversation updates made by prepare_turn (reply language, rolling context
+    summary, customer language) are then group-committed as one write. The turn's
+    own session is never committed, so those updates are copied into the write.
+    
+    Args:
+        turn: Loaded turn
+        grok_response: Structured Grok response
+        escalated_early: Escalation task was already created while streaming
+        send_result: Result of an earlier send of this reply (the reply is not sent again)
+        on_sent: Awaited after sending, before the write (e.g. to checkpoint the send)
+    
+    Returns:
+        Whether the conversation was escalated
+    """
+    conversation_id = turn.conversation.id
+    language = turn.conversation.language
+    # Older turns folded into the rolling summary by select_context_window
+    context_summary = turn.conversation.context_summary
+    context_summary_through_id = turn.conversation.context_summary_through_id
+    # Language detection may have updated the customer's preferred language
+    customer_language = detected_customer_language(turn)
+    should_escalate = escalated_early or needs_escalation(grok_response["action"], grok_response["mood"])
+    if send_result is None and not should_escalate:
+        send_result = await asyncio.to_thread(send_reply, turn.conversation, turn.customer, grok_response["assistant_text"])
+        if on_sent:
+            await on_sent(grok_response, send_result)
+    
+    async def write(db: AsyncSession):
+        conversation = await db.get(Conversation, conversation_id)
+        conversation.language = language
+        # Never move the summary back behind one saved by a concurrent turn
+        if context_summary_through_id and context_summary_through_id > (conversation.context_summary_through_id or 0):
+            conversation.context_summary = context_summary
+            conversation.context_summary_through_id = context_summary_through_id
+        if customer_language:
+            (await db.get(Customer, turn.customer.id)).preferred_language = customer_language
+        assistant_msg, _ = save_turn_reply(db, conversation, grok_response, escalated_early)
+        record_send_result(assistant_msg, send_result)
+    
+    await group_commit(write)
+    return should_escalate
+
+async def ahas_reply_after(conversation_id: int, message_id: int) -> bool:
+    """Whether the conversation has an assistant message newer than the given message"""
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(Message.id).where(
+            Message.conversation_id == conversation_id,
+            Message.sender == "assistant",
+            Message.id > message_id
+        ).limit(1))).first() is not None
+
+async def ahandle_inbound_message(conversation_id: int, message_id: int, language: Optional[str] = None,
+                                  sent_reply: Optional[Dict[str, Any]] = None,
+                                  on_sent: Optional[SentCallback] = None) -> Dict[str, Any]:
+    """
+    Async counterpart of handle_inbound_message.
+    
+    Args:
+        conversation_id: ID of the conversation
+        message_id: ID of the user message
+        language: Language hint for Grok (detected from the message if not given)
+        sent_reply: {"grok_response", "send_result"} of a reply already sent for this
+            message by an earlier attempt; it is saved without calling Grok or sending again
+        on_sent: Passed to aapply_turn_reply
+    
+    Returns:
+        Dictionary with processing results, or with "error" (and "permanent" if
+        retrying cannot help)
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            turn = await aload_turn_context(db, conversation_id)
+            user_msg = turn and (turn.message(message_id) or await db.get(Message, message_id))
+            if not turn or not user_msg:
+                return {"error": "Conversation or message not found", "permanent": True}
+            if not turn.can_contact:
+                return {"error": "Customer has not consented or is DNC", "permanent": True}
+            
+            language, grok_messages = prepare_turn(turn, user_msg.content, language)
+            if sent_reply:
+                grok_response = sent_reply["grok_response"]
+                should_escalate = await aapply_turn_reply(turn, grok_response, send_result=sent_reply["send_result"])
+            else:
+                grok_response, escalated_early = await acall_grok_for_turn(turn.conversation, grok_messages, language)
+                should_escalate = await aapply_turn_reply(turn, grok_response, escalated_early, on_sent=on_sent)
+            
+            return _turn_result(grok_response, should_escalate)
+            
+        except Exception as e:
+            print(f"Error handling inbound message: {str(e)}")
+            return {"error": str(e)}
+
+async def aprocess_conversation_message(conversation_id: int, user_message: str, language: Optional[str] = None):
+    """
+    Async counterpart of process_conversation_message.
+    
+    Args:
+        conversation_id: ID of the conversation
+        user_message: User's message content
+        language: Language hint for Grok (detected from the message if not given)
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            turn = await aload_turn_context(db, conversation_id)
+            if not turn:
+                print(f"Conversation {conversation_id} not found")
+                return
+            if not turn.can_contact:
+                print(f"Customer {turn.conversation.customer_id} has not consented or is DNC")
+                return
+            
+            # Stored before calling Grok, so the message survives a failed turn
+            user_msg = await group_commit_add(lambda: Message(
+                conversation_id=conversation_id,
+                sender="user",
+                content=user_message,
+                created_at=datetime.utcnow()
+            ))
+            turn.add_message(user_msg)
+            
+            language, grok_messages = prepare_turn(turn, user_message, language)
+            print(f"Calling Grok for conversation {conversation_id} with agent {turn.conversation.agent_type}")
+            grok_response, escalated_early = await acall_grok_for_turn(turn.conversation, grok_messages, language)
+            await aapply_turn_reply(turn, grok_response, escalated_early)
+            
+            print(f"Successfully processed conversation {conversation_id}")
+            
+        except Exception as e:
+            print(f"Error processing conversation {conversation_id}: {str(e)}")
+
+async def acomplete_conversation_turn(conversation_id: int, grok_response: Dict[str, Any],
+                                      language: Optional[str] = None, context_summary: Optional[str] = None,
+                                      context_summary_through_id: Optional[int] = None,
+                                      customer_language: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Async counterpart of complete_conversation_turn.
+    
+    Args:
+        conversation_id: ID of the conversation
+        grok_response: Final structured Grok response
+        language: Reply language chosen for the turn (kept if not given)
+        context_summary: Rolling summary computed when the turn was prepared
+        context_summary_through_id: Last message folded into context_summary
+        customer_language: Preferred language detected when the turn was prepared
+            (see detected_customer_language), saved in the same write as the reply
+    
+    Returns:
+        Dictionary with processing results
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            turn = await aload_turn_context(db, conversation_id, with_messages=False)
+            if not turn:
+                return {"error": "Conversation not found"}
+            if not turn.can_contact:
+                return {"error": "Customer has not consented or is DNC"}
+            
+            if language:
+                turn.conversation.language = language
+            if context_summary_through_id:
+                turn.conversation.context_summary = context_summary
+                turn.conversation.context_summary_through_id = context_summary_through_id
+            if customer_language and turn.customer.preferred_language != customer_language:
+                turn.customer.preferred_language = customer_language
+            should_escalate = await aapply_turn_reply(turn, grok_response)
+            
+            return _turn_result(grok_response, should_escalate)
+            
+        except Exception as e:
+            print(f"Error completing conversation turn: {str(e)}")
+            return {"error": str(e)}
+
 def generate_conversation_foresights(conversation_id: int) -> List[Dict[str, Any]]:
     """
     Generate foresights for a conversation using simple heuristics.
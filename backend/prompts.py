@@ -1,11 +1,28 @@
 """
 Agent system prompts for Grok LLM integration.
 Each agent has a specific role and behavior pattern.
+
+Prompts are laid out for prefix caching: the agent instructions and JSON schema
+form a static prefix that is byte-identical for every customer and language,
+and the per-customer context and language instruction follow in a trailing
+block. Templates are compiled once at import time.
 """
-from typing import Dict, Any
+import string
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+# JSON schema shared by every agent (decision fields first, see grok_rules.md)
+RESPONSE_SCHEMA = """You must return JSON only with this exact schema (keys in this order):
+{
+  "mood": {"label":"receptive|neutral|negative", "confidence":0.0},
+  "action": "reply|escalate|schedule_followup|request_payment",
+  "outcome_hint": {"label":"Resolved|Payment Promised|Needs Follow-up|Escalate","confidence":0.0},
+  "assistant_text": "string",                // text to send to customer (in same language)
+  "summary": ["bullet1","bullet2","bullet3"]
+}"""
 
 # Renewal Agent - Reminds about upcoming renewals, requests payment
-RENEWAL_SYSTEM_PROMPT = """You are a professional insurance renewal agent. Your role is to:
+RENEWAL_INSTRUCTIONS = """You are a professional insurance renewal agent. Your role is to:
 
 1. Remind customers about upcoming policy renewals
 2. Explain renewal process and benefits
@@ -18,21 +35,12 @@ Guidelines:
 - Focus on the value and benefits of renewing
 - Make payment process clear and simple
 - If customer is negative or angry, escalate immediately
-- Always reply in the customer's language
+- Always reply in the customer's language"""
 
-You must return JSON only with this exact schema:
-{
-  "assistant_text": "string",                // text to send to customer (in same language)
-  "mood": {"label":"receptive|neutral|negative", "confidence":0.0},
-  "summary": ["bullet1","bullet2","bullet3"],
-  "action": "reply|escalate|schedule_followup|request_payment",
-  "outcome_hint": {"label":"Resolved|Payment Promised|Needs Follow-up|Escalate","confidence":0.0}
-}
-
-Context: Customer {customer_name}, Policy {policy_id}, Due Date: {due_date}, Outstanding Amount: ${outstanding_amount}"""
+RENEWAL_CONTEXT = "Context: Customer {customer_name}, Policy {policy_id}, Due Date: {due_date}, Outstanding Amount: ${outstanding_amount}"
 
 # Policy Info Agent - Answers policy FAQs
-POLICY_INFO_SYSTEM_PROMPT = """You are a knowledgeable insurance policy information agent. Your role is to:
+POLICY_INFO_INSTRUCTIONS = """You are a knowledgeable insurance policy information agent. Your role is to:
 
 1. Answer questions about coverage, premiums, and claims
 2. Explain policy terms and conditions
@@ -45,21 +53,12 @@ Guidelines:
 - Use simple language to explain complex terms
 - If you don't know something, say so and offer to connect with a specialist
 - Always reply in the customer's language
-- Escalate if the question is beyond your scope
-
-You must return JSON only with this exact schema:
-{
-  "assistant_text": "string",                // text to send to customer (in same language)
-  "mood": {"label":"receptive|neutral|negative", "confidence":0.0},
-  "summary": ["bullet1","bullet2","bullet3"],
-  "action": "reply|escalate|schedule_followup|request_payment",
-  "outcome_hint": {"label":"Resolved|Payment Promised|Needs Follow-up|Escalate","confidence":0.0}
-}
+- Escalate if the question is beyond your scope"""
 
-Context: Customer {customer_name}, Policy {policy_id}, Policy Type: {policy_type}"""
+POLICY_INFO_CONTEXT = "Context: Customer {customer_name}, Policy {policy_id}, Policy Type: {policy_type}"
 
 # Cross-sell Agent - Suggests upgrades and add-ons
-CROSSSELL_SYSTEM_PROMPT = """You are a professional insurance cross-sell agent. Your role is to:
+CROSSSELL_INSTRUCTIONS = """You are a professional insurance cross-sell agent. Your role is to:
 
 1. Understand the customer's current policy context
 2. Suggest relevant upgrades and add-ons
@@ -73,58 +72,142 @@ Guidelines:
 - Focus on value and protection benefits
 - Be respectful of "no" responses
 - Always reply in the customer's language
-- Escalate if customer becomes negative
+- Escalate if customer becomes negative"""
+
+CROSSSELL_CONTEXT = "Context: Customer {customer_name}, Current Policy: {policy_id}, Policy Value: ${policy_value}"
+
+# Defaults for context fields missing from the caller's context
+CONTEXT_DEFAULTS = {
+    "customer_name": "Customer",
+    "policy_id": "N/A",
+    "due_date": "N/A",
+    "outstanding_amount": "0",
+    "policy_type": "General",
+    "policy_value": "0"
+}
 
-You must return JSON only with this exact schema:
-{
-  "assistant_text": "string",                // text to send to customer (in same language)
-  "mood": {"label":"receptive|neutral|negative", "confidence":0.0},
-  "summary": ["bullet1","bullet2","bullet3"],
-  "action": "reply|escalate|schedule_followup|request_payment",
-  "outcome_hint": {"label":"Resolved|Payment Promised|Needs Follow-up|Escalate","confidence":0.0}
+LANGUAGE_INSTRUCTION = "IMPORTANT: Reply in {language} language. Return JSON only with the exact schema specified."
+
+# Introduces the rolling summary of turns that no longer fit the context window
+EARLIER_TURNS_HEADER = "Earlier in this conversation (condensed):"
+
+# User turn that asks the agent to open an outbound conversation
+GREETING_USER_PROMPT = "Start the conversation with a greeting and introduction."
+
+def _compile(template: str) -> List[Tuple[str, Optional[str]]]:
+    """Parse a str.format template once into (literal, field) pairs"""
+    return [(literal, field) for literal, field, _, _ in string.Formatter().parse(template)]
+
+def _render(parts: List[Tuple[str, Optional[str]]], context: Dict[str, Any]) -> str:
+    """Fill compiled template parts, using CONTEXT_DEFAULTS for missing fields"""
+    rendered = []
+    for literal, field in parts:
+        rendered.append(literal)
+        if field is not None:
+            value = context.get(field)
+            rendered.append(str(value if value is not None else CONTEXT_DEFAULTS.get(field, "N/A")))
+    return "".join(rendered)
+
+class AgentTemplate:
+    """
+    Precompiled prompt template for one agent.
+
+    prefix is the static system prompt (instructions + JSON schema) shared
+    byte-for-byte by every request to this agent. render_context() fills the
+    trailing per-customer block without re-parsing the template.
+    """
+
+    def __init__(self, name: str, instructions: str, context_template: str):
+        self.name = name
+        self.prefix = f"{instructions}\n\n{RESPONSE_SCHEMA}"
+        self.context_template = context_template
+        self._context_parts = _compile(context_template)
+
+    def render_context(self, context: Dict[str, Any]) -> str:
+        """Fill the context block, using CONTEXT_DEFAULTS for missing fields"""
+        return _render(self._context_parts, context)
+
+    def system_prompt(self, context: Dict[str, Any], language: str, conversation_summary: Optional[str] = None) -> str:
+        """Static prefix followed by the trailing context (+ earlier-turns summary) + language block"""
+        trailing = self.render_context(context)
+        if conversation_summary:
+            trailing += f"\n\n{EARLIER_TURNS_HEADER}\n{conversation_summary}"
+        return f"{self.prefix}\n\n{trailing}\n\n{language_instruction(language)}"
+
+AGENT_TEMPLATES = {
+    "renewal": AgentTemplate("renewal", RENEWAL_INSTRUCTIONS, RENEWAL_CONTEXT),
+    "policy_info": AgentTemplate("policy_info", POLICY_INFO_INSTRUCTIONS, POLICY_INFO_CONTEXT),
+    "crosssell": AgentTemplate("crosssell", CROSSSELL_INSTRUCTIONS, CROSSSELL_CONTEXT)
 }
 
-Context: Customer {customer_name}, Current Policy: {policy_id}, Policy Value: ${policy_value}"""
+def get_agent_template(agent_type: str) -> AgentTemplate:
+    """
+    Get the compiled template for an agent type.
+
+    Args:
+        agent_type: Type of agent (renewal, policy_info, crosssell)
+
+    Returns:
+        AgentTemplate (renewal for unknown agent types)
+    """
+    return AGENT_TEMPLATES.get(agent_type, AGENT_TEMPLATES["renewal"])
+
+def language_instruction(language: str) -> str:
+    """Language instruction line placed at the end of the system prompt"""
+    return LANGUAGE_INSTRUCTION.format(language=language)
+
+def build_agent_messages(agent_type: str, context: Dict[str, Any], language: str = "en",
+                         history: Optional[List[Dict[str, str]]] = None,
+                         user_prompt: Optional[str] = None,
+                         conversation_summary: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Build the Grok messages for an agent turn.
+
+    Args:
+        agent_type: Type of agent (renewal, policy_info, crosssell)
+        context: Customer context dict
+        language: Language the agent must reply in
+        history: Prior messages as {"role", "content"} dicts in chronological order
+        user_prompt: Extra user message appended after the history
+        conversation_summary: Rolling summary of turns older than the history
+
+    Returns:
+        List of Grok messages whose system prompt starts with the agent's static prefix
+    """
+    template = get_agent_template(agent_type)
+    messages = [{"role": "system", "content": template.system_prompt(context, language, conversation_summary)}]
+    if history:
+        messages.extend(history)
+    if user_prompt:
+        messages.append({"role": "user", "content": user_prompt})
+    return messages
 
 def get_agent_prompt(agent_type: str) -> str:
     """
-    Get the system prompt for a specific agent type.
-    
+    Get the system prompt template for a specific agent type.
+
     Args:
         agent_type: Type of agent (renewal, policy_info, crosssell)
-    
+
     Returns:
-        System prompt string
+        System prompt template (static prefix followed by the context template)
     """
-    prompts = {
-        "renewal": RENEWAL_SYSTEM_PROMPT,
-        "policy_info": POLICY_INFO_SYSTEM_PROMPT,
-        "crosssell": CROSSSELL_SYSTEM_PROMPT
-    }
-    
-    return prompts.get(agent_type, RENEWAL_SYSTEM_PROMPT)
+    template = get_agent_template(agent_type)
+    return f"{template.prefix.replace('{', '{{').replace('}', '}}')}\n\n{template.context_template}"
+
+@lru_cache(maxsize=32)
+def _compile_prompt(prompt: str) -> List[Tuple[str, Optional[str]]]:
+    return _compile(prompt)
 
 def format_prompt_with_context(prompt: str, context: Dict[str, Any]) -> str:
     """
     Format a system prompt with customer context.
-    
+
     Args:
         prompt: Base system prompt
         context: Customer context dict
-    
+
     Returns:
         Formatted prompt string
     """
-    try:
-        return prompt.format(**context)
-    except KeyError as e:
-        # If context is missing some keys, use defaults
-        default_context = {
-            "customer_name": context.get("customer_name", "Customer"),
-            "policy_id": context.get("policy_id", "N/A"),
-            "due_date": context.get("due_date", "N/A"),
-            "outstanding_amount": context.get("outstanding_amount", "0"),
-            "policy_type": context.get("policy_type", "General"),
-            "policy_value": context.get("policy_value", "0")
-        }
-        return prompt.format(**default_context)
+    return _render(_compile_prompt(prompt), context)
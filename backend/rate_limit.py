@@ -0,0 +1,214 @@
+"""
+Client-side rate limiting and concurrency control for outbound LLM calls.
+Token buckets for requests/min and tokens/min plus a max-concurrency limit,
+shared by the sync (thread) and async (event loop) call paths.
+"""
+import time
+import random
+import asyncio
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute.
+
+    reserve() deducts immediately and returns how long the caller must wait
+    for its tokens, letting the balance go negative. Callers are therefore
+    served in arrival order and never spin re-checking the bucket.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1) -> float:
+        """
+        Reserve tokens.
+
+        Args:
+            amount: Number of tokens needed (clamped to the bucket capacity)
+
+        Returns:
+            Seconds to wait before the reserved tokens are available
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def adjust(self, amount: float):
+        """Return (positive) or charge (negative) tokens after the real cost is known"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+class RateLimiter:
+    """
+    Requests/min + tokens/min token buckets and a max-concurrency limit.
+
+    A limit of 0 disables that dimension. Wait time spent queueing for rate
+    budget or a concurrency slot is recorded so bursts can be monitored.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0, max_concurrency: int = 0):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_concurrency = max_concurrency
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+        self._stats_lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def _reserve(self, tokens: float) -> float:
+        """Reserve request and token budget; returns seconds to wait"""
+        wait = max(0.0, self._blocked_until - time.monotonic())
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.reserve(1))
+        if self.token_bucket:
+            wait = max(wait, self.token_bucket.reserve(tokens))
+        return wait
+
+    def _try_take_slot(self) -> bool:
+        with self._cond:
+            if self.max_concurrency <= 0 or self._in_flight < self.max_concurrency:
+                self._in_flight += 1
+                return True
+            return False
+
+    def _release_slot(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def _record_wait(self, waited: float):
+        with self._stats_lock:
+            self.acquired += 1
+            self.last_wait = waited
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            if waited > 0.001:
+                self.throttled += 1
+
+    @contextmanager
+    def acquire(self, tokens: float = 0):
+        """
+        Block the calling thread until rate budget and a concurrency slot are available.
+
+        Args:
+            tokens: Estimated tokens for the request (prompt + max completion)
+        """
+        started = time.monotonic()
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        with self._cond:
+            while self.max_concurrency > 0 and self._in_flight >= self.max_concurrency:
+                self._cond.wait()
+            self._in_flight += 1
+        self._record_wait(time.monotonic() - started)
+        try:
+            yield
+        finally:
+            self._release_slot()
+
+    @asynccontextmanager
+    async def aacquire(self, tokens: float = 0):
+        """
+        Async counterpart of acquire(); waits with asyncio.sleep so the event loop keeps running.
+        Concurrency slots are shared with the sync path.
+
+        Args:
+            tokens: Estimated tokens for the request (prompt + max completion)
+        """
+        started = time.monotonic()
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        delay = 0.01
+        while not self._try_take_slot():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.2)
+        self._record_wait(time.monotonic() - started)
+        try:
+            yield
+        finally:
+            self._release_slot()
+
+    def adjust_tokens(self, estimated: float, actual: float):
+        """Correct the token bucket once the real usage of a request is known"""
+        if self.token_bucket:
+            self.token_bucket.adjust(estimated - actual)
+
+    def block_for(self, seconds: float):
+        """Hold back every new request for the given time (e.g. after a 429 with Retry-After)"""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get limiter counters.
+
+        Returns:
+            Dict with in-flight calls, throttled count and queue wait time metrics (seconds)
+        """
+        with self._stats_lock:
+            return {
+                "requests_per_minute": self.request_bucket.rate * 60 if self.request_bucket else None,
+                "tokens_per_minute": self.token_bucket.rate * 60 if self.token_bucket else None,
+                "max_concurrency": self.max_concurrency or None,
+                "in_flight": self._in_flight,
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "queue_wait_total": round(self.total_wait, 3),
+                "queue_wait_avg": round(self.total_wait / self.acquired, 3) if self.acquired else 0.0,
+                "queue_wait_max": round(self.max_wait, 3),
+                "queue_wait_last": round(self.last_wait, 3)
+            }
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delta seconds or HTTP date).
+
+    Args:
+        value: Header value
+
+    Returns:
+        Seconds to wait, or None if missing or unparseable
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def with_jitter(seconds: float, ratio: float = 0.25) -> float:
+    """Add up to ratio * seconds of random jitter so retrying clients don't stampede together"""
+    return seconds + random.uniform(0, seconds * ratio)
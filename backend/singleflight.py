@@ -0,0 +1,119 @@
+"""
+Single-flight request coalescing.
+Concurrent callers asking for the same key share one execution of the work.
+"""
+import copy
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+class _Call:
+    """In-flight call shared by a leader thread and its waiters"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls across threads.
+
+    The first caller for a key (the leader) runs the function; callers arriving
+    while it is in flight block until it finishes and receive a deep copy of the
+    same result (or the same exception). Once the call completes the key is
+    released, so later callers start a fresh call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        Args:
+            key: Identity of the request (e.g. a cache key)
+            fn: Zero-argument function doing the work
+
+        Returns:
+            Result of fn
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Get counters: upstream calls made, calls served by another caller, calls in flight"""
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+class AsyncSingleFlight:
+    """
+    Coalesce concurrent identical calls across asyncio tasks.
+
+    The work runs in its own task, and every caller awaits it through
+    asyncio.shield, so cancelling one waiter (e.g. a client disconnect) does not
+    cancel the upstream call the other waiters depend on.
+    """
+
+    def __init__(self):
+        self._tasks = {}  # (event loop, key) -> task
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await fn once for all concurrent callers with the same key.
+
+        Args:
+            key: Identity of the request (e.g. a cache key)
+            fn: Zero-argument coroutine function doing the work
+
+        Returns:
+            Result of fn
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (loop, key)
+        task = self._tasks.get(task_key)
+        if task is not None:
+            self.coalesced += 1
+            result = await asyncio.shield(task)
+            return copy.deepcopy(result)
+
+        task = loop.create_task(fn())
+        self._tasks[task_key] = task
+        self.calls += 1
+        task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """Get counters: upstream calls made, calls served by another caller, calls in flight"""
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._tasks)}
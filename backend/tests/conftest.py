@@ -0,0 +1,33 @@
+"""
+Shared test setup.
+Modules read their configuration from the environment at import time, so the
+test database and adapters are configured here, before any backend module is
+imported. All tests share one scratch SQLite database; tests that need an
+empty table clear it themselves.
+"""
+import os
+import sys
+import tempfile
+
+_TEST_DIR = tempfile.mkdtemp(prefix="followup-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["GROK_API_KEY"] = ""
+os.environ["GROK_CACHE_BACKEND"] = "memory"
+os.environ["MESSAGING_ADAPTER"] = "mock"
+os.environ["JOB_EMBEDDED_WORKER"] = "false"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+@pytest.fixture(scope="session")
+def test_dir() -> str:
+    """Scratch directory for files created by tests (removed with the OS temp dir)"""
+    return _TEST_DIR
+
+@pytest.fixture(scope="session")
+def db_ready():
+    """Create the shared test database schema once"""
+    from database import init_db
+    init_db()
@@ -0,0 +1,109 @@
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+import bulk_import
+from bulk_import import parse_row, run_bulk_import
+from database import SessionLocal
+from models import Customer, Lead
+
+CSV_HEADER = "name,phone,consent_given_at,preferred_language,do_not_contact,policy_id,expected_value,due_date\n"
+
+def csv_stream(*lines: str) -> io.BytesIO:
+    return io.BytesIO((CSV_HEADER + "".join(line + "\n" for line in lines)).encode("utf-8"))
+
+def load(phone: str):
+    db = SessionLocal()
+    try:
+        customer = db.query(Customer).filter(Customer.phone == phone).one_or_none()
+        leads = db.query(Lead).filter(Lead.customer_id == customer.id).order_by(Lead.policy_id).all() if customer else []
+        return customer, leads
+    finally:
+        db.close()
+
+def test_parse_row_normalizes_and_validates():
+    customer, lead = parse_row({
+        "name": " Ana ", "phone": "+1 (555) 010-0001", "consent_given_at": "2024-01-01T00:00:00Z",
+        "preferred_language": "ES", "do_not_contact": "no",
+        "policy_id": "P-1", "expected_value": "120.5", "due_date": "2024-06-01"
+    })
+    assert customer == {"name": "Ana", "phone": "+15550100001", "consent_given_at": datetime(2024, 1, 1),
+                        "preferred_language": "es", "do_not_contact": False}
+    assert lead == {"policy_id": "P-1", "expected_value": 120.5, "due_date": datetime(2024, 6, 1)}
+
+    assert parse_row({"name": "Bo", "phone": "5550100002", "consent_given_at": "2024-01-01"})[1] is None
+    for raw, message in (
+        ({"name": "Bo", "phone": "5550100002"}, "missing consent_given_at"),
+        ({"name": "Bo", "phone": "12", "consent_given_at": "2024-01-01"}, "invalid phone"),
+        ({"name": "Bo", "phone": "5550100002", "consent_given_at": "yesterday"}, "not an ISO date"),
+        ({"name": "Bo", "phone": "5550100002", "consent_given_at": "2024-01-01", "do_not_contact": "maybe"}, "not a boolean"),
+        ({"name": "Bo", "phone": "5550100002", "consent_given_at": "2024-01-01", "policy_id": "P"}, "need expected_value"),
+    ):
+        with pytest.raises(ValueError, match=message):
+            parse_row(raw)
+
+def test_csv_import_upserts_customers_and_leads(db_ready):
+    result = run_bulk_import(csv_stream(
+        "Cara,5550200001,2024-01-01,en,,P-1,100,2024-06-01",
+        "Cara,5550200001,2024-01-01,,,P-2,200,2024-07-01",
+        "Dan,5550200002,2024-01-01,,,,,",
+        "Bad,12,2024-01-01,,,,,",
+    ), "csv", chunk_size=2)
+    assert (result["rows"], result["imported"], result["failed"]) == (4, 3, 1)
+    assert result["errors"][0]["line"] == 5
+    assert (result["customers_created"], result["leads_created"]) == (2, 2)
+
+    # Re-import updates in place: same customer, lead matched by policy ID
+    result = run_bulk_import(csv_stream(
+        "Cara B,5550200001,2024-01-01,fr,,P-1,150,2024-06-15",
+    ), "csv")
+    assert (result["customers_updated"], result["leads_updated"], result["leads_created"]) == (1, 1, 0)
+    customer, leads = load("5550200001")
+    assert (customer.name, customer.preferred_language) == ("Cara B", "fr")
+    assert [(lead.policy_id, lead.expected_value) for lead in leads] == [("P-1", 150.0), ("P-2", 200.0)]
+
+def test_reimport_never_lifts_do_not_contact(db_ready):
+    run_bulk_import(csv_stream("Eve,5550300001,2024-01-01,,yes,,,"), "csv")
+    run_bulk_import(csv_stream("Eve,5550300001,2024-01-01,,no,,,"), "csv")
+    customer, _ = load("5550300001")
+    assert customer.do_not_contact is True
+
+def test_ndjson_import_reports_bad_lines(db_ready):
+    lines = [
+        json.dumps({"name": "Fay", "phone": "5550400001", "consent_given_at": "2024-01-01", "do_not_contact": True}),
+        "{not json",
+        "[1, 2]",
+        "",
+        json.dumps({"name": "Gus", "phone": "5550400002", "consent_given_at": "2024-01-01"}),
+    ]
+    result = run_bulk_import(io.BytesIO("\n".join(lines).encode("utf-8")), "ndjson")
+    assert (result["rows"], result["imported"], result["failed"]) == (4, 2, 2)
+    assert [error["line"] for error in result["errors"]] == [2, 3]
+    assert load("5550400001")[0].do_not_contact is True
+
+def test_failed_chunk_is_retried_row_by_row(db_ready, monkeypatch):
+    write_chunk = bulk_import._write_chunk
+
+    def failing_write_chunk(db, rows):
+        if any(customer["phone"] == "5550500002" for _, customer, _ in rows):
+            raise RuntimeError("constraint violated")
+        return write_chunk(db, rows)
+
+    monkeypatch.setattr(bulk_import, "_write_chunk", failing_write_chunk)
+    result = run_bulk_import(csv_stream(
+        "Hal,5550500001,2024-01-01,,,,,",
+        "Ivy,5550500002,2024-01-01,,,,,",
+        "Jo,5550500003,2024-01-01,,,,,",
+    ), "csv", chunk_size=10)
+    assert (result["imported"], result["failed"]) == (2, 1)
+    assert result["errors"] == [{"line": 3, "error": "constraint violated"}]
+    assert load("5550500001")[0] is not None and load("5550500003")[0] is not None
+    assert load("5550500002")[0] is None
+
+def test_rejects_unknown_format_and_bad_header():
+    with pytest.raises(ValueError, match="Unknown import format"):
+        run_bulk_import(io.BytesIO(b""), "xlsx")
+    with pytest.raises(ValueError, match="missing columns"):
+        run_bulk_import(io.BytesIO(b"full_name,mobile\n"), "csv")
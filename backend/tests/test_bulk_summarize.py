@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+
+import processors
+from bulk_summarize import get_job_status, run_bulk_summarization
+from database import SessionLocal
+from llm_grok import GrokUnavailableError
+from models import Conversation, Customer, Message
+
+def add_conversations(phone_prefix: str, status: str, count: int) -> list:
+    """Conversations with two messages each, in a status no other test uses"""
+    db = SessionLocal()
+    try:
+        ids = []
+        for i in range(count):
+            customer = Customer(name="Bulk", phone=f"{phone_prefix}{i:03d}", consent_given_at=datetime(2024, 1, 1))
+            conversation = Conversation(customer=customer, agent_type="renewal", channel="sms", status=status)
+            conversation.messages = [Message(sender="user", content="When is my renewal due?"),
+                                     Message(sender="assistant", content="On June 1.")]
+            db.add(conversation)
+            db.flush()
+            ids.append(conversation.id)
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+def load_summaries(ids: list) -> dict:
+    db = SessionLocal()
+    try:
+        return {c.id: (c.summary, c.summary_through_message_id)
+                for c in db.query(Conversation).filter(Conversation.id.in_(ids))}
+    finally:
+        db.close()
+
+def test_summarize_messages_raises_instead_of_returning_fallback(db_ready):
+    # conftest leaves GROK_API_KEY empty, so Grok is unavailable
+    with pytest.raises(GrokUnavailableError):
+        processors.summarize_messages([Message(sender="user", content="Hello")])
+
+def test_batch_with_grok_down_counts_failures_and_stores_nothing(db_ready):
+    ids = add_conversations("5557100", "bulk-down", 3)
+    result = run_bulk_summarization(job_name="grok-down", statuses=("bulk-down",), batch_size=2, max_workers=2)
+
+    assert (result["summarized"], result["failed"], result["status"]) == (0, 3, "completed")
+    assert get_job_status("grok-down")["failed"] == 3
+    assert set(load_summaries(ids).values()) == {(None, None)}
+
+def test_failed_conversations_are_picked_up_by_the_next_run(db_ready, monkeypatch):
+    ids = add_conversations("5557200", "bulk-retry", 2)
+    assert run_bulk_summarization(job_name="retry", statuses=("bulk-retry",))["failed"] == 2
+
+    monkeypatch.setattr(processors, "call_grok", lambda *args, **kwargs: {"assistant_text": "- Asked about renewal"})
+    result = run_bulk_summarization(job_name="retry", statuses=("bulk-retry",))
+
+    assert (result["summarized"], result["failed"]) == (2, 0)
+    assert all(summary == "- Asked about renewal" and through is not None
+               for summary, through in load_summaries(ids).values())
@@ -0,0 +1,89 @@
+import time
+
+from circuit_breaker import CircuitBreaker
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    options = dict(window_seconds=60, min_calls=4, error_rate_threshold=0.5,
+                   slow_call_seconds=1, slow_call_rate_threshold=0.75, open_seconds=0.05, half_open_probes=1)
+    options.update(overrides)
+    return CircuitBreaker(name="test", **options)
+
+def test_stays_closed_below_min_calls():
+    breaker = make_breaker()
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_opens_on_error_rate_and_rejects_fast():
+    breaker = make_breaker(open_seconds=10)
+    for ok in (True, False, True, False):
+        breaker.allow_request()
+        if ok:
+            breaker.record_success(0.1)
+        else:
+            breaker.record_failure(0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    stats = breaker.stats()
+    assert stats["rejected"] == 1 and stats["open_remaining"] > 0
+    assert stats["transitions"][-1]["to"] == CircuitBreaker.OPEN
+
+def test_opens_on_slow_call_rate():
+    breaker = make_breaker()
+    for latency in (2, 2, 2, 0.1):
+        breaker.allow_request()
+        breaker.record_success(latency)
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_half_open_probe_success_closes():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record_failure(0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only half_open_probes calls are let through while probing
+    assert not breaker.allow_request()
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["window_calls"] == 0
+
+def test_half_open_probe_failure_reopens():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record_failure(0.1)
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_failure(0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+def test_half_open_slow_probe_reopens():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record_failure(0.1)
+    time.sleep(0.06)
+    breaker.allow_request()
+    breaker.record_success(5)
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_ignored_call_releases_probe_slot():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record_failure(0.1)
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_ignored()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+def test_old_outcomes_leave_the_window():
+    breaker = make_breaker(window_seconds=0.05)
+    for _ in range(3):
+        breaker.record_failure(0.1)
+    time.sleep(0.06)
+    breaker.record_failure(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["window_calls"] == 1
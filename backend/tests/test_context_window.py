@@ -0,0 +1,50 @@
+from context_window import ELIDED_LINE, fold_into_summary, message_tokens, select_context_window
+from models import Conversation, Message
+
+def make_messages(*contents, first_id: int = 1) -> list:
+    return [Message(id=first_id + i, sender="user" if i % 2 == 0 else "assistant", content=content)
+            for i, content in enumerate(contents)]
+
+def test_window_keeps_newest_messages_within_budget():
+    messages = make_messages("a" * 40, "b" * 40, "c" * 40, "d" * 40)
+    conversation = Conversation()
+    window = select_context_window(conversation, messages, token_budget=2 * message_tokens(messages[0]))
+
+    assert [msg.id for msg in window.messages] == [3, 4]
+    assert window.tokens == 2 * message_tokens(messages[0])
+    assert window.folded == 2
+    assert conversation.context_summary_through_id == 2
+    assert window.summary == conversation.context_summary == f"- Customer: {'a' * 40}\n- Agent: {'b' * 40}"
+
+def test_window_always_keeps_the_newest_message():
+    messages = make_messages("short", "x" * 4000)
+    window = select_context_window(Conversation(), messages, token_budget=10)
+    assert [msg.id for msg in window.messages] == [2]
+    assert window.folded == 1
+
+def test_window_without_overflow_leaves_summary_alone():
+    conversation = Conversation(context_summary="- Customer: earlier", context_summary_through_id=7)
+    window = select_context_window(conversation, make_messages("hi", "hello", first_id=8), token_budget=1000)
+    assert window.folded == 0 and len(window.messages) == 2
+    assert (window.summary, conversation.context_summary_through_id) == ("- Customer: earlier", 7)
+
+def test_fold_shortens_lines_and_collapses_whitespace():
+    summary = fold_into_summary(None, make_messages("hello\n  there", "y" * 500))
+    first, second = summary.split("\n")
+    assert first == "- Customer: hello there"
+    assert second.startswith("- Agent: yyy") and second.endswith("...") and len(second) == len("- Agent: ") + 160
+
+def test_fold_keeps_head_and_newest_lines_past_the_cap():
+    summary = None
+    for i in range(20):
+        summary = fold_into_summary(summary, make_messages(f"message {i:02d}", first_id=i), max_chars=120, head_lines=2)
+
+    lines = summary.split("\n")
+    assert lines[:3] == ["- Customer: message 00", "- Customer: message 01", ELIDED_LINE]
+    assert lines[-1] == "- Customer: message 19"
+    assert lines.count(ELIDED_LINE) == 1
+    assert len(summary) + 1 <= 120
+
+def test_fold_under_the_cap_keeps_every_line():
+    summary = fold_into_summary("- Customer: first", make_messages("second", "third"), max_chars=1000)
+    assert summary == "- Customer: first\n- Customer: second\n- Agent: third"
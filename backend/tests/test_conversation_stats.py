@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app import app
+from conversation_stats import rebuild_conversation_stats, record_escalation, stats_dict
+from database import SessionLocal, build_engine
+from models import Base, Conversation, ConversationStats, Customer, Message
+
+STARTED = datetime(2024, 4, 1, 9, 0)
+
+@pytest.fixture
+def scratch_session(tmp_path):
+    """Session on a private database, since rebuild_conversation_stats rewrites every row"""
+    engine = build_engine(f"sqlite:///{tmp_path}/stats.db", "wal")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    yield db
+    db.close()
+    engine.dispose()
+
+def add_conversation(db, phone: str, status: str = "active") -> Conversation:
+    customer = Customer(name="Stats", phone=phone, consent_given_at=datetime(2024, 1, 1))
+    conversation = Conversation(customer=customer, agent_type="renewal", channel="sms", status=status)
+    db.add(conversation)
+    db.commit()
+    return conversation
+
+def message(conversation: Conversation, sender: str, content: str, minutes: int, **fields) -> Message:
+    return Message(conversation_id=conversation.id, sender=sender, content=content,
+                   created_at=STARTED + timedelta(minutes=minutes), **fields)
+
+def stats_of(db, conversation_id: int):
+    db.expire_all()
+    return stats_dict(db.get(ConversationStats, conversation_id))
+
+def test_flush_hook_matches_rebuild_from_messages(scratch_session):
+    db = scratch_session
+    escalated = add_conversation(db, "5557800001", status="escalated")
+    quiet = add_conversation(db, "5557800002")
+
+    db.add_all([message(escalated, "user", "When is my renewal due", 0),
+                message(escalated, "assistant", "June 1", 1, mood={"label": "neutral"},
+                        outcome_hint={"label": "Needs Follow-up"})])
+    db.commit()
+    db.add(message(escalated, "user", "This is terrible, cancel it", 2))
+    db.add(message(escalated, "assistant", "Connecting you", 3, mood={"label": "negative"}))
+    record_escalation(db, escalated)
+    db.commit()
+
+    incremental = {escalated.id: stats_of(db, escalated.id), quiet.id: stats_of(db, quiet.id)}
+    assert incremental[escalated.id] == {
+        "user_messages": 2, "assistant_messages": 2, "user_words": 10, "escalations": 1,
+        "last_message_at": STARTED + timedelta(minutes=3),
+        "latest_mood": {"label": "negative"}, "latest_outcome": {"label": "Needs Follow-up"}
+    }
+    assert incremental[quiet.id]["user_messages"] == 0 and incremental[quiet.id]["last_message_at"] is None
+
+    with db.get_bind().begin() as conn:
+        assert rebuild_conversation_stats(conn) == 2
+    assert {conversation_id: stats_of(db, conversation_id) for conversation_id in incremental} == incremental
+
+def test_out_of_order_flushes_keep_the_latest_activity(scratch_session):
+    db = scratch_session
+    conversation = add_conversation(db, "5557800003")
+    db.add(message(conversation, "user", "later", 10))
+    db.commit()
+    db.add(message(conversation, "user", "earlier but flushed last", 5))
+    db.commit()
+    assert stats_of(db, conversation.id)["last_message_at"] == STARTED + timedelta(minutes=10)
+
+def test_escalation_is_discarded_on_rollback(scratch_session):
+    db = scratch_session
+    conversation = add_conversation(db, "5557800004")
+    record_escalation(db, conversation)
+    db.rollback()
+    db.add(message(conversation, "user", "hello", 0))
+    db.commit()
+    assert stats_of(db, conversation.id)["escalations"] == 0
+
+def test_conversation_details_include_the_rollup(db_ready):
+    db = SessionLocal()
+    try:
+        conversation = add_conversation(db, "5557800005")
+        db.add(message(conversation, "user", "Can I pay monthly", 0))
+        db.commit()
+        conversation_id = conversation.id
+    finally:
+        db.close()
+
+    with TestClient(app) as client:
+        body = client.get(f"/api/conversations/{conversation_id}").json()
+    assert body["id"] == conversation_id
+    assert (body["stats"]["user_messages"], body["stats"]["user_words"]) == (1, 4)
+    assert [msg["content"] for msg in body["messages"]] == ["Can I pay monthly"]
+    routes = [route for route in app.routes if getattr(route, "path", None) == "/api/conversations/{conversation_id}"
+              and "GET" in route.methods]
+    assert len(routes) == 1
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime
+
+import processors
+from database import SessionLocal, close_async_db
+from group_commit import close_group_commit
+from models import Conversation, Customer, Message
+from processors import aprocess_conversation_message, call_llm_summarizer, process_conversation_message
+
+REPLY = {"assistant_text": "Your renewal is due June 1.", "mood": {"label": "neutral", "confidence": 0.9},
+         "action": "none", "outcome_hint": {"label": "Needs Follow-up", "confidence": 0.6}}
+
+def add_conversation(phone: str, do_not_contact: bool = False) -> int:
+    db = SessionLocal()
+    try:
+        customer = Customer(name="Turns", phone=phone, consent_given_at=datetime(2024, 1, 1), do_not_contact=do_not_contact)
+        conversation = Conversation(customer=customer, agent_type="renewal", channel="sms")
+        db.add(conversation)
+        db.commit()
+        return conversation.id
+    finally:
+        db.close()
+
+def messages_of(conversation_id: int) -> list:
+    db = SessionLocal()
+    try:
+        return [(msg.sender, msg.content) for msg in
+                db.query(Message).filter(Message.conversation_id == conversation_id).order_by(Message.id)]
+    finally:
+        db.close()
+
+def test_process_conversation_message_saves_both_sides_of_the_turn(db_ready, monkeypatch):
+    monkeypatch.setattr(processors, "call_grok", lambda messages, agent_type, language="en": REPLY)
+    conversation_id = add_conversation("5557900001")
+    process_conversation_message(conversation_id, "When is my renewal due?")
+    assert messages_of(conversation_id) == [("user", "When is my renewal due?"), ("assistant", REPLY["assistant_text"])]
+
+def test_process_conversation_message_skips_dnc_customers(db_ready):
+    conversation_id = add_conversation("5557900002", do_not_contact=True)
+    process_conversation_message(conversation_id, "Hello")
+    assert messages_of(conversation_id) == []
+
+def test_aprocess_conversation_message_saves_both_sides_of_the_turn(db_ready, monkeypatch):
+    async def acall_grok(messages, agent_type, language="en"):
+        return REPLY
+
+    async def main():
+        try:
+            await aprocess_conversation_message(conversation_id, "When is my renewal due?")
+        finally:
+            await close_group_commit()
+            await close_async_db()
+
+    monkeypatch.setattr(processors, "acall_grok", acall_grok)
+    conversation_id = add_conversation("5557900003")
+    asyncio.run(main())
+    assert messages_of(conversation_id) == [("user", "When is my renewal due?"), ("assistant", REPLY["assistant_text"])]
+
+def test_call_llm_summarizer_falls_back_to_rules_when_grok_fails(monkeypatch):
+    def call_grok(messages, agent_type, language="en"):
+        raise RuntimeError("Grok is down")
+
+    monkeypatch.setattr(processors, "call_grok", call_grok)
+    transcript = "I want to renew my policy, please send the payment link"
+    assert call_llm_summarizer(transcript, {"language": "en"}) == processors.summarize(transcript, {"language": "en"})
+
+def test_call_llm_summarizer_uses_the_grok_response(monkeypatch):
+    monkeypatch.setattr(processors, "call_grok", lambda messages, agent_type, language="en": {
+        "summary": ["Wants to renew"], "outcome_hint": {"label": "Renewed", "confidence": 0.8}})
+    assert call_llm_summarizer("renew please", {}) == {"summary": ["Wants to renew"],
+                                                      "outcome": {"label": "Renewed", "confidence": 0.8}}
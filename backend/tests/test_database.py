@@ -0,0 +1,132 @@
+import asyncio
+import threading
+from datetime import datetime
+
+from sqlalchemy import select, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+
+from database import (AsyncSessionLocal, SessionLocal, async_database_url, build_async_engine, build_engine,
+                      close_async_db, get_async_db)
+from models import Customer
+
+def test_async_database_url_maps_known_dialects_only():
+    assert async_database_url("sqlite:///./demo.db") == "sqlite+aiosqlite:///./demo.db"
+    assert async_database_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert async_database_url("postgresql+psycopg://u:p@db/app") == "postgresql+psycopg://u:p@db/app"
+    assert async_database_url("mysql://u:p@db/app") == "mysql://u:p@db/app"
+
+def test_wal_engine_pools_connections_with_pragmas(test_dir):
+    engine = build_engine(f"sqlite:///{test_dir}/wal.db", "wal")
+    try:
+        assert isinstance(engine.pool, QueuePool)
+        with engine.connect() as first, engine.connect() as second:
+            assert first.connection.dbapi_connection is not second.connection.dbapi_connection
+            pragmas = {name: first.execute(text(f"PRAGMA {name}")).scalar()
+                       for name in ("journal_mode", "busy_timeout", "synchronous", "temp_store")}
+        assert pragmas == {"journal_mode": "wal", "busy_timeout": 5000, "synchronous": 1, "temp_store": 2}
+    finally:
+        engine.dispose()
+
+def test_memory_and_shared_mode_use_one_static_connection(test_dir):
+    for engine in (build_engine("sqlite:///:memory:", "wal"), build_engine(f"sqlite:///{test_dir}/shared.db", "shared")):
+        try:
+            assert isinstance(engine.pool, StaticPool)
+        finally:
+            engine.dispose()
+
+def test_wal_engine_lets_readers_run_during_a_write(test_dir):
+    engine = build_engine(f"sqlite:///{test_dir}/wal-read.db", "wal")
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+            conn.execute(text("INSERT INTO items (name) VALUES ('committed')"))
+
+        with engine.connect() as writer, engine.connect() as reader:
+            writer.begin()
+            writer.execute(text("INSERT INTO items (name) VALUES ('pending')"))
+            # The open write transaction neither blocks nor leaks into the reader
+            assert reader.execute(text("SELECT name FROM items")).scalars().all() == ["committed"]
+            writer.commit()
+    finally:
+        engine.dispose()
+
+def test_wal_engine_concurrent_writers_wait_for_the_lock(test_dir):
+    engine = build_engine(f"sqlite:///{test_dir}/wal-write.db", "wal")
+    errors = []
+
+    def write(worker: int):
+        try:
+            for i in range(20):
+                with engine.begin() as conn:
+                    conn.execute(text("INSERT INTO items (worker, n) VALUES (:worker, :n)"), {"worker": worker, "n": i})
+        except Exception as e:
+            errors.append(e)
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, worker INTEGER, n INTEGER)"))
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with engine.connect() as conn:
+            count = conn.execute(text("SELECT COUNT(*) FROM items")).scalar()
+    finally:
+        engine.dispose()
+    assert errors == []
+    assert count == 160
+
+def test_async_wal_engine_pools_connections_with_pragmas(test_dir):
+    async def main():
+        engine = build_async_engine(f"sqlite+aiosqlite:///{test_dir}/async-wal.db", "wal")
+        try:
+            async with engine.connect() as conn:
+                return engine.pool, (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+        finally:
+            await engine.dispose()
+
+    pool, journal_mode = asyncio.run(main())
+    assert isinstance(pool, AsyncAdaptedQueuePool)
+    assert journal_mode == "wal"
+
+def test_async_sessions_share_the_database_with_sync_sessions(db_ready):
+    async def main():
+        try:
+            async with AsyncSessionLocal() as db:
+                customer = Customer(name="Async", phone="5557500001", consent_given_at=datetime(2024, 1, 1))
+                db.add(customer)
+                await db.commit()
+                # Attributes stay loaded after commit (no lazy reload in async sessions)
+                return customer.id, customer.name
+        finally:
+            await close_async_db()
+
+    customer_id, name = asyncio.run(main())
+    assert name == "Async"
+    db = SessionLocal()
+    try:
+        assert db.get(Customer, customer_id).phone == "5557500001"
+    finally:
+        db.close()
+
+def test_async_db_dependency_works_on_each_new_event_loop(db_ready):
+    async def main():
+        try:
+            dependency = get_async_db()
+            db = await dependency.__anext__()
+            names = (await db.execute(select(Customer.name).where(Customer.phone == "5557500002"))).scalars().all()
+            await dependency.aclose()
+            return names
+        finally:
+            await close_async_db()
+
+    db = SessionLocal()
+    try:
+        db.add(Customer(name="Loop", phone="5557500002", consent_given_at=datetime(2024, 1, 1)))
+        db.commit()
+    finally:
+        db.close()
+    # close_async_db drops the engine, so the next loop gets fresh connections
+    assert asyncio.run(main()) == ["Loop"]
+    assert asyncio.run(main()) == ["Loop"]
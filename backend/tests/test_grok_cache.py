@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from grok_cache import CacheBackend, ResponseCache, SQLiteResponseCache, make_cache_key
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+def test_cache_key_depends_on_messages_agent_and_language():
+    key = make_cache_key(MESSAGES, "renewal", "en")
+    assert key == make_cache_key([dict(m) for m in MESSAGES], "renewal", "en")
+    assert key != make_cache_key(MESSAGES, "crosssell", "en")
+    assert key != make_cache_key(MESSAGES, "renewal", "es")
+    assert key != make_cache_key([{"role": "user", "content": "hello!"}], "renewal", "en")
+
+def test_memory_cache_hit_returns_copy():
+    cache = ResponseCache()
+    cache.set("k", {"assistant_text": "hi"})
+    value = cache.get("k")
+    value["assistant_text"] = "changed"
+    assert cache.get("k") == {"assistant_text": "hi"}
+    assert cache.stats()["hits"] == 2
+
+def test_memory_cache_entries_expire():
+    cache = ResponseCache(default_ttl=0.05)
+    cache.set("k", {"v": 1})
+    assert cache.get("k") == {"v": 1}
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1 and stats["entries"] == 0 and stats["bytes"] == 0
+
+def test_memory_cache_skips_non_positive_ttl():
+    cache = ResponseCache()
+    cache.set("k", {"v": 1}, ttl=0)
+    assert cache.get("k") is None
+
+def test_memory_cache_evicts_least_recently_used_by_count():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    cache.get("a")  # b is now least recently used
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1} and cache.get("c") == {"v": 3}
+    assert cache.stats()["evictions"] == 1
+
+def test_memory_cache_evicts_by_bytes_and_rejects_oversized_values():
+    cache = ResponseCache(max_bytes=30)  # each entry is 19 bytes
+    cache.set("a", {"v": "x" * 10})
+    cache.set("b", {"v": "y" * 10})
+    assert cache.get("a") is None and cache.get("b") is not None
+    cache.set("huge", {"v": "z" * 100})
+    assert cache.get("huge") is None
+    assert cache.stats()["bytes"] <= 30
+
+def test_sqlite_cache_ttl_and_lru_eviction(test_dir):
+    cache = SQLiteResponseCache(path=f"{test_dir}/grok_cache_test.db", max_entries=2, default_ttl=30)
+    cache.clear()
+    cache.set("a", {"v": 1})
+    time.sleep(0.01)
+    cache.set("b", {"v": 2})
+    time.sleep(0.01)
+    assert cache.get("a") == {"v": 1}  # refreshes a's last access
+    time.sleep(0.01)
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1} and cache.get("c") == {"v": 3}
+    assert cache.evictions == 1
+
+    cache.set("short", {"v": 4}, ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get("short") is None
+    assert cache.expirations >= 1
+
+def test_sqlite_cache_is_shared_between_instances(test_dir):
+    path = f"{test_dir}/grok_cache_shared.db"
+    SQLiteResponseCache(path=path).set("k", {"v": 1})
+    assert SQLiteResponseCache(path=path).get("k") == {"v": 1}
+
+def test_cache_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+def test_sqlite_cache_hits_do_not_write_until_flush_is_due(test_dir):
+    cache = SQLiteResponseCache(path=f"{test_dir}/grok_cache_access.db", access_flush_seconds=60)
+    cache.clear()
+    cache.set("k", {"v": 1})
+    conn = cache._connect()
+    writes = conn.total_changes
+    for _ in range(5):
+        assert cache.get("k") == {"v": 1}
+    assert conn.total_changes == writes
+    assert "k" in cache._pending_access
+
+    # The next set writes the buffered access times
+    cache.set("other", {"v": 2})
+    assert cache._pending_access == {}
+
+    cache.access_flush_seconds = 0
+    cache.get("k")
+    assert conn.total_changes > writes + 1
+    assert cache._pending_access == {}
+
+def test_sqlite_cache_async_calls_run_off_the_event_loop(test_dir):
+    cache = SQLiteResponseCache(path=f"{test_dir}/grok_cache_async.db")
+    cache.clear()
+    loop_threads = []
+    cache_threads = []
+    get = cache.get
+
+    def slow_get(key):
+        cache_threads.append(threading.get_ident())
+        time.sleep(0.1)
+        return get(key)
+
+    cache.get = slow_get
+
+    async def ticker(ticks):
+        loop_threads.append(threading.get_ident())
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        ticks = []
+        task = asyncio.ensure_future(ticker(ticks))
+        await cache.aset("k", {"v": 1})
+        value = await cache.aget("k")
+        task.cancel()
+        return value, ticks
+
+    value, ticks = asyncio.run(main())
+    assert value == {"v": 1}
+    assert len(ticks) >= 5  # the loop kept running during the slow get
+    assert cache_threads[0] != loop_threads[0]
+
+def test_memory_cache_async_calls():
+    cache = ResponseCache()
+
+    async def main():
+        await cache.aset("k", {"v": 1})
+        return await cache.aget("k")
+
+    assert asyncio.run(main()) == {"v": 1}
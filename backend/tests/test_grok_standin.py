@@ -0,0 +1,129 @@
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import grok_standin
+from grok_standin import GrokStandin, StandinConfig, create_app, load_fixtures, parse_latency, request_key
+
+FIXTURES = {f["name"]: f for f in load_fixtures()}
+NEGATIVE = FIXTURES["negative"]["transcript"]
+
+def make_config(test_dir, name: str, **overrides) -> StandinConfig:
+    """Replay config with no latency, no faults and its own recordings file"""
+    config = StandinConfig()
+    config.mode = "replay"
+    config.latency = "none"
+    config.error_rate = config.rate_limit_rate = config.timeout_rate = config.invalid_json_rate = 0.0
+    config.recordings_path = f"{test_dir}/{name}.jsonl"
+    for attr, value in overrides.items():
+        setattr(config, attr, value)
+    return config
+
+def chat(client: TestClient, content: str, **body):
+    return client.post("/v1/chat/completions", json={"model": "grok-beta", **body,
+                                                      "messages": [{"role": "user", "content": content}]})
+
+def reply_content(response) -> str:
+    return response.json()["choices"][0]["message"]["content"]
+
+def test_request_key_only_depends_on_roles_and_contents():
+    messages = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "Hola"}]
+    same = [{"content": "Be brief.", "role": "system", "name": "x"}, {"role": "user", "content": "Hola"}]
+    assert request_key(messages) == request_key(same)
+    assert request_key(messages) != request_key(messages[::-1])
+    assert request_key(messages) != request_key([messages[0], {"role": "user", "content": "Hola!"}])
+
+def test_parse_latency_specs():
+    assert parse_latency("none")() == 0.0
+    assert parse_latency("fixed:0.25")() == 0.25
+    assert 0.1 <= parse_latency("uniform:0.1,0.2")() <= 0.2
+    with pytest.raises(ValueError):
+        parse_latency("uniform:1")
+
+def test_replay_serves_matching_fixture_then_deterministic_pick(test_dir):
+    client = TestClient(create_app(make_config(test_dir, "fixtures")))
+    assert json.loads(reply_content(chat(client, NEGATIVE))) == FIXTURES["negative"]["response"]
+    first = reply_content(chat(client, "Something no fixture says"))
+    assert reply_content(chat(client, "Something no fixture says")) == first
+    assert json.loads(first) in [f["response"] for f in FIXTURES.values()]
+    assert client.get("/stats").json()["replayed_fixtures"] == 3
+
+def test_replay_prefers_recorded_exchanges(test_dir):
+    config = make_config(test_dir, "recorded")
+    messages = [{"role": "user", "content": NEGATIVE}]
+    with open(config.recordings_path, "w") as f:
+        f.write(json.dumps({"key": request_key(messages), "content": "recorded reply"}) + "\n")
+        f.write("not json\n")
+
+    client = TestClient(create_app(config))
+    assert reply_content(chat(client, NEGATIVE)) == "recorded reply"
+    stats = client.get("/stats").json()
+    assert (stats["recordings"], stats["replayed_recordings"], stats["replayed_fixtures"]) == (1, 1, 0)
+
+def test_record_mode_forwards_upstream_and_saves_for_replay(test_dir, monkeypatch):
+    upstream = []
+
+    def handler(request):
+        upstream.append((request.headers["Authorization"], json.loads(request.content)))
+        return httpx.Response(200, json={"choices": [{"message": {"role": "assistant", "content": "real reply"}}]})
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(grok_standin.httpx, "AsyncClient",
+                        lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs))
+    config = make_config(test_dir, "record", mode="record", upstream_key="real-key")
+    recorder = TestClient(create_app(config))
+
+    assert reply_content(chat(recorder, "Can I pay next week?", stream=False)) == "real reply"
+    authorization, forwarded = upstream[0]
+    assert authorization == "Bearer real-key" and "stream" not in forwarded
+
+    replayer = TestClient(create_app(make_config(test_dir, "record")))
+    assert reply_content(chat(replayer, "Can I pay next week?")) == "real reply"
+    assert len(upstream) == 1
+
+def test_record_mode_passes_upstream_errors_through(test_dir, monkeypatch):
+    real_client = httpx.AsyncClient
+    transport = httpx.MockTransport(lambda request: httpx.Response(401, text="bad key"))
+    monkeypatch.setattr(grok_standin.httpx, "AsyncClient", lambda **kwargs: real_client(transport=transport, **kwargs))
+    client = TestClient(create_app(make_config(test_dir, "record-errors", mode="record")))
+
+    response = chat(client, "Hello")
+    assert response.status_code == 401
+    assert client.get("/stats").json()["recorded"] == 0
+
+@pytest.mark.parametrize("rate, status, counter", [
+    ("error_rate", 503, "errors_5xx"),
+    ("rate_limit_rate", 429, "rate_limited"),
+])
+def test_fault_injection_returns_errors(test_dir, rate, status, counter):
+    client = TestClient(create_app(make_config(test_dir, f"faults-{counter}", retry_after=2.0, **{rate: 1.0})))
+    response = chat(client, NEGATIVE)
+    assert response.status_code == status
+    if status == 429:
+        assert response.headers["Retry-After"] == "2.0"
+    assert client.get("/stats").json()[counter] == 1
+
+def test_invalid_json_fault_returns_prose(test_dir):
+    client = TestClient(create_app(make_config(test_dir, "invalid-json", invalid_json_rate=1.0)))
+    content = reply_content(chat(client, NEGATIVE))
+    with pytest.raises(ValueError):
+        json.loads(content)
+
+def test_inject_fault_splits_the_roll_between_rates(test_dir, monkeypatch):
+    standin = GrokStandin(make_config(test_dir, "rolls", timeout_rate=0.1, rate_limit_rate=0.2, error_rate=0.3))
+    faults = {}
+    for roll in (0.05, 0.25, 0.55, 0.65):
+        monkeypatch.setattr(grok_standin.random, "random", lambda: roll)
+        faults[roll] = standin.inject_fault()
+    assert faults == {0.05: "timeout", 0.25: "rate_limited", 0.55: "error_5xx", 0.65: None}
+
+def test_streamed_reply_reassembles_to_the_replayed_content(test_dir):
+    client = TestClient(create_app(make_config(test_dir, "stream")))
+    expected = reply_content(chat(client, NEGATIVE))
+
+    response = chat(client, NEGATIVE, stream=True)
+    lines = [line[len("data: "):] for line in response.text.splitlines() if line.startswith("data: ")]
+    assert lines[-1] == "[DONE]"
+    assert "".join(json.loads(line)["choices"][0]["delta"]["content"] for line in lines[:-1]) == expected
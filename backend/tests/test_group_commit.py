@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+import group_commit
+from database import SessionLocal, close_async_db
+from group_commit import GroupCommitWriter, group_commit_add
+from models import Customer
+
+def add_customer(phone: str):
+    async def write(db):
+        customer = Customer(name="Test", phone=phone, consent_given_at=datetime(2024, 1, 1))
+        db.add(customer)
+        await db.flush()
+        return customer.id
+    return write
+
+def count_customers(prefix: str) -> int:
+    db = SessionLocal()
+    try:
+        return db.execute(select(func.count()).where(Customer.phone.like(f"{prefix}%"))).scalar()
+    finally:
+        db.close()
+
+def run(main):
+    async def wrapper():
+        try:
+            return await main()
+        finally:
+            await close_async_db()
+    return asyncio.run(wrapper())
+
+def test_concurrent_writes_share_one_commit(db_ready):
+    writer = GroupCommitWriter(window_ms=20)
+
+    async def main():
+        ids = await asyncio.gather(*(writer.submit(add_customer(f"5551000{i:03d}")) for i in range(10)))
+        await writer.close()
+        return ids
+
+    ids = run(main)
+    assert len(set(ids)) == 10
+    assert count_customers("5551000") == 10
+    stats = writer.stats()
+    assert (stats["batches"], stats["writes"], stats["max_batch"]) == (1, 10, 10)
+
+def test_batches_are_capped_at_max_batch(db_ready):
+    writer = GroupCommitWriter(window_ms=20, max_batch=2)
+
+    async def main():
+        await asyncio.gather(*(writer.submit(add_customer(f"5552000{i:03d}")) for i in range(5)))
+        await writer.close()
+
+    run(main)
+    assert count_customers("5552000") == 5
+    assert (writer.stats()["batches"], writer.stats()["max_batch"]) == (3, 2)
+
+def test_failing_write_only_fails_its_own_caller(db_ready):
+    writer = GroupCommitWriter(window_ms=20)
+
+    async def main():
+        await writer.submit(add_customer("5553000001"))
+        results = await asyncio.gather(
+            writer.submit(add_customer("5553000002")),
+            writer.submit(add_customer("5553000001")),  # duplicate phone
+            writer.submit(add_customer("5553000003")),
+            return_exceptions=True
+        )
+        await writer.close()
+        return results
+
+    results = run(main)
+    assert isinstance(results[0], int) and isinstance(results[2], int)
+    assert isinstance(results[1], IntegrityError)
+    assert count_customers("555300000") == 3
+    stats = writer.stats()
+    assert (stats["failed"], stats["retried_batches"], stats["writes"]) == (1, 1, 3)
+
+def test_close_commits_queued_writes(db_ready):
+    writer = GroupCommitWriter(window_ms=50)
+
+    async def main():
+        tasks = [asyncio.ensure_future(writer.submit(add_customer(f"5554000{i:03d}"))) for i in range(3)]
+        await asyncio.sleep(0)
+        await writer.close()
+        return [task.result() for task in tasks]
+
+    assert len(run(main)) == 3
+    assert count_customers("5554000") == 3
+
+def test_group_commit_add_returns_committed_object(db_ready):
+    async def main():
+        customer = await group_commit_add(
+            lambda: Customer(name="Added", phone="5555000001", consent_given_at=datetime(2024, 1, 1))
+        )
+        await group_commit.close_group_commit()
+        return customer
+
+    customer = run(main)
+    assert customer.id is not None and customer.name == "Added"
+    assert count_customers("5555000001") == 1
+
+def test_writer_restarts_on_a_new_event_loop(db_ready):
+    writer = GroupCommitWriter(window_ms=1)
+
+    for i in range(2):
+        async def main():
+            await writer.submit(add_customer(f"555600000{i}"))
+            await writer.close()
+        run(main)
+    assert count_customers("555600000") == 2
+    assert writer.stats()["batches"] == 2
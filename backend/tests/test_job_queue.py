@@ -0,0 +1,296 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, select
+
+import job_queue
+from database import SessionLocal, close_async_db
+from group_commit import close_group_commit
+from job_queue import (JobWorker, claim_jobs, enqueue_job, extend_leases, purge_jobs, recover_expired_leases,
+                       requeue_dead_jobs, retry_delay, submit_job)
+from models import Job
+
+@pytest.fixture
+def jobs(db_ready, monkeypatch):
+    """Empty jobs table, a "test" job kind whose handler is set per test, and no retry backoff"""
+    db = SessionLocal()
+    db.execute(delete(Job))
+    db.commit()
+    db.close()
+    handler = {"fn": None}
+
+    async def run_test_job(job):
+        await handler["fn"](job)
+
+    monkeypatch.setitem(job_queue.JOB_HANDLERS, "test", run_test_job)
+    monkeypatch.setattr(job_queue, "JOB_RETRY_BASE_SECONDS", 0.0)
+    return handler
+
+def run(main):
+    async def wrapper():
+        try:
+            return await main()
+        finally:
+            await close_group_commit()
+            await close_async_db()
+    return asyncio.run(wrapper())
+
+def add_jobs(*specs):
+    """Insert jobs from (payload, delay_seconds, max_attempts) tuples; returns their IDs"""
+    db = SessionLocal()
+    try:
+        added = [enqueue_job(db, "test", payload, delay_seconds=delay, max_attempts=max_attempts)
+                 for payload, delay, max_attempts in specs]
+        db.commit()
+        return [job.id for job in added]
+    finally:
+        db.close()
+
+def add_job_of_kind(kind: str, payload) -> int:
+    db = SessionLocal()
+    try:
+        job = enqueue_job(db, kind, payload)
+        db.commit()
+        return job.id
+    finally:
+        db.close()
+
+def load_job(job_id: int) -> Job:
+    db = SessionLocal()
+    try:
+        return db.get(Job, job_id)
+    finally:
+        db.close()
+
+async def run_worker_until(worker: JobWorker, done, timeout: float = 5):
+    task = asyncio.create_task(worker.run())
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not done() and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.02)
+    worker.stop()
+    await task
+
+def test_enqueue_rejects_unknown_kind(jobs):
+    db = SessionLocal()
+    try:
+        with pytest.raises(ValueError, match="Unknown job kind"):
+            enqueue_job(db, "nope", {})
+    finally:
+        db.close()
+
+def test_retry_delay_backs_off_with_cap(monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_RETRY_BASE_SECONDS", 4.0)
+    monkeypatch.setattr(job_queue, "JOB_RETRY_MAX_SECONDS", 20.0)
+    assert 2 <= retry_delay(1) <= 4
+    assert 8 <= retry_delay(3) <= 16
+    assert 10 <= retry_delay(10) <= 20
+
+def test_claim_leases_due_jobs_once(jobs):
+    first, second, delayed = add_jobs(({"n": 1}, 0, 5), ({"n": 2}, 0, 5), ({"n": 3}, 60, 5))
+
+    async def main():
+        claimed = await claim_jobs("w1", limit=10, visibility_timeout=30)
+        return claimed, await claim_jobs("w2", limit=10)
+
+    claimed, again = run(main)
+    assert [job["id"] for job in claimed] == [first, second]
+    assert claimed[0] == {"id": first, "kind": "test", "payload": {"n": 1}, "attempts": 1, "max_attempts": 5}
+    assert again == []
+    job = load_job(first)
+    assert (job.status, job.locked_by) == ("running", "w1")
+    assert job.available_at > datetime.utcnow() + timedelta(seconds=20)
+    assert load_job(delayed).status == "queued"
+
+def test_claim_respects_limit_and_age_order(jobs):
+    ids = add_jobs(*[({"n": n}, 0, 5) for n in range(3)])
+    claimed = run(lambda: claim_jobs("w1", limit=2))
+    assert [job["id"] for job in claimed] == ids[:2]
+
+def test_extend_leases_only_touches_own_jobs(jobs):
+    job_id, = add_jobs(({}, 0, 5))
+
+    async def main():
+        await claim_jobs("w1", limit=1, visibility_timeout=1)
+        await extend_leases("w2", [job_id], visibility_timeout=600)
+        before = load_job(job_id).available_at
+        await extend_leases("w1", [job_id], visibility_timeout=600)
+        return before, load_job(job_id).available_at
+
+    before, after = run(main)
+    assert before < datetime.utcnow() + timedelta(seconds=2)
+    assert after > datetime.utcnow() + timedelta(seconds=500)
+
+def test_expired_leases_are_requeued_or_dead_lettered(jobs):
+    retryable, exhausted = add_jobs(({}, 0, 5), ({}, 0, 1))
+
+    async def main():
+        await claim_jobs("lost-worker", limit=2, visibility_timeout=-1)
+        return await recover_expired_leases()
+
+    assert run(main) == 2
+    job = load_job(retryable)
+    assert (job.status, job.locked_by, job.attempts) == ("queued", None, 1)
+    job = load_job(exhausted)
+    assert job.status == "dead" and "last attempt" in job.last_error
+
+def test_worker_runs_jobs_and_retries_failures(jobs):
+    attempts = []
+
+    async def flaky(job):
+        attempts.append(job["attempts"])
+        if job["attempts"] < 3:
+            raise RuntimeError("temporarily down")
+
+    jobs["fn"] = flaky
+    job_id, = add_jobs(({}, 0, 5))
+    worker = JobWorker(concurrency=2, poll_interval=0.02)
+    run(lambda: run_worker_until(worker, lambda: load_job(job_id).status == "done"))
+
+    job = load_job(job_id)
+    assert (job.status, job.attempts, job.last_error, job.locked_by) == ("done", 3, None, None)
+    assert attempts == [1, 2, 3]
+    stats = worker.stats()
+    assert (stats["claimed"], stats["succeeded"], stats["retried"], stats["running"]) == (3, 1, 2, 0)
+
+def test_worker_dead_letters_after_max_attempts(jobs):
+    async def broken(job):
+        raise ValueError("bad payload")
+
+    jobs["fn"] = broken
+    job_id, = add_jobs(({}, 0, 2))
+    worker = JobWorker(poll_interval=0.02)
+    run(lambda: run_worker_until(worker, lambda: load_job(job_id).status == "dead"))
+
+    job = load_job(job_id)
+    assert (job.status, job.attempts, job.last_error) == ("dead", 2, "ValueError: bad payload")
+    assert job.finished_at is not None
+    assert (worker.stats()["retried"], worker.stats()["dead"]) == (1, 1)
+
+def test_job_that_lost_its_lease_does_not_overwrite_new_holder(jobs):
+    async def slow(job):
+        await asyncio.sleep(0.2)
+
+    jobs["fn"] = slow
+    job_id, = add_jobs(({}, 0, 5))
+
+    async def main():
+        job, = await claim_jobs("w1", limit=1, visibility_timeout=-1)
+        await recover_expired_leases()
+        await claim_jobs("w2", limit=1)
+        worker = JobWorker(worker_id="w1")
+        await worker._execute(job)
+        return worker
+
+    worker = run(main)
+    job = load_job(job_id)
+    assert (job.status, job.locked_by, job.attempts) == ("running", "w2", 2)
+    assert worker.stats()["succeeded"] == 0
+
+def test_shutdown_requeues_unfinished_jobs(jobs):
+    started = []
+
+    async def hang(job):
+        started.append(job["id"])
+        await asyncio.sleep(60)
+
+    jobs["fn"] = hang
+    job_id, = add_jobs(({}, 0, 5))
+
+    async def main():
+        worker = JobWorker(poll_interval=0.02)
+        task = asyncio.create_task(worker.run(shutdown_grace=0.05))
+        while not started:
+            await asyncio.sleep(0.01)
+        worker.stop()
+        await task
+
+    run(main)
+    job = load_job(job_id)
+    assert (job.status, job.locked_by) == ("queued", None)
+    assert job.last_error == "Interrupted by worker shutdown"
+
+def test_requeue_dead_and_purge(jobs):
+    dead, done, recent = add_jobs(({}, 0, 5), ({}, 0, 5), ({}, 0, 5))
+    long_ago = datetime.utcnow() - timedelta(days=30)
+    db = SessionLocal()
+    try:
+        for job_id, status, finished_at in ((dead, "dead", long_ago), (done, "done", long_ago),
+                                            (recent, "done", datetime.utcnow())):
+            job = db.get(Job, job_id)
+            job.status, job.attempts, job.finished_at = status, 5, finished_at
+        db.commit()
+
+        assert purge_jobs(db, older_than_days=7) == 1
+        assert requeue_dead_jobs(db, kind="other") == 0
+        assert requeue_dead_jobs(db) == 1
+        assert purge_jobs(db, older_than_days=7, include_dead=True) == 0
+        remaining = dict(db.execute(select(Job.id, Job.status)).all())
+    finally:
+        db.close()
+    assert remaining == {dead: "queued", recent: "done"}
+    job = load_job(dead)
+    assert (job.attempts, job.finished_at) == (0, None)
+
+def test_submit_job_enqueues_through_group_commit(jobs):
+    job_id = run(lambda: submit_job("test", {"x": 1}))
+    job = load_job(job_id)
+    assert (job.kind, job.payload, job.status) == ("test", {"x": 1}, "queued")
+
+def test_inbound_message_retry_reuses_the_sent_reply(jobs, monkeypatch):
+    calls = []
+    sent = {"grok_response": {"assistant_text": "Hi"}, "send_result": {"sid": "SM1"}}
+
+    async def fake_handle(conversation_id, message_id, language=None, sent_reply=None, on_sent=None):
+        calls.append(sent_reply)
+        if sent_reply is None:
+            # First attempt: the reply goes out, then saving it fails
+            await on_sent(sent["grok_response"], sent["send_result"])
+            return {"error": "database is locked"}
+        return {"response": sent_reply["grok_response"]["assistant_text"]}
+
+    async def no_reply_yet(conversation_id, message_id):
+        return False
+
+    monkeypatch.setattr(job_queue, "ahandle_inbound_message", fake_handle)
+    monkeypatch.setattr(job_queue, "ahas_reply_after", no_reply_yet)
+    job_id = add_job_of_kind("handle_inbound_message", {"conversation_id": 1, "message_id": 2})
+    worker = JobWorker(poll_interval=0.02)
+    run(lambda: run_worker_until(worker, lambda: load_job(job_id).status == "done"))
+
+    # The retry saved the checkpointed reply instead of calling Grok and sending again
+    assert calls == [None, sent]
+    assert load_job(job_id).payload["sent_reply"] == sent
+
+def test_inbound_message_retry_skips_answered_message(jobs, monkeypatch):
+    calls = []
+
+    async def fake_handle(*args, **kwargs):
+        calls.append(args)
+        return {"response": "ok"}
+
+    async def answered(conversation_id, message_id):
+        return True
+
+    monkeypatch.setattr(job_queue, "ahandle_inbound_message", fake_handle)
+    monkeypatch.setattr(job_queue, "ahas_reply_after", answered)
+    first = {"id": 0, "payload": {"conversation_id": 1, "message_id": 2}, "attempts": 1}
+    retry = {**first, "attempts": 2}
+    run(lambda: job_queue._handle_inbound_message(first))
+    run(lambda: job_queue._handle_inbound_message(retry))
+    assert len(calls) == 1
+
+def test_inbound_message_permanent_error_does_not_retry(monkeypatch):
+    async def fake_handle(*args, **kwargs):
+        return {"error": "Customer has not consented or is DNC", "permanent": True}
+
+    monkeypatch.setattr(job_queue, "ahandle_inbound_message", fake_handle)
+    job = {"id": 0, "payload": {"conversation_id": 1, "message_id": 2}, "attempts": 1}
+    run(lambda: job_queue._handle_inbound_message(job))
+
+    async def transient(*args, **kwargs):
+        return {"error": "database is locked"}
+
+    monkeypatch.setattr(job_queue, "ahandle_inbound_message", transient)
+    with pytest.raises(RuntimeError, match="database is locked"):
+        run(lambda: job_queue._handle_inbound_message(job))
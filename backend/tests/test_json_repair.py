@@ -0,0 +1,98 @@
+import json
+
+from json_repair import coerce_response, load_lenient, repair_response, validate_response
+
+VALID = {
+    "assistant_text": "Thanks, I'll send the renewal link.",
+    "mood": {"label": "receptive", "confidence": 0.8},
+    "summary": ["Customer wants to renew"],
+    "action": "reply",
+    "outcome_hint": {"label": "Needs Follow-up", "confidence": 0.6}
+}
+
+def test_validate_response_accepts_schema_and_names_first_problem():
+    assert validate_response(VALID) is None
+    assert validate_response([]) == "Response is not a JSON object"
+    assert validate_response({k: v for k, v in VALID.items() if k != "summary"}) == "Missing required field: summary"
+    assert validate_response({**VALID, "mood": "happy"}) == "Invalid mood structure"
+    assert validate_response({**VALID, "action": "dance"}) == "Invalid action: dance"
+    bad_outcome = {**VALID, "outcome_hint": {"label": "Maybe", "confidence": 1}}
+    assert validate_response(bad_outcome) == "Invalid outcome label: Maybe"
+
+def test_load_lenient_passes_valid_json_through():
+    assert load_lenient(json.dumps(VALID)) == (VALID, [])
+
+def test_load_lenient_strips_fence_and_surrounding_text():
+    value, repairs = load_lenient('```json\n{"a": 1}\n```')
+    assert value == {"a": 1} and repairs == ["code_fence"]
+    value, repairs = load_lenient('Sure! Here it is: {"a": 1} Hope that helps.')
+    assert value == {"a": 1} and repairs == ["surrounding_text"]
+
+def test_load_lenient_fixes_trailing_commas_comments_and_smart_quotes():
+    text = '{\n  "a": "keep // this", // note\n  /* block */ "b": [1, 2,],\n}'
+    value, repairs = load_lenient(text)
+    assert value == {"a": "keep // this", "b": [1, 2]}
+    assert repairs == ["syntax"]
+    value, repairs = load_lenient("{“a”: “x”}")
+    assert value == {"a": "x"} and repairs == ["smart_quotes"]
+
+def test_load_lenient_accepts_python_literals():
+    value, repairs = load_lenient("{'a': 'it', 'ok': true, 'none': None, 'n': null}")
+    assert value == {"a": "it", "ok": True, "none": None, "n": None}
+    assert repairs == ["python_literal"]
+
+def test_load_lenient_gives_up_on_non_objects_and_code():
+    assert load_lenient("no json here")[0] is None
+    assert load_lenient("{__import__('os').system('true')}")[0] is None
+    assert load_lenient("")[0] is None
+
+def test_coerce_response_maps_labels_synonyms_and_confidences():
+    data = {
+        "reply": "Hi!",
+        "mood": "Happy",
+        "summary": "- asked about price\n- wants discount\n",
+        "action": "Follow-Up",
+        "outcome_hint": {"label": "payment promised", "confidence": "85%"}
+    }
+    coerced, repairs = coerce_response(data)
+    assert coerced["assistant_text"] == "Hi!" and "reply" not in coerced
+    assert coerced["mood"] == {"label": "receptive", "confidence": 0.5}
+    assert coerced["summary"] == ["asked about price", "wants discount"]
+    assert coerced["action"] == "schedule_followup"
+    assert coerced["outcome_hint"] == {"label": "Payment Promised", "confidence": 0.85}
+    assert repairs == ["assistant_text_alias", "mood", "action", "outcome_hint", "summary"]
+    assert validate_response(coerced) is None
+    # The input is not modified
+    assert data["mood"] == "Happy"
+
+def test_coerce_response_derives_missing_outcome_from_action():
+    data = {k: v for k, v in VALID.items() if k != "outcome_hint"}
+    coerced, _ = coerce_response({**data, "action": "handoff"})
+    assert coerced["action"] == "escalate"
+    assert coerced["outcome_hint"] == {"label": "Escalate", "confidence": 0.5}
+
+def test_coerce_response_does_not_guess_missing_essentials():
+    assert coerce_response({**VALID, "assistant_text": "  "})[0] is None
+    assert coerce_response({**VALID, "mood": {"label": "ecstatic"}})[0] is None
+    assert coerce_response({k: v for k, v in VALID.items() if k != "action"})[0] is None
+    assert coerce_response({**VALID, "action": "dance"})[0] is None
+
+def test_repair_response_end_to_end():
+    text = "```json\n{'assistant_text': 'Hola', 'mood': {'label': 'Angry', 'confidence': 70}, " \
+           "'summary': [], 'action': 'respond',}\n```"
+    repaired, repairs = repair_response(text)
+    assert validate_response(repaired) is None
+    assert repaired["mood"] == {"label": "negative", "confidence": 0.7}
+    assert repaired["action"] == "reply"
+    assert repairs[:2] == ["code_fence", "syntax"]
+    assert repair_response("I can't help with that.") == (None, [])
+
+def test_grok_client_repairs_locally_before_re_asking():
+    from llm_grok import GrokAPI
+    client = GrokAPI()
+    assert client._parse_response_text(json.dumps(VALID)) == VALID
+    assert client._parse_response_text(json.dumps({**VALID, "mood": None})) is None
+    assert client._parse_response_text("```json\n" + json.dumps(VALID) + "\n```") == VALID
+    assert client._parse_response_text("not json") is None
+    stats = client.parse_stats
+    assert (stats["valid"], stats["repaired"], stats["unrepairable"]) == (1, 1, 2)
@@ -0,0 +1,60 @@
+import json
+
+from json_stream import IncrementalJSONParser
+
+REPLY = {
+    "assistant_text": "Hola, \"Ana\" é \\ ok",
+    "confidence": 0.9,
+    "escalate": False,
+    "tags": ["a", {"b": [1, 2]}],
+    "meta": {"x": "}", "y": None}
+}
+
+def feed_all(parser: IncrementalJSONParser, text: str, size: int):
+    completed = []
+    for start in range(0, len(text), size):
+        completed.extend(parser.feed(text[start:start + size]))
+    return completed
+
+def test_any_chunking_yields_fields_in_order():
+    text = json.dumps(REPLY)
+    for size in (1, 2, 3, 7, len(text)):
+        parser = IncrementalJSONParser()
+        completed = feed_all(parser, text, size)
+        assert completed == list(REPLY.items())
+        assert parser.done
+        assert parser.fields == REPLY
+
+def test_field_is_surfaced_as_soon_as_its_value_closes():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"assistant_text": "hi there"') == [("assistant_text", "hi there")]
+    # Scalars end at the following comma or closing brace
+    assert parser.feed(', "confidence": 0.5') == []
+    assert parser.feed("}") == [("confidence", 0.5)]
+    assert parser.done
+
+def test_skips_code_fence_before_object():
+    parser = IncrementalJSONParser()
+    completed = parser.feed('```json\n{"a": 1, "b": "x"}\n```')
+    assert completed == [("a", 1), ("b", "x")]
+    assert parser.done
+
+def test_partial_string_decodes_streaming_prefix():
+    parser = IncrementalJSONParser()
+    parser.feed('{"assistant_text": "Hello wor')
+    assert parser.partial_string("assistant_text") == "Hello wor"
+    assert parser.partial_string("confidence") is None
+    # A split escape sequence is held back until it completes
+    parser.feed("ld \\u00")
+    assert parser.partial_string("assistant_text") == "Hello world "
+    parser.feed('e9"')
+    assert parser.partial_string("assistant_text") == "Hello world é"
+
+def test_empty_object_and_invalid_scalar():
+    parser = IncrementalJSONParser()
+    assert parser.feed("{}") == []
+    assert parser.done
+
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"a": nope, "b": 2}') == [("b", 2)]
+    assert "a" not in parser.fields
@@ -0,0 +1,214 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import requests
+
+from llm_grok import GrokAPI, GrokUnavailableError
+
+MESSAGES = [{"role": "system", "content": "You are an agent."}, {"role": "user", "content": "When is my renewal due?"}]
+REPLY = {
+    "assistant_text": "Your renewal is due on June 1.",
+    "mood": {"label": "neutral", "confidence": 0.7},
+    "summary": ["Asked about renewal date"],
+    "action": "reply",
+    "outcome_hint": {"label": "Needs Follow-up", "confidence": 0.6}
+}
+
+def completion(content: str) -> dict:
+    return {"choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {"total_tokens": 42}}
+
+def make_client(handler) -> GrokAPI:
+    """GrokAPI with a key and an async HTTP client served by handler(request) -> httpx.Response"""
+    client = GrokAPI()
+    client.api_key = "test"
+    async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client._get_async_client = lambda: async_client
+    return client
+
+def test_acall_grok_parses_and_caches_replies():
+    sent_requests = []
+
+    def handler(request):
+        sent_requests.append(json.loads(request.content))
+        return httpx.Response(200, json=completion(json.dumps(REPLY)))
+
+    client = make_client(handler)
+
+    async def main():
+        first = await client.acall_grok(MESSAGES, "renewal", "es")
+        second = await client.acall_grok(MESSAGES, "renewal", "es")
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == REPLY and second == REPLY
+    assert len(sent_requests) == 1
+    # The language instruction is added as its own message; the system prompt is left alone
+    sent = sent_requests[0]["messages"]
+    assert sent[0] == MESSAGES[0] and sent[-1] == MESSAGES[-1] and len(sent) == 3
+    assert sent_requests[0]["response_format"] == {"type": "json_object"}
+
+def test_acall_grok_coalesces_concurrent_identical_calls():
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=completion(json.dumps(REPLY)))
+
+    client = make_client(handler)
+
+    async def main():
+        return await asyncio.gather(*(client.acall_grok(MESSAGES, "renewal") for _ in range(5)))
+
+    assert asyncio.run(main()) == [REPLY] * 5
+    assert len(calls) == 1
+    assert client.get_stats()["async_singleflight"]["coalesced"] == 4
+
+def test_acall_grok_retries_server_errors():
+    statuses = iter([503, 200])
+
+    def handler(request):
+        status = next(statuses)
+        return httpx.Response(status, json=completion(json.dumps(REPLY)) if status == 200 else {})
+
+    client = make_client(handler)
+    assert asyncio.run(client.acall_grok(MESSAGES, "renewal")) == REPLY
+    assert client.circuit_breaker.stats()["window_calls"] == 2
+
+def test_acall_grok_re_asks_once_then_falls_back():
+    contents = iter(["not json at all", "still not json"])
+
+    def handler(request):
+        return httpx.Response(200, json=completion(next(contents)))
+
+    client = make_client(handler)
+    response = asyncio.run(client.acall_grok(MESSAGES, "renewal"))
+    assert response == client._get_fallback_response(MESSAGES, "renewal")
+    stats = client.get_stats()["json"]
+    assert (stats["reasked"], stats["reask_failed"]) == (1, 1)
+    # Fallbacks are not cached
+    assert client.cache.stats()["entries"] == 0
+
+def test_acall_grok_client_error_is_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(400, json={"error": "bad request"})
+
+    client = make_client(handler)
+    response = asyncio.run(client.acall_grok(MESSAGES, "renewal"))
+    assert response == client._get_fallback_response(MESSAGES, "renewal")
+    assert len(calls) == 1
+
+def test_acall_grok_without_key_uses_fallback():
+    client = GrokAPI()
+    client.api_key = None
+    assert asyncio.run(client.acall_grok(MESSAGES, "renewal")) == client._get_fallback_response(MESSAGES, "renewal")
+
+def test_call_grok_without_fallback_raises():
+    client = GrokAPI()
+    client.api_key = "test"
+    client.session.post = lambda *args, **kwargs: FakeResponse(400, {"error": "bad request"})
+    with pytest.raises(GrokUnavailableError):
+        client.call_grok(MESSAGES, "renewal", fallback=False)
+    assert client.call_grok(MESSAGES, "renewal") == client._get_fallback_response(MESSAGES, "renewal")
+
+class FakeResponse:
+    """Minimal requests.Response stand-in for the sync session"""
+
+    def __init__(self, status_code: int, body=None, headers=None, lines=()):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._body = body
+        self._lines = lines
+        self.text = json.dumps(body)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def json(self):
+        return self._body
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self._lines)
+
+def sse_lines(content: str, size: int) -> list:
+    """Server-sent event lines streaming content in chunks of size characters"""
+    chunks = [content[i:i + size] for i in range(0, len(content), size)]
+    return [f"data: {json.dumps({'choices': [{'delta': {'content': chunk}}]})}" for chunk in chunks] + ["data: [DONE]"]
+
+def test_stream_rate_limit_blocks_limiter_without_tripping_breaker():
+    client = GrokAPI()
+    client.api_key = "test"
+    client.circuit_breaker.min_calls = 1
+    posts = []
+
+    def post(url, stream=False, **kwargs):
+        posts.append(stream)
+        if stream:
+            return FakeResponse(429, {"error": "slow down"}, {"Retry-After": "0.05"})
+        return FakeResponse(200, completion(json.dumps(REPLY)))
+
+    client.session.post = post
+    events = list(client.stream_grok(MESSAGES, "renewal"))
+
+    # The stream's 429 holds back the non-streaming retry, which then succeeds
+    assert posts == [True, False]
+    assert events[-1] == {"type": "done", "response": REPLY}
+    assert client.rate_limiter.stats()["throttled"] == 1
+    breaker = client.circuit_breaker.stats()
+    assert breaker["state"] == "closed" and breaker["error_rate"] == 0.0
+
+def test_async_stream_rate_limit_blocks_limiter_without_tripping_breaker():
+    streamed = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        streamed.append(body.get("stream", False))
+        if body.get("stream"):
+            return httpx.Response(429, json={"error": "slow down"}, headers={"Retry-After": "0.05"})
+        return httpx.Response(200, json=completion(json.dumps(REPLY)))
+
+    client = make_client(handler)
+    client.circuit_breaker.min_calls = 1
+
+    async def main():
+        return [event async for event in client.astream_grok(MESSAGES, "renewal")]
+
+    events = asyncio.run(main())
+    assert streamed == [True, False]
+    assert events[-1] == {"type": "done", "response": REPLY}
+    assert client.rate_limiter.stats()["throttled"] == 1
+    breaker = client.circuit_breaker.stats()
+    assert breaker["state"] == "closed" and breaker["error_rate"] == 0.0
+
+def test_stream_server_error_still_counts_as_failure():
+    client = GrokAPI()
+    client.api_key = "test"
+    client.session.post = lambda *args, **kwargs: FakeResponse(503, {})
+    with pytest.raises(requests.exceptions.HTTPError):
+        list(client._stream_grok_api(MESSAGES))
+    assert client.circuit_breaker.stats()["error_rate"] == 1.0
+
+def test_stream_surfaces_decision_fields_before_assistant_text():
+    # Keys in the order the response schema asks for
+    reply = {key: REPLY[key] for key in ("mood", "action", "outcome_hint", "assistant_text", "summary")}
+    client = GrokAPI()
+    client.api_key = "test"
+    client.session.post = lambda *args, **kwargs: FakeResponse(200, lines=sse_lines(json.dumps(reply), 7))
+    events = list(client.stream_grok(MESSAGES, "renewal"))
+
+    fields = [event["name"] for event in events if event["type"] == "field"]
+    assert fields == list(reply)
+    first_delta = next(i for i, event in enumerate(events) if event["type"] == "delta")
+    decided = [event["name"] for event in events[:first_delta] if event["type"] == "field"]
+    assert decided == ["mood", "action", "outcome_hint"]
+    assert "".join(event["text"] for event in events if event["type"] == "delta") == reply["assistant_text"]
+    assert events[-1] == {"type": "done", "response": reply}
@@ -0,0 +1,149 @@
+import json
+import os
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import sessionmaker
+
+from database import build_engine
+from migrations import MIGRATIONS, applied_versions, run_migrations
+from models import Base, Message, MessagePayload
+
+ALL_VERSIONS = [version for version, _, _ in MIGRATIONS]
+
+def fresh_engine(test_dir: str, name: str):
+    path = os.path.join(test_dir, name)
+    if os.path.exists(path):
+        os.remove(path)
+    return build_engine(f"sqlite:///{path}", "wal")
+
+def make_legacy_schema(engine):
+    """Roll a create_all() schema back to the shape it had before migration 1"""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in ("conversation_stats", "message_payloads", "jobs"):
+            conn.execute(text(f"DROP TABLE {table}"))
+        for index in ("ix_messages_conversation_created", "ix_conversations_customer_status_created",
+                      "ix_leads_customer_due_date", "ix_tasks_lead_status", "ix_conversations_created",
+                      "ix_conversations_status_created", "ix_interactions_created",
+                      "ix_interactions_customer_created", "ix_interactions_lead_created",
+                      "ix_interactions_status_created"):
+            conn.execute(text(f"DROP INDEX {index}"))
+        for column in ("summary_through_message_id", "context_summary", "context_summary_through_id"):
+            conn.execute(text(f"ALTER TABLE conversations DROP COLUMN {column}"))
+        conn.execute(text("ALTER TABLE messages ADD COLUMN provider_raw JSON"))
+        conn.execute(text("ALTER TABLE messages ADD COLUMN llm_raw JSON"))
+
+        conn.execute(text(
+            "INSERT INTO customers (id, name, phone, preferred_language, consent_given_at, do_not_contact) "
+            "VALUES (1, 'Ana', '+15550001', 'en', '2024-01-01 00:00:00', 0)"
+        ))
+        conn.execute(text(
+            "INSERT INTO conversations (id, customer_id, agent_type, channel, language, status, created_at) "
+            "VALUES (1, 1, 'renewal', 'sms', 'en', 'escalated', '2024-01-01 00:00:00')"
+        ))
+        conn.execute(text(
+            "INSERT INTO messages (id, conversation_id, sender, content, message_type, provider_raw, llm_raw, created_at) "
+            "VALUES (1, 1, 'user', 'renew my policy please', 'text', :provider_raw, NULL, '2024-01-01 00:00:01'), "
+            "(2, 1, 'assistant', 'Sure!', 'text', NULL, :llm_raw, '2024-01-01 00:00:02')"
+        ), {"provider_raw": json.dumps({"sid": "SM1"}), "llm_raw": json.dumps({"id": "chat-1"})})
+
+def index_names(engine, table: str):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+def test_upgrades_legacy_database(test_dir):
+    engine = fresh_engine(test_dir, "legacy.db")
+    make_legacy_schema(engine)
+
+    assert run_migrations(engine) == ALL_VERSIONS
+    assert sorted(applied_versions(engine)) == ALL_VERSIONS
+
+    inspector = inspect(engine)
+    conversation_columns = {col["name"] for col in inspector.get_columns("conversations")}
+    assert {"summary_through_message_id", "context_summary", "context_summary_through_id"} <= conversation_columns
+    assert "ix_messages_conversation_created" in index_names(engine, "messages")
+    assert {"ix_interactions_lead_created", "ix_interactions_status_created"} <= index_names(engine, "interactions")
+    assert "jobs" in inspector.get_table_names()
+
+    with engine.connect() as conn:
+        stats = conn.execute(text(
+            "SELECT user_message_count, assistant_message_count, user_word_count, escalation_count "
+            "FROM conversation_stats WHERE conversation_id = 1"
+        )).one()
+        payloads = conn.execute(text(
+            "SELECT message_id, provider_raw, llm_raw FROM message_payloads ORDER BY message_id"
+        )).fetchall()
+    assert tuple(stats) == (1, 1, 4, 1)
+    assert [(row[0], json.loads(row[1]) if row[1] else None, json.loads(row[2]) if row[2] else None)
+            for row in payloads] == [(1, {"sid": "SM1"}, None), (2, None, {"id": "chat-1"})]
+    message_columns = {col["name"] for col in inspect(engine).get_columns("messages")}
+    assert not {"provider_raw", "llm_raw"} & message_columns
+    engine.dispose()
+
+def test_migrations_are_safe_on_create_all_database_and_run_once(test_dir):
+    engine = fresh_engine(test_dir, "fresh.db")
+    Base.metadata.create_all(bind=engine)
+
+    assert run_migrations(engine) == ALL_VERSIONS
+    assert run_migrations(engine) == []
+    assert sorted(applied_versions(engine)) == ALL_VERSIONS
+    engine.dispose()
+
+def test_failed_migration_is_rolled_back_and_retried(test_dir, monkeypatch):
+    engine = fresh_engine(test_dir, "partial.db")
+    Base.metadata.create_all(bind=engine)
+
+    def broken(conn):
+        conn.execute(text("CREATE TABLE half_done (id INTEGER)"))
+        raise RuntimeError("boom")
+
+    migrations = list(MIGRATIONS)
+    migrations[-1] = (migrations[-1][0], migrations[-1][1], broken)
+    monkeypatch.setattr("migrations.MIGRATIONS", migrations)
+    try:
+        run_migrations(engine)
+    except RuntimeError:
+        pass
+    assert sorted(applied_versions(engine)) == ALL_VERSIONS[:-1]
+    assert "half_done" not in inspect(engine).get_table_names()
+
+    monkeypatch.setattr("migrations.MIGRATIONS", MIGRATIONS)
+    assert run_migrations(engine) == ALL_VERSIONS[-1:]
+    engine.dispose()
+
+def test_message_raw_proxies_read_and_write_payloads_after_migration(test_dir):
+    engine = fresh_engine(test_dir, "payloads.db")
+    make_legacy_schema(engine)
+    run_migrations(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    user_msg, assistant_msg = db.execute(select(Message).order_by(Message.id)).scalars().all()
+    assert not any("message_payloads" in statement for statement in statements)
+    # Moved payloads are loaded on first access
+    assert (user_msg.provider_raw, user_msg.llm_raw) == ({"sid": "SM1"}, None)
+    assert (assistant_msg.provider_raw, assistant_msg.llm_raw) == (None, {"id": "chat-1"})
+    assert any("message_payloads" in statement for statement in statements)
+
+    # Writes update the existing payload row or create one
+    user_msg.llm_raw = {"id": "chat-2"}
+    new_msg = Message(conversation_id=1, sender="assistant", content="Done", provider_raw={"sid": "SM2"})
+    bare_msg = Message(conversation_id=1, sender="user", content="Thanks")
+    db.add_all([new_msg, bare_msg])
+    db.commit()
+    new_id, bare_id = new_msg.id, bare_msg.id
+    db.close()
+
+    db = Session()
+    payloads = {row.message_id: (row.provider_raw, row.llm_raw) for row in db.query(MessagePayload)}
+    assert payloads == {1: ({"sid": "SM1"}, {"id": "chat-2"}), 2: (None, {"id": "chat-1"}), new_id: ({"sid": "SM2"}, None)}
+    bare_msg = db.get(Message, bare_id)
+    assert bare_msg.llm_raw is None and bare_msg.payload is None
+
+    # Payloads go with their message
+    db.delete(db.get(Message, new_id))
+    db.commit()
+    assert db.get(MessagePayload, new_id) is None
+    db.close()
+    engine.dispose()
@@ -0,0 +1,101 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import pagination
+from app import app
+from database import SessionLocal
+from models import Conversation, Customer, Message
+from pagination import InvalidCursor, decode_cursor, encode_cursor, page_size
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+def test_cursor_round_trip_is_opaque_and_unpadded():
+    created_at = datetime(2024, 5, 17, 9, 30, 1, 123456)
+    cursor = encode_cursor(created_at, 42)
+    assert "=" not in cursor and "42" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+    assert decode_cursor(encode_cursor(datetime(2024, 1, 1), 1)) == (datetime(2024, 1, 1), 1)
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    "é",
+    raw_cursor({"created_at": "2024-01-01"}),
+    raw_cursor(["2024-01-01T00:00:00", 1, 2]),
+    raw_cursor(["yesterday", 1]),
+    raw_cursor([None, 1]),
+    raw_cursor(["2024-01-01T00:00:00", "one"]),
+    raw_cursor(5),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+])
+def test_decode_rejects_malformed_cursors(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+def test_page_size_is_clamped(monkeypatch):
+    monkeypatch.setattr(pagination, "PAGE_SIZE_DEFAULT", 50)
+    monkeypatch.setattr(pagination, "PAGE_SIZE_MAX", 200)
+    assert (page_size(None), page_size(0), page_size(-5), page_size(10), page_size(1000)) == (50, 50, 1, 10, 200)
+
+def add_conversation(phone: str, message_count: int) -> int:
+    """Conversation whose messages all share one created_at, so only the id breaks ties"""
+    db = SessionLocal()
+    try:
+        customer = Customer(name="Pages", phone=phone, consent_given_at=datetime(2024, 1, 1))
+        conversation = Conversation(customer=customer, agent_type="renewal", channel="sms")
+        conversation.messages = [Message(sender="user", content=f"m{i}", created_at=datetime(2024, 3, 1))
+                                 for i in range(message_count)]
+        db.add(conversation)
+        db.commit()
+        return conversation.id
+    finally:
+        db.close()
+
+def read_all_pages(client: TestClient, url: str, **params) -> list:
+    contents, cursor = [], None
+    while True:
+        response = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        body = response.json()
+        contents.extend(item["content"] for item in body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return contents
+
+def test_message_pages_cover_every_row_once_in_both_orders(db_ready):
+    conversation_id = add_conversation("5557700001", 7)
+    url = f"/api/conversations/{conversation_id}/messages"
+    with TestClient(app) as client:
+        assert read_all_pages(client, url, limit=3) == [f"m{i}" for i in range(7)]
+        assert read_all_pages(client, url, limit=3, order="desc") == [f"m{i}" for i in reversed(range(7))]
+
+def test_rows_inserted_while_paging_do_not_shift_pages(db_ready):
+    conversation_id = add_conversation("5557700002", 4)
+    url = f"/api/conversations/{conversation_id}/messages"
+    with TestClient(app) as client:
+        first = client.get(url, params={"limit": 2, "order": "desc"}).json()
+        db = SessionLocal()
+        try:
+            db.add(Message(conversation_id=conversation_id, sender="user", content="new", created_at=datetime(2024, 3, 2)))
+            db.commit()
+        finally:
+            db.close()
+        second = client.get(url, params={"limit": 2, "order": "desc", "cursor": first["next_cursor"]}).json()
+    assert [item["content"] for item in first["items"] + second["items"]] == ["m3", "m2", "m1", "m0"]
+    assert second["next_cursor"] is None
+
+@pytest.mark.parametrize("path, phone", [
+    ("/api/conversations", "5557700101"),
+    ("/api/interactions", "5557700102"),
+    ("/api/conversations/{id}/messages", "5557700103"),
+])
+def test_bad_cursor_is_a_400(db_ready, path, phone):
+    conversation_id = add_conversation(phone, 1)
+    with TestClient(app) as client:
+        response = client.get(path.format(id=conversation_id), params={"cursor": "garbage!"})
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.json()["detail"]
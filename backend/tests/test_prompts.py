@@ -0,0 +1,39 @@
+import re
+
+from prompts import (EARLIER_TURNS_HEADER, RESPONSE_SCHEMA, build_agent_messages, format_prompt_with_context,
+                     get_agent_prompt, get_agent_template, language_instruction)
+
+ANA = {"customer_name": "Ana", "policy_id": "P-1", "due_date": "2024-06-01", "outstanding_amount": "120"}
+BOB = {"customer_name": "Bob", "policy_id": "P-2", "due_date": "2024-07-01", "outstanding_amount": "80"}
+
+def test_schema_lists_decision_fields_before_assistant_text():
+    keys = re.findall(r'^\s*"(\w+)":', RESPONSE_SCHEMA, re.MULTILINE)
+    assert keys == ["mood", "action", "outcome_hint", "assistant_text", "summary"]
+
+def test_system_prompt_prefix_is_shared_across_customers_and_languages():
+    template = get_agent_template("renewal")
+    prompts = [template.system_prompt(ANA, "en"), template.system_prompt(BOB, "es"),
+               template.system_prompt(BOB, "es", conversation_summary="Asked about fees")]
+    assert all(prompt.startswith(template.prefix + "\n\n") for prompt in prompts)
+    assert RESPONSE_SCHEMA in template.prefix and "Ana" not in template.prefix
+
+def test_build_agent_messages_puts_context_summary_and_language_last():
+    history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello Ana"}]
+    messages = build_agent_messages("renewal", ANA, "es", history=history, user_prompt="Go on",
+                                    conversation_summary="- Asked about fees")
+
+    trailing = messages[0]["content"][len(get_agent_template("renewal").prefix):]
+    assert trailing == ("\n\nContext: Customer Ana, Policy P-1, Due Date: 2024-06-01, Outstanding Amount: $120"
+                        f"\n\n{EARLIER_TURNS_HEADER}\n- Asked about fees\n\n{language_instruction('es')}")
+    assert messages[1:] == history + [{"role": "user", "content": "Go on"}]
+
+def test_missing_context_fields_and_unknown_agents_use_defaults():
+    messages = build_agent_messages("unknown", {"customer_name": None})
+    assert "Context: Customer Customer, Policy N/A, Due Date: N/A, Outstanding Amount: $0" in messages[0]["content"]
+    assert get_agent_template("unknown") is get_agent_template("renewal")
+
+def test_legacy_prompt_helpers_match_the_compiled_template():
+    for agent_type in ("renewal", "policy_info", "crosssell"):
+        template = get_agent_template(agent_type)
+        prompt = format_prompt_with_context(get_agent_prompt(agent_type), ANA)
+        assert prompt == f"{template.prefix}\n\n{template.render_context(ANA)}"
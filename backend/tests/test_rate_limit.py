@@ -0,0 +1,94 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from rate_limit import RateLimiter, TokenBucket, parse_retry_after, with_jitter
+
+def test_token_bucket_serves_burst_then_reports_wait():
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)  # 1 token/s
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    wait = bucket.reserve()
+    assert 0.9 < wait <= 1.0
+    # Reservations queue up behind each other instead of all waiting 1s
+    assert 1.9 < bucket.reserve() <= 2.0
+
+def test_token_bucket_clamps_oversized_requests_to_capacity():
+    bucket = TokenBucket(rate_per_minute=60, capacity=5)
+    assert bucket.reserve(100) == 0.0
+    assert 4.9 < bucket.reserve(5) <= 5.0
+
+def test_token_bucket_adjust_refunds_and_charges():
+    bucket = TokenBucket(rate_per_minute=60, capacity=10)
+    bucket.reserve(10)
+    bucket.adjust(4)  # estimate was 4 tokens too high
+    assert bucket.reserve(4) == 0.0
+    bucket.adjust(-3)  # request used 3 more than estimated
+    assert 2.9 < bucket.reserve(0) <= 3.0
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate_per_minute=6000, capacity=1)  # 100 tokens/s
+    bucket.reserve()
+    time.sleep(0.05)
+    assert bucket.reserve() == 0.0
+
+def test_limiter_without_limits_never_waits():
+    limiter = RateLimiter()
+    for _ in range(5):
+        with limiter.acquire(tokens=1000):
+            pass
+    stats = limiter.stats()
+    assert stats["acquired"] == 5 and stats["throttled"] == 0
+    assert stats["requests_per_minute"] is None and stats["max_concurrency"] is None
+
+def test_limiter_throttles_on_request_budget():
+    limiter = RateLimiter(requests_per_minute=600)
+    limiter.request_bucket = TokenBucket(600, capacity=1)  # no burst, 10 requests/s
+    with limiter.acquire():
+        pass
+    started = time.monotonic()
+    with limiter.acquire():
+        pass
+    assert time.monotonic() - started >= 0.08
+    assert limiter.stats()["throttled"] == 1
+
+def test_limiter_block_for_holds_back_requests():
+    limiter = RateLimiter()
+    limiter.block_for(0.1)
+    started = time.monotonic()
+    with limiter.acquire():
+        pass
+    assert time.monotonic() - started >= 0.09
+
+def test_limiter_caps_async_concurrency():
+    limiter = RateLimiter(max_concurrency=2)
+    active = []
+    peak = []
+
+    async def call():
+        async with limiter.aacquire():
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.03)
+            active.pop()
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(main())
+    assert max(peak) == 2
+    assert limiter.stats()["in_flight"] == 0
+    assert limiter.stats()["acquired"] == 6
+
+def test_parse_retry_after_seconds_and_http_date():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+
+def test_with_jitter_stays_within_ratio():
+    for _ in range(50):
+        assert 10 <= with_jitter(10, ratio=0.5) <= 15
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        return {"value": 42}
+
+    def caller():
+        results.append(flight.do("k", work))
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    started.wait(2)
+    waiters = [threading.Thread(target=caller) for _ in range(3)]
+    for thread in waiters:
+        thread.start()
+    while flight.stats()["coalesced"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader] + waiters:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert results == [{"value": 42}] * 4
+    # Waiters get copies, so one caller mutating its result cannot affect another
+    assert len({id(r) for r in results}) == 4
+    assert flight.stats() == {"calls": 1, "coalesced": 3, "in_flight": 0}
+
+def test_error_is_shared_and_key_released():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        release.wait(2)
+        raise ValueError("upstream down")
+
+    def caller():
+        try:
+            flight.do("k", failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    started.wait(2)
+    waiter = threading.Thread(target=caller)
+    waiter.start()
+    while flight.stats()["coalesced"] < 1:
+        time.sleep(0.01)
+    release.set()
+    leader.join(2)
+    waiter.join(2)
+
+    assert errors == ["upstream down", "upstream down"]
+    assert flight.do("k", lambda: "fresh") == "fresh"
+    assert flight.stats()["calls"] == 2
+
+def test_async_callers_share_one_task():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": 1}
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert results == [{"value": 1}] * 5
+    assert flight.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+def test_async_cancelled_waiter_does_not_cancel_shared_call():
+    flight = AsyncSingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
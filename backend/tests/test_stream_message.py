@@ -0,0 +1,42 @@
+import json
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app import app
+from database import SessionLocal
+from models import Conversation, Customer, Message
+
+SPANISH = "Hola, quiero renovar mi póliza este mes. ¿Cuánto tengo que pagar por la renovación?"
+
+def add_conversation(phone: str) -> int:
+    db = SessionLocal()
+    try:
+        customer = Customer(name="Stream", phone=phone, preferred_language="en", consent_given_at=datetime(2024, 1, 1))
+        conversation = Conversation(customer=customer, agent_type="renewal", channel="sms", language="en")
+        db.add(conversation)
+        db.commit()
+        return conversation.id
+    finally:
+        db.close()
+
+def stream_events(client: TestClient, conversation_id: int, content: str) -> list:
+    response = client.post(f"/api/conversations/{conversation_id}/messages/stream", json={"content": content})
+    assert response.status_code == 200
+    return [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+
+def test_stream_message_saves_detected_customer_language_with_the_reply(db_ready):
+    conversation_id = add_conversation("5557400001")
+    with TestClient(app) as client:
+        events = stream_events(client, conversation_id, SPANISH)
+    assert events[-1]["type"] == "done"
+
+    db = SessionLocal()
+    try:
+        conversation = db.get(Conversation, conversation_id)
+        assert conversation.language == "es"
+        assert conversation.customer.preferred_language == "es"
+        senders = [msg.sender for msg in db.query(Message).filter(Message.conversation_id == conversation_id)]
+        assert senders == ["user", "assistant"]
+    finally:
+        db.close()
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import job_queue
+import processors
+from database import SessionLocal
+from llm_grok import GrokUnavailableError
+from models import Conversation, Customer, Message
+from processors import generate_conversation_summary, get_cached_summary
+
+@pytest.fixture
+def grok(monkeypatch):
+    """Fake Grok returning queued summaries; records the prompt of each call"""
+    fake = {"replies": [], "prompts": []}
+
+    def call_grok(messages, agent_type, language="en", cache_ttl=None, fallback=True):
+        assert fallback is False
+        fake["prompts"].append(messages[-1]["content"])
+        return {"assistant_text": fake["replies"].pop(0)}
+
+    monkeypatch.setattr(processors, "call_grok", call_grok)
+    return fake
+
+def add_conversation(phone: str, *contents) -> int:
+    db = SessionLocal()
+    try:
+        customer = Customer(name="Summary", phone=phone, consent_given_at=datetime(2024, 1, 1))
+        conversation = Conversation(customer=customer, agent_type="renewal", channel="sms")
+        conversation.messages = [Message(sender="user", content=content) for content in contents]
+        db.add(conversation)
+        db.commit()
+        return conversation.id
+    finally:
+        db.close()
+
+def add_message(conversation_id: int, content: str) -> int:
+    db = SessionLocal()
+    try:
+        message = Message(conversation_id=conversation_id, sender="user", content=content)
+        db.add(message)
+        db.commit()
+        return message.id
+    finally:
+        db.close()
+
+def load_summary(conversation_id: int):
+    db = SessionLocal()
+    try:
+        conversation = db.get(Conversation, conversation_id)
+        return conversation.summary, conversation.summary_through_message_id, get_cached_summary(db, conversation)
+    finally:
+        db.close()
+
+def test_summary_is_cached_until_new_messages_arrive(db_ready, grok):
+    conversation_id = add_conversation("5557300001", "When is my renewal due?", "Can I pay monthly?")
+    grok["replies"] = ["• Renewal date\n• Monthly payments\n• Open"]
+
+    assert generate_conversation_summary(conversation_id) == "• Renewal date\n• Monthly payments\n• Open"
+    assert generate_conversation_summary(conversation_id) == "• Renewal date\n• Monthly payments\n• Open"
+    assert len(grok["prompts"]) == 1
+    summary, through_id, cached = load_summary(conversation_id)
+    assert cached == summary and through_id is not None
+
+    add_message(conversation_id, "Actually, cancel it.")
+    assert load_summary(conversation_id)[2] is None
+
+def test_incremental_summary_sends_previous_summary_and_new_messages_only(db_ready, grok):
+    conversation_id = add_conversation("5557300002", "When is my renewal due?")
+    grok["replies"] = ["• Asked renewal date", "• Asked renewal date\n• Wants to cancel"]
+    generate_conversation_summary(conversation_id)
+    new_id = add_message(conversation_id, "Actually, cancel it.")
+
+    assert generate_conversation_summary(conversation_id) == "• Asked renewal date\n• Wants to cancel"
+    prompt = grok["prompts"][-1]
+    assert "• Asked renewal date" in prompt and "user: Actually, cancel it." in prompt
+    assert "When is my renewal due?" not in prompt
+    assert load_summary(conversation_id)[:2] == ("• Asked renewal date\n• Wants to cancel", new_id)
+
+def test_grok_down_stores_nothing_and_raises(db_ready, grok, monkeypatch):
+    conversation_id = add_conversation("5557300003", "When is my renewal due?")
+    grok["replies"] = ["• Asked renewal date"]
+    generate_conversation_summary(conversation_id)
+    before = load_summary(conversation_id)
+    add_message(conversation_id, "Hello?")
+
+    # Real client with no API key configured: Grok is unavailable
+    monkeypatch.undo()
+    with pytest.raises(GrokUnavailableError):
+        generate_conversation_summary(conversation_id)
+    summary, through_id, cached = load_summary(conversation_id)
+    assert (summary, through_id) == before[:2] and cached is None
+
+    # The job fails so the queue retries it instead of serving a fallback reply
+    job = {"id": 0, "payload": {"conversation_id": conversation_id}, "attempts": 1}
+    with pytest.raises(GrokUnavailableError):
+        asyncio.run(job_queue._generate_conversation_summary(job))
@@ -0,0 +1,85 @@
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+
+from database import AsyncSessionLocal, SessionLocal, close_async_db, engine
+from models import Conversation, Customer, Lead, Message
+from turn_context import aload_turn_context, load_turn_context
+
+@contextmanager
+def count_queries(sync_engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+
+def add_conversation(phone: str, message_count: int, do_not_contact: bool = False) -> tuple:
+    """Conversation with a lead and messages; the first two messages are folded into the context summary"""
+    db = SessionLocal()
+    try:
+        customer = Customer(name="Turn", phone=phone, consent_given_at=datetime(2024, 1, 1), do_not_contact=do_not_contact)
+        lead = Lead(customer=customer, policy_id="POL-7", expected_value=250.0, due_date=datetime(2024, 6, 1))
+        conversation = Conversation(customer=customer, lead=lead, agent_type="renewal", channel="sms")
+        conversation.messages = [Message(sender="user", content=f"message {i}") for i in range(message_count)]
+        db.add(conversation)
+        db.flush()
+        ids = [msg.id for msg in conversation.messages]
+        conversation.context_summary_through_id = ids[1]
+        db.commit()
+        return conversation.id, ids
+    finally:
+        db.close()
+
+def test_load_turn_context_takes_two_queries_and_no_lazy_loads(db_ready):
+    conversation_id, ids = add_conversation("5557600001", 4)
+    db = SessionLocal()
+    try:
+        with count_queries(engine) as statements:
+            turn = load_turn_context(db, conversation_id)
+            context = turn.agent_context()
+            assert turn.can_contact and turn.lead.policy_id == "POL-7"
+        assert len(statements) == 2
+    finally:
+        db.close()
+    assert [msg.id for msg in turn.messages] == ids[2:]
+    assert context == {"customer_name": "Turn", "policy_id": "POL-7", "due_date": "2024-06-01T00:00:00",
+                       "outstanding_amount": 250.0, "policy_type": "Insurance Policy", "policy_value": 250.0}
+    assert turn.message(ids[3]).content == "message 3" and turn.message(ids[0]) is None
+
+def test_load_turn_context_without_messages_or_conversation(db_ready):
+    conversation_id, _ = add_conversation("5557600002", 3, do_not_contact=True)
+    db = SessionLocal()
+    try:
+        with count_queries(engine) as statements:
+            turn = load_turn_context(db, conversation_id, with_messages=False)
+        assert len(statements) == 1
+        assert turn.messages == [] and not turn.can_contact
+        assert load_turn_context(db, 10 ** 9) is None
+    finally:
+        db.close()
+
+def test_aload_turn_context_matches_sync_loader(db_ready):
+    conversation_id, ids = add_conversation("5557600003", 3)
+
+    async def main():
+        try:
+            async with AsyncSessionLocal() as db:
+                with count_queries(db.bind.sync_engine) as statements:
+                    turn = await aload_turn_context(db, conversation_id)
+                    context = turn.agent_context()
+                return turn, context, len(statements), await aload_turn_context(db, 10 ** 9)
+        finally:
+            await close_async_db()
+
+    turn, context, query_count, missing = asyncio.run(main())
+    assert query_count == 2 and missing is None
+    assert [msg.id for msg in turn.messages] == ids[2:]
+    assert context["policy_id"] == "POL-7" and turn.customer.phone == "5557600003"
@@ -0,0 +1,107 @@
+"""
+Single-round-trip loading of what a conversation turn needs.
+One query loads the conversation with its customer and lead (joined eagerly), a
+second loads the unsummarized message tail, so building a turn costs two round
+trips and no lazy loads. Sync and async loaders return the same TurnContext.
+"""
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+
+from models import Conversation, Customer, Lead, Message
+
+def agent_context(customer: Customer, lead: Optional[Lead]) -> Dict[str, Any]:
+    """
+    Build the agent prompt context for a customer and (optional) lead.
+
+    Args:
+        customer: Customer being contacted
+        lead: Lead the conversation is about
+
+    Returns:
+        Context dict for the agent prompt template
+    """
+    return {
+        "customer_name": customer.name,
+        "policy_id": lead.policy_id if lead else "N/A",
+        "due_date": lead.due_date.isoformat() if lead and lead.due_date else "N/A",
+        "outstanding_amount": lead.expected_value if lead else 0,
+        "policy_type": "Insurance Policy",
+        "policy_value": lead.expected_value if lead else 0
+    }
+
+class TurnContext:
+    """Conversation, customer, lead and unsummarized messages loaded for a turn"""
+
+    def __init__(self, conversation: Conversation, messages: List[Message]):
+        self.conversation = conversation
+        self.customer = conversation.customer
+        self.lead = conversation.lead
+        self.messages = messages  # after context_summary_through_id, chronological
+
+    @property
+    def can_contact(self) -> bool:
+        """Customer exists, has consented and is not on the do-not-contact list"""
+        return bool(self.customer and not self.customer.do_not_contact and self.customer.consent_given_at)
+
+    def message(self, message_id: int) -> Optional[Message]:
+        """Get a loaded message by ID"""
+        return next((msg for msg in self.messages if msg.id == message_id), None)
+
+    def add_message(self, msg: Message):
+        """Append a message created during the turn (flushed, so it has an ID)"""
+        self.messages.append(msg)
+
+    def agent_context(self) -> Dict[str, Any]:
+        """Agent prompt context for this turn"""
+        return agent_context(self.customer, self.lead)
+
+def _conversation_query(conversation_id: int):
+    return select(Conversation).options(
+        joinedload(Conversation.customer), joinedload(Conversation.lead)
+    ).where(Conversation.id == conversation_id)
+
+def _tail_query(conversation: Conversation):
+    query = select(Message).where(Message.conversation_id == conversation.id)
+    if conversation.context_summary_through_id:
+        query = query.where(Message.id > conversation.context_summary_through_id)
+    return query.order_by(Message.created_at, Message.id)
+
+def load_turn_context(db: Session, conversation_id: int, with_messages: bool = True) -> Optional[TurnContext]:
+    """
+    Load a conversation turn: conversation, customer and lead in one query, then the
+    unsummarized message tail.
+
+    Args:
+        db: Database session
+        conversation_id: ID of the conversation
+        with_messages: Also load the message tail (skip when only replying)
+
+    Returns:
+        TurnContext, or None if the conversation does not exist
+    """
+    conversation = db.execute(_conversation_query(conversation_id)).scalars().first()
+    if conversation is None:
+        return None
+    messages = list(db.execute(_tail_query(conversation)).scalars()) if with_messages else []
+    return TurnContext(conversation, messages)
+
+async def aload_turn_context(db: AsyncSession, conversation_id: int, with_messages: bool = True) -> Optional[TurnContext]:
+    """
+    Async counterpart of load_turn_context.
+
+    Args:
+        db: Async database session
+        conversation_id: ID of the conversation
+        with_messages: Also load the message tail (skip when only replying)
+
+    Returns:
+        TurnContext, or None if the conversation does not exist
+    """
+    conversation = (await db.execute(_conversation_query(conversation_id))).scalars().first()
+    if conversation is None:
+        return None
+    messages = list((await db.execute(_tail_query(conversation))).scalars()) if with_messages else []
+    return TurnContext(conversation, messages)